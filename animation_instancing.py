@@ -0,0 +1,243 @@
+
+import ctypes
+
+import numpy as np
+import pyglet
+from pyglet.gl import (GL_BLEND, GL_ONE_MINUS_SRC_ALPHA, GL_SRC_ALPHA, GL_TEXTURE0, GL_TRIANGLES,
+                       glActiveTexture, glBindTexture, glBlendFunc, glDisable, glEnable)
+from pyglet.graphics.shader import Shader, ShaderProgram
+
+LOOP = 0
+ONCE = 1
+PINGPONG = 2
+
+DEFAULT_FRAME_DURATION = 0.1
+
+VERTEX_SOURCE = """#version 150 core
+in vec2 position;
+in vec3 tex_coords;
+out vec3 texture_coords;
+
+uniform WindowBlock
+{
+    mat4 projection;
+    mat4 view;
+} window;
+
+void main()
+{
+    gl_Position = window.projection * window.view * vec4(position, 0.0, 1.0);
+    texture_coords = tex_coords;
+}
+"""
+
+FRAGMENT_SOURCE = """#version 150 core
+in vec3 texture_coords;
+out vec4 final_colors;
+
+uniform sampler2D sprite_texture;
+
+void main()
+{
+    final_colors = texture(sprite_texture, texture_coords.xy);
+}
+"""
+
+_program = None
+
+def get_program():
+    global _program
+    if _program is None:
+        _program = ShaderProgram(Shader(VERTEX_SOURCE, 'vertex'), Shader(FRAGMENT_SOURCE, 'fragment'))
+    return _program
+
+class AnimationSheet:
+    # Every frame of one animation as a region of a single texture, with per-frame tables
+    def __init__(self, animation):
+        frames = animation.frames
+        textures = {frame.image.get_texture().id for frame in frames}
+        if len(textures) > 1:
+            # Loose frame files: pack them into one texture so all instances draw in one call
+            atlas = pyglet.image.atlas.TextureAtlas(*self.atlas_size(frames))
+            regions = [atlas.add(frame.image.get_image_data()) for frame in frames]
+        else:
+            regions = [frame.image.get_texture() for frame in frames]
+        self.texture = regions[0].owner if hasattr(regions[0], 'owner') else regions[0]
+        self.tex_coords = np.array([region.tex_coords for region in regions], dtype=np.float32)
+        self.sizes = np.array([(region.width, region.height) for region in regions], dtype=np.float32)
+        self.anchors = np.array([(frame.image.anchor_x, frame.image.anchor_y) for frame in frames], dtype=np.float32)
+        durations = [frame.duration for frame in frames]
+        fallback = next((d for d in durations if d), DEFAULT_FRAME_DURATION)
+        self.durations = np.array([d or fallback for d in durations], dtype=np.float64)
+        self.ends = np.cumsum(self.durations)
+        self.total = float(self.ends[-1])
+
+    @staticmethod
+    def atlas_size(frames):
+        area = sum((f.image.width + 2) * (f.image.height + 2) for f in frames)
+        widest = max(max(f.image.width, f.image.height) for f in frames) + 2
+        size = 64
+        while size * size < area * 1.3 or size < widest:
+            size *= 2
+        return size, size
+
+class CrowdGroup(pyglet.graphics.Group):
+    def __init__(self, texture, program, order=0, parent=None):
+        super().__init__(order, parent)
+        self.texture = texture
+        self.program = program
+
+    def set_state(self):
+        self.program.use()
+        glActiveTexture(GL_TEXTURE0)
+        glBindTexture(self.texture.target, self.texture.id)
+        glEnable(GL_BLEND)
+        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+
+    def unset_state(self):
+        glDisable(GL_BLEND)
+        self.program.stop()
+
+    def __eq__(self, other):
+        return (other.__class__ is self.__class__ and self.program is other.program and
+                self.parent == other.parent and self.texture.target == other.texture.target and
+                self.texture.id == other.texture.id and self.order == other.order)
+
+    def __hash__(self):
+        return hash((id(self.parent), self.program.id, self.texture.id, self.texture.target, self.order))
+
+class CrowdAnimator:
+    # Structure-of-arrays playback for many instances of one animation: one update computes
+    # every frame index with NumPy and one vertex list holds every quad.
+    def __init__(self, animation, capacity=64, batch=None, layer=0, parent=None):
+        self.sheet = animation if isinstance(animation, AnimationSheet) else AnimationSheet(animation)
+        self.batch = batch or pyglet.graphics.Batch()
+        self.owns_batch = batch is None
+        self.program = get_program()
+        self.group = CrowdGroup(self.sheet.texture, self.program, layer, parent)
+        self.count = 0
+        self.capacity = 0
+        self.vertex_list = None
+        self.handles = []
+        self.slots = {}
+        self.next_handle = 0
+        self.dirty = True
+        self._grow(capacity)
+
+    def _grow(self, capacity):
+        def resized(array, shape):
+            grown = np.zeros((capacity,) + shape, dtype=array.dtype if array is not None else np.float64)
+            if array is not None:
+                grown[:self.count] = array[:self.count]
+            return grown
+        self.x = resized(getattr(self, 'x', None), ())
+        self.y = resized(getattr(self, 'y', None), ())
+        self.scale = resized(getattr(self, 'scale', None), ())
+        self.time = resized(getattr(self, 'time', None), ())
+        self.speed = resized(getattr(self, 'speed', None), ())
+        self.mode = resized(getattr(self, 'mode', None), ()).astype(np.int8)
+        self.frame = resized(getattr(self, 'frame', None), ()).astype(np.int32)
+        self.capacity = capacity
+
+        if self.vertex_list is not None:
+            self.vertex_list.delete()
+        indices = (np.arange(capacity, dtype=np.uint32)[:, None] * 4 + np.array([0, 1, 2, 0, 2, 3], dtype=np.uint32)).ravel()
+        self.vertex_list = self.program.vertex_list_indexed(capacity * 4, GL_TRIANGLES, indices.tolist(),
+                                                            batch=self.batch, group=self.group,
+                                                            position=('f', np.zeros(capacity * 8)),
+                                                            tex_coords=('f', np.zeros(capacity * 12)))
+        self.dirty = True
+
+    def add(self, x, y, speed=1.0, offset=0.0, mode=LOOP, scale=1.0):
+        if self.count == self.capacity:
+            self._grow(self.capacity * 2)
+        slot = self.count
+        self.x[slot], self.y[slot], self.scale[slot] = x, y, scale
+        self.time[slot], self.speed[slot], self.mode[slot] = offset, speed, mode
+        self.count += 1
+        handle = self.next_handle
+        self.next_handle += 1
+        self.handles.append(handle)
+        self.slots[handle] = slot
+        self.dirty = True
+        return handle
+
+    def remove(self, handle):
+        slot = self.slots.pop(handle)
+        last = self.count - 1
+        if slot != last:
+            for array in (self.x, self.y, self.scale, self.time, self.speed, self.mode, self.frame):
+                array[slot] = array[last]
+            moved = self.handles[last]
+            self.handles[slot] = moved
+            self.slots[moved] = slot
+        self.handles.pop()
+        self.count -= 1
+        self.dirty = True
+
+    def set_position(self, handle, x, y):
+        slot = self.slots[handle]
+        self.x[slot], self.y[slot] = x, y
+        self.dirty = True
+
+    def set_speed(self, handle, speed):
+        self.speed[self.slots[handle]] = speed
+
+    def restart(self, handle, offset=0.0):
+        self.time[self.slots[handle]] = offset
+
+    def finished(self, handle):
+        slot = self.slots[handle]
+        return self.mode[slot] == ONCE and self.time[slot] >= self.sheet.total
+
+    def update(self, dt):
+        n = self.count
+        if not n:
+            return
+        sheet = self.sheet
+        time = self.time[:n]
+        time += dt * self.speed[:n]
+        mode = self.mode[:n]
+        local = np.where(mode == ONCE, np.minimum(time, sheet.total - 1e-9), time % sheet.total)
+        pingpong = mode == PINGPONG
+        if pingpong.any():
+            bounce = time[pingpong] % (2 * sheet.total)
+            local[pingpong] = np.where(bounce < sheet.total, bounce, 2 * sheet.total - bounce - 1e-9)
+        frame = np.minimum(np.searchsorted(sheet.ends, local, side='right'), len(sheet.ends) - 1)
+        if self.dirty or not np.array_equal(frame, self.frame[:n]):
+            self.frame[:n] = frame
+            self.write_vertices()
+
+    def write_vertices(self):
+        n = self.count
+        sheet = self.sheet
+        frame = self.frame[:n]
+        scale = self.scale[:n]
+        size = sheet.sizes[frame] * scale[:, None]
+        left = self.x[:n] - sheet.anchors[frame, 0] * scale
+        bottom = self.y[:n] - sheet.anchors[frame, 1] * scale
+        right, top = left + size[:, 0], bottom + size[:, 1]
+
+        position = np.zeros((self.capacity, 8), dtype=np.float32)
+        position[:n] = np.stack([left, bottom, right, bottom, right, top, left, top], axis=1)
+        tex_coords = np.zeros((self.capacity, 12), dtype=np.float32)
+        tex_coords[:n] = sheet.tex_coords[frame]
+        # Unused slots stay as zero-area quads
+        self.upload('position', position)
+        self.upload('tex_coords', tex_coords)
+        self.dirty = False
+
+    def upload(self, name, data):
+        # Straight memory copy; assigning a NumPy array to the ctypes slice goes element by element
+        buffer = self.vertex_list.domain.attrib_name_buffers[name]
+        region = buffer.get_region(self.vertex_list.start, self.vertex_list.count)
+        ctypes.memmove(region, data.ctypes.data, data.nbytes)
+        buffer.invalidate_region(self.vertex_list.start, self.vertex_list.count)
+
+    def draw(self):
+        if self.owns_batch:
+            self.batch.draw()
+
+    def delete(self):
+        self.vertex_list.delete()
+        self.vertex_list = None
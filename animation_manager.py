@@ -2,36 +2,84 @@
 import pyglet
 import os
 from PIL import Image
+from texture_atlas import TextureAtlas, TextureAtlasBuilder, save_image
+from animation_instancing import AnimationSheet, CrowdAnimator
+from texture_residency import residency
+from virtual_fs import vfs
 
 class AnimationManager:
     def __init__(self):
         self.animations = {}
+        self.atlases = {}
+        self.frame_paths = {}
+        self.mask_sources = {}    # per animation, the image path of each frame's hit-test mask
+        self.sheets = {}
+        self.textures = residency.owner('animations')
+
+    def load_animation(self, name, directory, frame_duration, atlas=None):
+        self.release_animation(name)
+        if atlas is not None:
+            atlas = self.get_atlas(atlas)
+            prefix = os.path.basename(os.path.normpath(directory))
+            names = atlas.frame_names(prefix)
+            frames = [pyglet.image.AnimationFrame(atlas.get_region(frame), frame_duration) for frame in names]
+            self.animations[name] = pyglet.image.Animation(frames)
+            self.mask_sources[name] = [atlas.mask_source(frame) for frame in names]
+            return
 
-    def load_animation(self, name, directory, frame_duration):
         frames = []
-        for filename in sorted(os.listdir(directory)):
+        paths = []
+        for filename in vfs.listdir(directory):
             if filename.endswith(".png"):
-                image = pyglet.image.load(os.path.join(directory, filename))
+                path = os.path.join(directory, filename)
+                image = self.textures.image(path, variant=False)
                 frames.append(pyglet.image.AnimationFrame(image, frame_duration))
+                paths.append(path)
         self.animations[name] = pyglet.image.Animation(frames)
+        self.frame_paths[name] = paths
+        self.mask_sources[name] = paths
 
     def get_animation(self, name):
         return self.animations.get(name)
 
+    def create_crowd(self, name, capacity=64, batch=None, layer=0):
+        # Many extras playing one animation: one update, one texture, one draw call
+        if name not in self.sheets:
+            self.sheets[name] = AnimationSheet(self.animations[name])
+        return CrowdAnimator(self.sheets[name], capacity, batch, layer)
+
+    def release_animation(self, name):
+        self.animations.pop(name, None)
+        self.sheets.pop(name, None)
+        self.mask_sources.pop(name, None)
+        for path in self.frame_paths.pop(name, ()):
+            self.textures.release_image(path)
+
+    def release(self):
+        for name in list(self.animations):
+            self.release_animation(name)
+        for atlas in self.atlases.values():
+            atlas.release()
+        self.atlases.clear()
+        self.textures.release()
+
+    def get_atlas(self, atlas):
+        if isinstance(atlas, TextureAtlas):
+            return atlas
+        if atlas not in self.atlases:
+            self.atlases[atlas] = TextureAtlas(atlas, self.textures)
+        return self.atlases[atlas]
+
+    def build_atlas(self, directories, output_file, max_size=2048, padding=2, trim=True):
+        builder = TextureAtlasBuilder(max_size=max_size, padding=padding, trim=trim)
+        for directory in directories:
+            builder.add_directory(directory)
+        return builder.save(output_file)
+
     def generate_spritesheet(self, directory, output_file):
-        images = [Image.open(os.path.join(directory, f)) for f in sorted(os.listdir(directory)) if f.endswith('.png')]
-        widths, heights = zip(*(i.size for i in images))
-        total_width = sum(widths)
-        max_height = max(heights)
-        
-        spritesheet = Image.new('RGBA', (total_width, max_height))
-        x_offset = 0
-        for im in images:
-            spritesheet.paste(im, (x_offset, 0))
-            x_offset += im.size[0]
-        
-        spritesheet.save(output_file)
+        return self.build_atlas([directory], output_file)
 
     def compress_spritesheet(self, input_file, output_file):
-        image = Image.open(input_file)
-        image.save(output_file, optimize=True, quality=95)
+        with Image.open(input_file) as image:
+            image.load()
+            save_image(image, output_file)
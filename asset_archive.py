@@ -0,0 +1,162 @@
+
+import io
+import mmap
+import os
+import struct
+import weakref
+
+MAGIC = b'GISFPAK1'
+HEADER = struct.Struct('<8sIQ')    # magic, entry count, index offset
+ENTRY = struct.Struct('<QQII')     # data offset, data size, name offset, name length
+ALIGNMENT = 16
+
+
+class AssetArchive:
+    # Read-only view of a .pak file. Entries are sorted by name so lookups are a binary search over the mmap.
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.mmap)
+        # Slices handed out by read() that are still alive, released on close so the mmap can
+        # actually be closed. Keyed by id: equal-content views would collapse in a WeakSet
+        self.exported = weakref.WeakValueDictionary()
+        magic, self.count, self.index_offset = HEADER.unpack_from(self.mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an asset archive")
+
+    def _entry(self, i):
+        return ENTRY.unpack_from(self.mmap, self.index_offset + i * ENTRY.size)
+
+    def _name(self, i):
+        _, _, name_offset, name_length = self._entry(i)
+        return self.mmap[name_offset:name_offset + name_length]
+
+    def _lower_bound(self, name):
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._name(mid) < name:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def find(self, path):
+        name = path.encode('utf-8')
+        i = self._lower_bound(name)
+        if i < self.count and self._name(i) == name:
+            return i
+        return None
+
+    def __contains__(self, path):
+        return self.find(path) is not None
+
+    def read(self, path):
+        i = self.find(path)
+        if i is None:
+            raise FileNotFoundError(path)
+        offset, size, _, _ = self._entry(i)
+        view = self.view[offset:offset + size]
+        self.exported[id(view)] = view
+        return view
+
+    def size(self, path):
+        i = self.find(path)
+        if i is None:
+            raise FileNotFoundError(path)
+        return self._entry(i)[1]
+
+    def listdir(self, directory):
+        prefix = directory.rstrip('/').encode('utf-8') + b'/'
+        names = set()
+        i = self._lower_bound(prefix)
+        while i < self.count:
+            name = self._name(i)
+            if not name.startswith(prefix):
+                break
+            names.add(name[len(prefix):].split(b'/', 1)[0].decode('utf-8'))
+            i += 1
+        return names
+
+    def isdir(self, directory):
+        prefix = directory.rstrip('/').encode('utf-8') + b'/'
+        i = self._lower_bound(prefix)
+        return i < self.count and self._name(i).startswith(prefix)
+
+    def close(self):
+        # Anything still holding a slice (cached audio, a decoder) gets a released view and
+        # raises ValueError on use instead of reading unmapped memory
+        for view in list(self.exported.values()):
+            try:
+                view.release()
+            except BufferError:
+                pass
+        self.exported.clear()
+        try:
+            self.view.release()
+            self.mmap.close()
+        except BufferError:
+            pass  # a view exported from a slice is still alive; the mapping goes when it does
+        self.file.close()
+
+
+class MemoryViewReader(io.RawIOBase):
+    # File-like wrapper so decoders can read straight out of the mapped archive
+    def __init__(self, view, name=None):
+        self.view = view
+        self.position = 0
+        self.name = name
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        size = min(len(buffer), len(self.view) - self.position)
+        buffer[:size] = self.view[self.position:self.position + size]
+        self.position += size
+        return size
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += len(self.view)
+        self.position = max(0, min(offset, len(self.view)))
+        return self.position
+
+    def tell(self):
+        return self.position
+
+
+def write_archive(output_file, files):
+    # files maps archive names ('assets/images/x.png') to source paths on disk
+    names = sorted(files, key=lambda name: name.encode('utf-8'))
+    entries = []
+    with open(output_file + '.tmp', 'wb') as out:
+        out.write(HEADER.pack(MAGIC, 0, 0))
+        for name in names:
+            out.write(b'\0' * (-out.tell() % ALIGNMENT))
+            offset = out.tell()
+            with open(files[name], 'rb') as f:
+                data = f.read()
+            out.write(data)
+            entries.append((offset, len(data)))
+
+        name_blob = b''.join(name.encode('utf-8') for name in names)
+        out.write(b'\0' * (-out.tell() % ALIGNMENT))
+        index_offset = out.tell()
+        name_offset = index_offset + len(names) * ENTRY.size
+        for name, (offset, size) in zip(names, entries):
+            encoded = name.encode('utf-8')
+            out.write(ENTRY.pack(offset, size, name_offset, len(encoded)))
+            name_offset += len(encoded)
+        out.write(name_blob)
+
+        out.seek(0)
+        out.write(HEADER.pack(MAGIC, len(names), index_offset))
+    os.replace(output_file + '.tmp', output_file)
+    return len(names)
@@ -0,0 +1,125 @@
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pyglet
+from PIL import Image
+from resource_cache import resources
+from virtual_fs import vfs
+
+
+def decode_image(path):
+    with vfs.open(path) as f, Image.open(f) as image:
+        # pyglet expects rows bottom-up
+        image = image.convert('RGBA').transpose(Image.Transpose.FLIP_TOP_BOTTOM)
+        return image.width, image.height, image.tobytes()
+
+def read_audio(path):
+    return vfs.read_bytes(path)
+
+
+class AssetLoader:
+    # Decodes on a worker pool, uploads textures on the main thread a few at a time per frame.
+    def __init__(self, max_workers=None, upload_budget=0.004):
+        self.max_workers = max_workers or min(8, os.cpu_count() or 2)
+        self.upload_budget = upload_budget
+        self.executor = None
+        self.pending = {}
+        self.errors = {}
+        self.total = 0
+        self.completed = 0
+        self.scheduled = False
+
+    @property
+    def progress(self):
+        return self.completed / self.total if self.total else 1.0
+
+    @property
+    def done(self):
+        return not self.pending
+
+    def preload(self, images=(), audio=()):
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='asset-loader')
+        if not self.pending:
+            self.total = self.completed = 0
+        for path in self.expand(images):
+            self.submit(('image', path), decode_image)
+        for path in audio:
+            self.submit(('audio', path), read_audio)
+        if self.pending and not self.scheduled:
+            pyglet.clock.schedule(self.upload)
+            self.scheduled = True
+
+    def expand(self, paths):
+        for path in paths:
+            if vfs.isdir(path):
+                for filename in vfs.listdir(path):
+                    if filename.endswith('.png'):
+                        yield os.path.join(path, filename)
+            else:
+                yield path
+
+    def submit(self, key, func):
+        if key in self.pending or key in resources:
+            return
+        self.pending[key] = self.executor.submit(func, key[1])
+        self.total += 1
+
+    def upload(self, dt=0):
+        deadline = time.perf_counter() + self.upload_budget
+        for key, future in list(self.pending.items()):
+            if future.done():
+                self.finish(key, future)
+                if time.perf_counter() > deadline:
+                    break
+        if not self.pending and self.scheduled:
+            pyglet.clock.unschedule(self.upload)
+            self.scheduled = False
+
+    def finish(self, key, future):
+        del self.pending[key]
+        self.completed += 1
+        kind, path = key
+        try:
+            result = future.result()
+        except Exception as e:
+            self.errors[path] = e
+            return
+        if kind == 'image':
+            width, height, data = result
+            result = pyglet.image.ImageData(width, height, 'RGBA', data).get_texture()
+        # Unreferenced until a manager acquires it, so it can still be evicted under memory pressure
+        resources.put(key, result)
+
+    def image(self, path):
+        key = ('image', path)
+        if key in self.pending:
+            self.finish(key, self.pending[key])
+        return resources.image(path)
+
+    def release_image(self, path):
+        resources.release_image(path)
+
+    def audio_data(self, path):
+        key = ('audio', path)
+        if key in self.pending:
+            self.finish(key, self.pending[key])
+        return resources.acquire(key, lambda: read_audio(path))
+
+    def release_audio_data(self, path):
+        # Audio is copied out by its consumer, so the raw bytes aren't kept around afterwards
+        resources.release(('audio', path))
+        resources.discard(('audio', path))
+
+    def shutdown(self):
+        if self.scheduled:
+            pyglet.clock.unschedule(self.upload)
+            self.scheduled = False
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+
+assets = AssetLoader()
@@ -1,36 +1,138 @@
 
 from pyo import *
 
+BUSES = ('music', 'sfx', 'speech')
+
+class Bus:
+    # Fixed chain: input -> [filter] -> dry, with echo and reverb as parallel sends, then pan/volume.
+    # Inserts are built once and only started while they are audible.
+    def __init__(self, volume=0.5, fade=0.05):
+        self.fade = fade
+        self.volume = SigTo(volume, time=fade, init=volume)
+        self.input = InputFader(Sig([0, 0]))
+
+        self.filter_freq = SigTo(20000, time=fade, init=20000)
+        self.filter_mix = SigTo(0, time=fade)
+        self.filter = Biquad(self.input, freq=self.filter_freq, type=0).stop()
+        self.dry = Selector([self.input, self.filter], voice=self.filter_mix)
+
+        self.echo_delay = SigTo(0.5, time=fade, init=0.5)
+        self.echo_feedback = SigTo(0.3, time=fade, init=0.3)
+        self.echo_wet = SigTo(0, time=fade)
+        self.echo = Delay(self.dry, delay=self.echo_delay, feedback=self.echo_feedback,
+                          maxdelay=2, mul=self.echo_wet).stop()
+
+        self.reverb_time = SigTo(0.5, time=fade, init=0.5)
+        self.reverb_cutoff = SigTo(10000, time=fade, init=10000)
+        self.reverb_wet = SigTo(0, time=fade)
+        self.reverb = STRev(self.dry, inpos=0.5, revtime=self.reverb_time, cutoff=self.reverb_cutoff,
+                            bal=1, mul=self.reverb_wet).stop()
+
+        self.pan = SigTo(0.5, time=fade, init=0.5)
+        self.mix = Mix([self.dry, self.echo, self.reverb], voices=2)
+        self.output = Pan(self.mix, outs=2, pan=self.pan, mul=self.volume).out()
+        self.meter = PeakAmp(self.output)
+
+        self.inserts = {'filter': (self.filter, self.filter_mix),
+                        'echo': (self.echo, self.echo_wet),
+                        'reverb': (self.reverb, self.reverb_wet)}
+        self.pending_stops = {}
+        self.retired_sources = []
+        self.source = None
+
+    def set_source(self, source, fade=None):
+        fade = self.fade if fade is None else fade
+        previous = self.source
+        self.source = source
+        self.input.setInput(source if source is not None else Sig([0, 0]), fade)
+        if previous is not None:
+            self.retired_sources = [c for c in self.retired_sources if c.isPlaying()]
+            self.retired_sources.append(CallAfter(previous.stop, fade + 0.01))
+
+    def set_insert(self, name, amount, fade=None):
+        obj, level = self.inserts[name]
+        fade = self.fade if fade is None else fade
+        level.time = fade
+        self.pending_stops.pop(name, None)
+        if amount > 0:
+            if not obj.isPlaying():
+                obj.play()
+        else:
+            # Stop processing once the fade-out is over
+            self.pending_stops[name] = CallAfter(lambda: level.value == 0 and obj.stop(), fade + 0.01)
+        level.value = amount
+
+    def active_inserts(self):
+        return [name for name, (obj, level) in self.inserts.items() if obj.isPlaying()]
+
+    def dsp_report(self):
+        # pyo has no per-object CPU counters; count the running DSP stages instead
+        inserts = self.active_inserts()
+        return {
+            'active_inserts': inserts,
+            'running_stages': 3 + len(inserts) + (self.source is not None),
+            'peak': self.meter.get(),
+        }
+
 class AudioMixer:
-    def __init__(self):
-        self.server = Server().boot().start()
-        self.music_volume = Sig(0.5)
-        self.sfx_volume = Sig(0.5)
-        self.speech_volume = Sig(0.5)
+    def __init__(self, audio='portaudio', server=None):
+        # audio='manual' or 'offline' runs without an audio device (tests, benchmarks)
+        self.server = server or Server(audio=audio, nchnls=2).boot().start()
+        self.buses = {name: Bus() for name in BUSES}
+        self.music_volume = self.buses['music'].volume
+        self.sfx_volume = self.buses['sfx'].volume
+        self.speech_volume = self.buses['speech'].volume
+        self.clocks = {}
+
+    def play(self, bus, file, loop=False, fade=None):
+        stream = SfPlayer(file, loop=loop)
+        self.buses[bus].set_source(stream, fade)
+        self._track(bus, file, loop)
+        return stream
+
+    def stop(self, bus, fade=None):
+        self.buses[bus].set_source(None, fade)
+        self._untrack(bus)
+
+    def _track(self, bus, file, loop):
+        # SfPlayer can't report where it is; a sample counter started with it runs on the same
+        # audio clock, so positions follow what has actually been rendered
+        self._untrack(bus)
+        info = sndinfo(file)
+        duration = info[1] if info else 0
+        wrap = int(duration * self.server.getSamplingRate()) if loop else 0
+        self.clocks[bus] = (Count(Trig().play(), max=wrap), duration, loop)
+
+    def _untrack(self, bus):
+        clock = self.clocks.pop(bus, None)
+        if clock is not None:
+            clock[0].stop()
+
+    def positions(self):
+        rate = self.server.getSamplingRate()
+        positions = {}
+        for bus, (counter, duration, loop) in self.clocks.items():
+            seconds = counter.get() / rate
+            positions[bus] = seconds if loop or not duration else min(seconds, duration)
+        return positions
 
     def play_music(self, file, loop=True):
-        self.stop_music()
-        self.music_stream = SfPlayer(file, loop=loop, mul=self.music_volume).out()
+        self.music_stream = self.play('music', file, loop)
 
     def stop_music(self):
-        if hasattr(self, 'music_stream'):
-            self.music_stream.stop()
+        self.stop('music')
 
     def play_sfx(self, file, loop=False):
-        self.stop_sfx()
-        self.sfx_stream = SfPlayer(file, loop=loop, mul=self.sfx_volume).out()
+        self.sfx_stream = self.play('sfx', file, loop)
 
     def stop_sfx(self):
-        if hasattr(self, 'sfx_stream'):
-            self.sfx_stream.stop()
+        self.stop('sfx')
 
     def play_speech(self, file, loop=False):
-        self.stop_speech()
-        self.speech_stream = SfPlayer(file, loop=loop, mul=self.speech_volume).out()
+        self.speech_stream = self.play('speech', file, loop)
 
     def stop_speech(self):
-        if hasattr(self, 'speech_stream'):
-            self.speech_stream.stop()
+        self.stop('speech')
 
     def set_music_volume(self, volume):
         self.music_volume.value = volume
@@ -41,20 +143,37 @@ class AudioMixer:
     def set_speech_volume(self, volume):
         self.speech_volume.value = volume
 
-    def apply_reverb(self, room_size=0.5, damping=0.5, wet=0.3):
-        self.music_stream = STRev(self.music_stream, inpos=0.5, revtime=room_size, cutoff=damping, bal=wet).out()
-
-    def apply_echo(self, delay_time=0.5, feedback=0.3):
-        self.music_stream = Delay(self.music_stream, delay=delay_time, feedback=feedback).out()
-
-    def apply_filter(self, cutoff_freq, filter_type='low'):
-        if filter_type == 'low':
-            self.music_stream = ButLP(self.music_stream, freq=cutoff_freq).out()
-        elif filter_type == 'high':
-            self.music_stream = ButHP(self.music_stream, freq=cutoff_freq).out()
-
-    def apply_panning(self, pan=0.5):
-        self.music_stream = Pan(self.music_stream, outs=2, pan=pan).out()
+    def apply_reverb(self, room_size=0.5, damping=0.5, wet=0.3, bus='music', fade=None):
+        target = self.buses[bus]
+        target.reverb_time.value = room_size
+        target.reverb_cutoff.value = 200 + (1 - damping) * 19800
+        target.set_insert('reverb', wet, fade)
+
+    def apply_echo(self, delay_time=0.5, feedback=0.3, wet=0.5, bus='music', fade=None):
+        target = self.buses[bus]
+        target.echo_delay.value = delay_time
+        target.echo_feedback.value = feedback
+        target.set_insert('echo', wet, fade)
+
+    def apply_filter(self, cutoff_freq, filter_type='low', bus='music', fade=None):
+        target = self.buses[bus]
+        target.filter.type = 0 if filter_type == 'low' else 1
+        target.filter_freq.value = cutoff_freq
+        target.set_insert('filter', 1, fade)
+
+    def apply_panning(self, pan=0.5, bus='music'):
+        self.buses[bus].pan.value = pan
+
+    def remove_effect(self, name, bus='music', fade=None):
+        self.buses[bus].set_insert(name, 0, fade)
+
+    def clear_effects(self, bus='music', fade=None):
+        for name in ('filter', 'echo', 'reverb'):
+            self.remove_effect(name, bus, fade)
+        self.apply_panning(0.5, bus)
+
+    def dsp_report(self):
+        return {name: bus.dsp_report() for name, bus in self.buses.items()}
 
     def stop_all(self):
         self.stop_music()
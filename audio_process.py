@@ -0,0 +1,196 @@
+
+import multiprocessing
+from collections import deque
+import pickle
+import struct
+import time
+from multiprocessing import shared_memory
+
+COUNTERS = struct.Struct('<QQ')   # head (written by producer), tail (written by consumer)
+RECORD = struct.Struct('<I')
+DATA_OFFSET = 64
+WRAP = 0xFFFFFFFF
+STATUS_INTERVAL = 1 / 30
+
+
+class SharedRing:
+    # Single-producer/single-consumer byte ring in shared memory. Head and tail are monotonic
+    # counters that are each written by only one side, so no lock is needed.
+    def __init__(self, name=None, capacity=1 << 16):
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=DATA_OFFSET + capacity)
+            COUNTERS.pack_into(self.shm.buf, 0, 0, 0)
+            self.owner = True
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+        self.name = self.shm.name
+        self.capacity = self.shm.size - DATA_OFFSET
+        self.buf = self.shm.buf
+
+    def counters(self):
+        return COUNTERS.unpack_from(self.buf, 0)
+
+    def write(self, payload):
+        size = RECORD.size + len(payload)
+        head, tail = self.counters()
+        position = head % self.capacity
+        padding = self.capacity - position if self.capacity - position < size else 0
+        if size + padding > self.capacity - (head - tail):
+            return False
+        if padding:
+            if padding >= RECORD.size:
+                RECORD.pack_into(self.buf, DATA_OFFSET + position, WRAP)
+            head += padding
+            position = 0
+        RECORD.pack_into(self.buf, DATA_OFFSET + position, len(payload))
+        start = DATA_OFFSET + position + RECORD.size
+        self.buf[start:start + len(payload)] = payload
+        # Publish only after the payload is in place
+        struct.pack_into('<Q', self.buf, 0, head + size)
+        return True
+
+    def read_all(self):
+        head, tail = self.counters()
+        records = []
+        while tail < head:
+            position = tail % self.capacity
+            if self.capacity - position < RECORD.size:
+                tail += self.capacity - position
+                continue
+            (length,) = RECORD.unpack_from(self.buf, DATA_OFFSET + position)
+            if length == WRAP:
+                tail += self.capacity - position
+                continue
+            start = DATA_OFFSET + position + RECORD.size
+            records.append(bytes(self.buf[start:start + length]))
+            tail += RECORD.size + length
+        struct.pack_into('<Q', self.buf, 8, tail)
+        return records
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def run_engine(command_ring_name, status_ring_name, audio):
+    # Imported here so the game process never loads pyo
+    from audio_mixer import AudioMixer
+
+    commands = SharedRing(command_ring_name)
+    status = SharedRing(status_ring_name)
+    mixer = AudioMixer(audio=audio)
+    errors = []
+    next_status = 0.0
+    running = True
+    while running:
+        for record in commands.read_all():
+            name, args, kwargs = pickle.loads(record)
+            if name == 'shutdown':
+                running = False
+                break
+            try:
+                getattr(mixer, name)(*args, **kwargs)
+            except Exception as error:
+                # A bad command (missing file, unknown bus) must not take the audio down with it
+                errors.append((name, repr(error)))
+
+        if audio == 'manual':
+            mixer.server.process()
+
+        now = time.monotonic()
+        if now >= next_status:
+            next_status = now + STATUS_INTERVAL
+            report = {
+                'meters': {name: bus.meter.get() for name, bus in mixer.buses.items()},
+                'positions': mixer.positions(),
+                'dsp': mixer.dsp_report(),
+                'errors': errors,
+            }
+            if status.write(pickle.dumps(report)):
+                errors = []
+        time.sleep(0.002)
+
+    mixer.shutdown()
+    commands.close()
+    status.close()
+
+
+def _command(name):
+    def send(self, *args, **kwargs):
+        self.send(name, *args, **kwargs)
+    send.__name__ = name
+    return send
+
+
+class RemoteAudioMixer:
+    # Same interface as AudioMixer; every call is queued to the audio process and never blocks
+    def __init__(self, audio='portaudio', capacity=1 << 16):
+        self.commands = SharedRing(capacity=capacity)
+        self.status = SharedRing(capacity=capacity)
+        context = multiprocessing.get_context('spawn')
+        self.process = context.Process(target=run_engine, args=(self.commands.name, self.status.name, audio),
+                                       name='audio-engine', daemon=True)
+        self.process.start()
+        self.meters = {}
+        self.latest_positions = {}
+        self.latest_dsp = {}
+        self.errors = deque(maxlen=32)
+        self.dropped = 0
+
+    def send(self, name, *args, **kwargs):
+        if not self.commands.write(pickle.dumps((name, args, kwargs))):
+            self.dropped += 1
+
+    def poll(self):
+        for record in self.status.read_all():
+            report = pickle.loads(record)
+            self.meters = report['meters']
+            self.latest_positions = report['positions']
+            self.latest_dsp = report['dsp']
+            for name, error in report['errors']:
+                self.errors.append((name, error))
+                print(f"Audio engine: {name} failed: {error}")
+
+    play = _command('play')
+    stop = _command('stop')
+    play_music = _command('play_music')
+    stop_music = _command('stop_music')
+    play_sfx = _command('play_sfx')
+    stop_sfx = _command('stop_sfx')
+    play_speech = _command('play_speech')
+    stop_speech = _command('stop_speech')
+    set_music_volume = _command('set_music_volume')
+    set_sfx_volume = _command('set_sfx_volume')
+    set_speech_volume = _command('set_speech_volume')
+    apply_reverb = _command('apply_reverb')
+    apply_echo = _command('apply_echo')
+    apply_filter = _command('apply_filter')
+    apply_panning = _command('apply_panning')
+    remove_effect = _command('remove_effect')
+    clear_effects = _command('clear_effects')
+    stop_all = _command('stop_all')
+
+    def positions(self):
+        # As of the last poll(), at most STATUS_INTERVAL old
+        return self.latest_positions
+
+    def dsp_report(self):
+        return self.latest_dsp
+
+    def shutdown(self, timeout=2.0):
+        self.send('shutdown')
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.commands.close()
+        self.status.close()
+
+
+def create_audio_mixer(out_of_process=True, audio='portaudio'):
+    if out_of_process:
+        return RemoteAudioMixer(audio=audio)
+    from audio_mixer import AudioMixer
+    return AudioMixer(audio=audio)
@@ -0,0 +1,65 @@
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dialogue_db import DialogueDatabase, DialogueDatabaseBuilder
+
+
+def generate_script(rooms, interactions, characters, lines):
+    script = {}
+    for r in range(rooms):
+        script[f"room{r}"] = {
+            f"interaction{i}": {
+                f"char{c}": [f"Line {n} of interaction {i} in room {r}, spoken by char{c}." for n in range(lines)]
+                for c in range(characters)
+            }
+            for i in range(interactions)
+        }
+    return script
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare room-load time of dialogue JSON against the compiled database")
+    parser.add_argument('--rooms', type=int, default=50)
+    parser.add_argument('--interactions', type=int, default=100)
+    parser.add_argument('--characters', type=int, default=4)
+    parser.add_argument('--lines', type=int, default=10)
+    args = parser.parse_args()
+
+    script = generate_script(args.rooms, args.interactions, args.characters, args.lines)
+    with tempfile.TemporaryDirectory() as directory:
+        json_file = os.path.join(directory, "dialogue.json")
+        db_file = os.path.join(directory, "dialogue.db")
+        with open(json_file, 'w') as f:
+            json.dump(script, f, indent=4)
+        builder = DialogueDatabaseBuilder()
+        for room_name, dialogue in script.items():
+            builder.add_room(room_name, dialogue)
+        builder.save(db_file)
+
+        start = time.perf_counter()
+        with open(json_file, 'r') as f:
+            lines = json.load(f)["room0"]["interaction0"]["char0"]
+        json_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        database = DialogueDatabase(db_file)
+        db_lines = database.lines("room0", "interaction0", "char0")
+        db_time = time.perf_counter() - start
+        database.close()
+
+        assert [text for text, _ in db_lines] == lines
+        total = args.rooms * args.interactions * args.characters * args.lines
+        print(f"{total} lines, json {os.path.getsize(json_file) / 1e6:.1f} MB, db {os.path.getsize(db_file) / 1e6:.1f} MB")
+        print(f"json.load + lookup:   {json_time * 1000:.2f} ms")
+        print(f"database first query: {db_time * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import traceback
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pyglet
+
+# Must be set before anything creates a window or GL context
+if '--display' not in sys.argv:
+    pyglet.options['headless'] = True
+
+DEFAULT_BASELINE = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+CASES = []
+
+
+def case(name, sizes, repeat=20):
+    # setup(n, workdir) returns the callable that is timed; anything it builds is excluded
+    def register(setup):
+        CASES.append((name, sizes, repeat, setup))
+        return setup
+    return register
+
+
+def make_images(directory, count, size=64):
+    from PIL import Image
+    os.makedirs(directory, exist_ok=True)
+    for i in range(count):
+        Image.new('RGBA', (size, size), (i % 256, 64, 128, 255)).save(os.path.join(directory, f"frame_{i:04d}.png"))
+    return directory
+
+
+def make_script(interactions, characters=4, lines=10):
+    return {
+        f"interaction{i}": {
+            f"char{c}": [f"Line {n} of interaction {i}, spoken by char{c}." for n in range(lines)]
+            for c in range(characters)
+        }
+        for i in range(interactions)
+    }
+
+
+def make_sprites(count):
+    image = pyglet.image.SolidColorImagePattern((255, 255, 255, 255)).create_image(16, 16)
+    batch = pyglet.graphics.Batch()
+    return [pyglet.sprite.Sprite(image, x=i % 800, y=i % 600, batch=batch) for i in range(count)], batch
+
+
+@case('tweens.update', sizes=(1000, 10000))
+def bench_tweens(n, workdir):
+    from tweening_manager import TweeningManager
+    sprites, _ = make_sprites(n)
+    manager = TweeningManager()
+    for i, sprite in enumerate(sprites):
+        # Long enough that nothing finishes during the run
+        manager.tween_position(sprite, (0, 0), (800, 600), 1e6, easing='cubic_in_out' if i % 2 else 'linear')
+    return lambda: manager.update(1 / 60)
+
+
+@case('layers.add_object', sizes=(1000, 10000), repeat=5)
+def bench_layer_add(n, workdir):
+    from layer_manager import LayerManager
+    from game_elements import GameCharacter
+    image = pyglet.image.SolidColorImagePattern((255, 255, 255, 255)).create_image(16, 16)
+    # Fresh sprites every run (warm-up + 5 repeats); re-adding batched ones would time migrations
+    sets = [[GameCharacter(image, x=i % 800, y=i % 600, layer=i % 8) for i in range(n)] for _ in range(6)]
+
+    def run():
+        manager = LayerManager()
+        for character in sets.pop():
+            manager.add_object(character)
+    return run
+
+
+@case('layers.draw', sizes=(1000, 10000))
+def bench_layer_draw(n, workdir):
+    from layer_manager import LayerManager
+    from game_elements import GameCharacter
+    window = get_window()
+    image = pyglet.image.SolidColorImagePattern((255, 255, 255, 255)).create_image(16, 16)
+    manager = LayerManager()
+    for i in range(n):
+        manager.add_object(GameCharacter(image, x=i % 800, y=i % 600, layer=i % 8))
+
+    def run():
+        window.clear()
+        manager.draw()
+        # Wait for the GPU so the timing includes the actual draw
+        pyglet.gl.glFinish()
+    return run
+
+
+@case('render.post_process', sizes=(1, 3))
+def bench_post_process(n, workdir):
+    from shader_manager import ShaderManager
+    window = get_window()
+    shader_manager = ShaderManager()
+    post = shader_manager.create_post_process(window, scale=0.5)
+    for name in ('crt', 'bloom', 'vignette')[:n]:
+        post.add_pass(name)
+    sprites, batch = make_sprites(500)
+
+    def run():
+        shader_manager.begin_frame()
+        window.clear()
+        batch.draw()
+        shader_manager.end_frame()
+        pyglet.gl.glFinish()
+    return run
+
+
+@case('animation.crowd_update', sizes=(100, 1000))
+def bench_crowd(n, workdir):
+    from animation_instancing import CrowdAnimator
+    window = get_window()
+    colors = [(255, 0, 0, 255), (0, 255, 0, 255), (0, 0, 255, 255), (255, 255, 0, 255)]
+    frames = [pyglet.image.AnimationFrame(pyglet.image.SolidColorImagePattern(c).create_image(32, 32), 0.1)
+              for c in colors]
+    crowd = CrowdAnimator(pyglet.image.Animation(frames), capacity=n)
+    for i in range(n):
+        crowd.add(i * 7 % 800, i * 13 % 600, speed=0.5 + (i % 10) / 10, offset=i * 0.01)
+
+    def run():
+        crowd.update(1 / 60)
+        window.clear()
+        crowd.draw()
+        pyglet.gl.glFinish()
+    return run
+
+
+@case('animation.load_animation', sizes=(32, 256), repeat=5)
+def bench_load_animation(n, workdir):
+    from animation_manager import AnimationManager
+    from resource_cache import resources
+    directory = make_images(os.path.join(workdir, f"anim_{n}"), n)
+    manager = AnimationManager()
+
+    def run():
+        manager.load_animation('bench', directory, 0.1)
+        manager.release_animation('bench')
+        # Measure the cold path, not cache hits
+        budget = resources.budget
+        resources.set_budget(0)
+        resources.budget = budget
+    return run
+
+
+@case('animation.generate_spritesheet', sizes=(32, 256), repeat=3)
+def bench_spritesheet(n, workdir):
+    from animation_manager import AnimationManager
+    directory = make_images(os.path.join(workdir, f"sheet_{n}"), n)
+    manager = AnimationManager()
+    return lambda: manager.generate_spritesheet(directory, os.path.join(workdir, f"sheet_{n}.png"))
+
+
+@case('dialogue.generate_filenames', sizes=(100, 1000))
+def bench_dialogue_filenames(n, workdir):
+    from dialogue_manager import DialogueManager
+    manager = DialogueManager('room1')
+    manager.dialogue = make_script(n)
+    return manager.generate_filenames
+
+
+@case('dialogue.export_json', sizes=(100, 1000), repeat=5)
+def bench_dialogue_export(n, workdir):
+    from dialogue_manager import DialogueManager
+    manager = DialogueManager('room1')
+    manager.dialogue = make_script(n)
+    return lambda: manager.export_dialogue_json(os.path.join(workdir, f"dialogue_{n}.json"))
+
+
+@case('save.round_trip', sizes=(1000, 20000), repeat=10)
+def bench_save(n, workdir):
+    from save_game import SaveGame
+    save_game = SaveGame(None, directory=os.path.join(workdir, f"saves_{n}"))
+    state = {'room': 'room1', 'character': {'x': 0, 'y': 0}, 'flags': {f"flag{i}": i for i in range(n)}}
+
+    def run():
+        state['character']['x'] += 1
+        save_game.save(state)
+        save_game.load()
+    return run
+
+
+@case('room1.construct', sizes=(1,), repeat=3)
+def bench_room1(n, workdir):
+    from room1 import Room1
+    window = get_window()
+
+    def run():
+        room = Room1(window)
+        room.cleanup()
+    return run
+
+
+_window = None
+
+def get_window():
+    global _window
+    if _window is None:
+        _window = pyglet.window.Window(width=800, height=600, visible=False)
+    return _window
+
+
+def measure(function, repeat):
+    function()  # warm-up
+    gc.collect()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        'median_ms': statistics.median(samples),
+        'p95_ms': samples[min(len(samples) - 1, int(0.95 * len(samples)))],
+        'min_ms': samples[0],
+        'runs': repeat,
+    }
+
+
+def run_cases(selected, quick):
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, sizes, repeat, setup in CASES:
+            if selected and not any(name.startswith(s) for s in selected):
+                continue
+            for n in sizes[:1] if quick else sizes:
+                key = f"{name}[{n}]"
+                cwd = os.getcwd()
+                os.chdir(ROOT)
+                try:
+                    results[key] = measure(setup(n, workdir), max(1, repeat // 4) if quick else repeat)
+                    results[key]['per_item_us'] = results[key]['median_ms'] * 1000 / n
+                except Exception as e:
+                    # Missing optional backends or assets skip the case instead of aborting the suite
+                    results[key] = {'error': f"{type(e).__name__}: {e}"}
+                    if os.environ.get('BENCH_TRACEBACK'):
+                        traceback.print_exc()
+                finally:
+                    os.chdir(cwd)
+                print_result(key, results[key])
+    return results
+
+
+def print_result(key, result):
+    if 'error' in result:
+        print(f"{key:<40} skipped ({result['error']})")
+    else:
+        print(f"{key:<40} {result['median_ms']:10.3f} ms  p95 {result['p95_ms']:10.3f} ms")
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for key, result in results.items():
+        before = baseline.get('results', {}).get(key)
+        if not before or 'error' in before or 'error' in result:
+            continue
+        change = result['median_ms'] / before['median_ms'] - 1 if before['median_ms'] else 0.0
+        result['baseline_ms'] = before['median_ms']
+        result['change'] = change
+        marker = ''
+        if change > threshold:
+            regressions.append(key)
+            marker = '  REGRESSION'
+        print(f"{key:<40} {before['median_ms']:10.3f} -> {result['median_ms']:10.3f} ms ({change:+.1%}){marker}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the engine benchmarks headless and compare against a baseline")
+    parser.add_argument('cases', nargs='*', help="Only run cases whose name starts with one of these")
+    parser.add_argument('--output', help="Write results to this JSON file")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Baseline JSON to compare against")
+    parser.add_argument('--save-baseline', action='store_true', help="Store these results as the new baseline")
+    parser.add_argument('--threshold', type=float, default=0.15, help="Relative slowdown reported as a regression")
+    parser.add_argument('--quick', action='store_true', help="Smallest size only, fewer runs")
+    parser.add_argument('--display', action='store_true', help="Use a real window instead of headless EGL")
+    args = parser.parse_args()
+
+    report = {
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'pyglet': pyglet.version,
+        'machine': platform.platform(),
+        'results': run_cases(args.cases, args.quick),
+    }
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, 'r') as f:
+            regressions = compare(report['results'], json.load(f), args.threshold)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=4)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=4)
+        print(f"Baseline written to {args.baseline}")
+
+    if regressions:
+        print(f"{len(regressions)} regression(s) over {args.threshold:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,450 @@
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from PIL import Image
+
+from asset_archive import write_archive
+from dialogue_db import DialogueDatabaseBuilder
+from hotspots import mask_from_image, mask_path, write_mask
+from lip_sync import compile_cues, write_pack
+from package_assets import collect_files
+from rhubarb_integration import hash_file
+from texture_atlas import TextureAtlasBuilder, save_image
+from texture_residency import TEXTURE_INDEX, VARIANT_SCALES, variant_path
+
+BAKE_VERSION = 2   # bump when a builder writes different output for the same inputs
+MANIFEST_FILE = '.bake_manifest.json'
+TRANSCODED_AUDIO = ('.wav', '.aif', '.aiff')
+OPUS_BITRATE = '96k'
+BLEED_PASSES = 4
+VARIANT_MIN_SIZE = 512   # smaller images aren't worth a downscaled copy
+
+# Source layout, relative to the source root:
+#   atlases/<atlas>/<animation>/*.png   -> assets/images/<atlas>_atlas.png + .json
+#   dialogue/<room>_dialogue.json       -> dialogue_files/ (copied) + dialogue_files/dialogue.db
+#   lip_sync/<room>/*.json              -> assets/lip_sync_data/<room>.lip
+#   anything else                       -> assets/<same path>; .png gets edge bleeding, recompression
+#                                          and name@0.5x.png variants, .wav/.aif becomes .opus, the rest is copied
+
+class Step:
+    __slots__ = ('name', 'kind', 'inputs', 'outputs', 'params', 'deps')
+
+    def __init__(self, name, kind, inputs, outputs, params=None, deps=()):
+        self.name = name
+        self.kind = kind
+        self.inputs = inputs   # paths, or a callable resolved once every dependency has finished
+        self.outputs = outputs
+        self.params = params or {}
+        self.deps = tuple(deps)
+
+
+def bleed_alpha(image, passes=BLEED_PASSES):
+    # Fully transparent pixels take the average colour of their opaque neighbours, so linear
+    # filtering at sprite edges blends toward the sprite instead of toward black
+    pixels = np.array(image.convert('RGBA'))
+    filled = pixels[..., 3] > 0
+    if filled.all() or not filled.any():
+        return image
+    rgb = pixels[..., :3].astype(np.float32)
+    height, width = filled.shape
+    for _ in range(passes):
+        padded_rgb = np.pad(rgb * filled[..., None], ((1, 1), (1, 1), (0, 0)))
+        padded = np.pad(filled, 1).astype(np.float32)
+        total = np.zeros_like(rgb)
+        count = np.zeros(filled.shape, dtype=np.float32)
+        for dy in (-1, 0, 1):
+            for dx in (-1, 0, 1):
+                if dy or dx:
+                    total += padded_rgb[1 + dy:1 + dy + height, 1 + dx:1 + dx + width]
+                    count += padded[1 + dy:1 + dy + height, 1 + dx:1 + dx + width]
+        grow = ~filled & (count > 0)
+        if not grow.any():
+            break
+        rgb[grow] = total[grow] / count[grow, None]
+        filled |= grow
+    # Pixels too far from any edge are zeroed, which also compresses better
+    pixels[..., :3] = np.where(filled[..., None], np.rint(rgb), 0).astype(np.uint8)
+    return Image.fromarray(pixels, 'RGBA')
+
+
+def temp_path(output):
+    root, ext = os.path.splitext(output)
+    return f"{root}.tmp{ext}"
+
+
+def bake_texture(inputs, outputs, params):
+    with Image.open(inputs[0]) as image:
+        image.load()
+    written = [outputs[0]]
+    if image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info:
+        # Sprites with alpha get their hit-test mask here rather than on first use in the game
+        target = mask_path(outputs[0])
+        temp = temp_path(target)
+        write_mask(temp, mask_from_image(image))
+        os.replace(temp, target)
+        written.append(target)
+        image = bleed_alpha(image, params.get('bleed', BLEED_PASSES))
+    temp = temp_path(outputs[0])
+    save_image(image, temp)
+    os.replace(temp, outputs[0])
+    # Bleeding first keeps the resampled edges from darkening
+    if max(image.size) >= params.get('variant_min_size', VARIANT_MIN_SIZE):
+        for scale in params.get('variants', ()):
+            size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+            target = variant_path(outputs[0], scale)
+            temp = temp_path(target)
+            save_image(image.resize(size, Image.Resampling.LANCZOS), temp)
+            os.replace(temp, target)
+            written.append(target)
+    return written
+
+
+def bake_atlas(inputs, outputs, params):
+    builder = TextureAtlasBuilder(max_size=params['max_size'], padding=params['padding'], trim=params['trim'])
+    for directory in params['directories']:
+        builder.add_directory(directory)
+    index_file = builder.save(outputs[0])
+    with open(index_file, 'r') as f:
+        index = json.load(f)
+    # Large atlases spill into numbered pages, so the real outputs are only known afterwards
+    root = os.path.splitext(index_file)[0]
+    masks = [mask_path(os.path.join(root, name)) for name in index['frames']]
+    return [os.path.join(os.path.dirname(index_file), page) for page in index['pages']] + masks + [index_file]
+
+
+def bake_audio(inputs, outputs, params):
+    temp = temp_path(outputs[0])
+    result = subprocess.run([params['ffmpeg'], '-y', '-loglevel', 'error', '-i', inputs[0],
+                             '-c:a', 'libopus', '-b:a', params['bitrate'], temp], capture_output=True)
+    if result.returncode != 0:
+        if os.path.exists(temp):
+            os.remove(temp)
+        lines = result.stderr.decode(errors='replace').strip().splitlines()
+        raise RuntimeError(lines[-1] if lines else f"ffmpeg exit code {result.returncode}")
+    os.replace(temp, outputs[0])
+    return outputs
+
+
+def bake_copy(inputs, outputs, params):
+    temp = temp_path(outputs[0])
+    shutil.copyfile(inputs[0], temp)
+    os.replace(temp, outputs[0])
+    return outputs
+
+
+def bake_dialogue(inputs, outputs, params):
+    builder = DialogueDatabaseBuilder()
+    for json_file in inputs:
+        builder.add_json(os.path.basename(json_file).split('_dialogue')[0], json_file)
+    temp = temp_path(outputs[0])
+    builder.save(temp)
+    os.replace(temp, outputs[0])
+    return outputs
+
+
+def bake_lip_sync(inputs, outputs, params):
+    timelines = {}
+    for json_file in inputs:
+        with open(json_file, 'r') as f:
+            timelines[os.path.splitext(os.path.basename(json_file))[0]] = compile_cues(json.load(f))
+    temp = temp_path(outputs[0])
+    write_pack(temp, timelines)
+    os.replace(temp, outputs[0])
+    return outputs
+
+
+def bake_texture_index(inputs, outputs, params):
+    # Source sizes let the game pick a variant per image without opening it
+    sizes = {}
+    for path, name in zip(inputs, params['names']):
+        with Image.open(path) as image:
+            sizes[name] = list(image.size)
+    temp = temp_path(outputs[0])
+    with open(temp, 'w') as f:
+        json.dump(sizes, f, sort_keys=True)
+    os.replace(temp, outputs[0])
+    return outputs
+
+
+def bake_archive(inputs, outputs, params):
+    files = {os.path.relpath(path, params['root']).replace(os.sep, '/'): path for path in inputs}
+    temp = temp_path(outputs[0])
+    write_archive(temp, files)
+    os.replace(temp, outputs[0])
+    return outputs
+
+
+BUILDERS = {
+    'texture': bake_texture,
+    'atlas': bake_atlas,
+    'audio': bake_audio,
+    'copy': bake_copy,
+    'dialogue': bake_dialogue,
+    'lip_sync': bake_lip_sync,
+    'texture_index': bake_texture_index,
+    'archive': bake_archive,
+}
+
+
+def run_builder(kind, inputs, outputs, params):
+    # Runs in a worker process
+    start = time.perf_counter()
+    for output in outputs:
+        os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    written = BUILDERS[kind](inputs, outputs, params)
+    return written, time.perf_counter() - start
+
+
+def list_files(directory, extension):
+    if not os.path.isdir(directory):
+        return []
+    return [os.path.join(directory, f) for f in sorted(os.listdir(directory))
+            if f.endswith(extension) and not f.startswith('.')]
+
+
+def build_graph(source, output, atlas_options, ffmpeg=None, pack=None):
+    steps = []
+    warnings = []
+    assets_dir = os.path.join(output, 'assets')
+
+    atlases_dir = os.path.join(source, 'atlases')
+    for atlas in sorted(os.listdir(atlases_dir)) if os.path.isdir(atlases_dir) else []:
+        atlas_dir = os.path.join(atlases_dir, atlas)
+        directories = [os.path.join(atlas_dir, d) for d in sorted(os.listdir(atlas_dir))
+                       if os.path.isdir(os.path.join(atlas_dir, d))]
+        inputs = [path for directory in directories for path in list_files(directory, '.png')]
+        if inputs:
+            target = os.path.join(assets_dir, 'images', f"{atlas}_atlas.png")
+            steps.append(Step(target, 'atlas', inputs, [target],
+                              dict(atlas_options, directories=directories)))
+
+    dialogue_files = list_files(os.path.join(source, 'dialogue'), '_dialogue.json')
+    if dialogue_files:
+        dialogue_dir = os.path.join(output, 'dialogue_files')
+        for json_file in dialogue_files:
+            target = os.path.join(dialogue_dir, os.path.basename(json_file))
+            steps.append(Step(target, 'copy', [json_file], [target]))
+        target = os.path.join(dialogue_dir, 'dialogue.db')
+        steps.append(Step(target, 'dialogue', dialogue_files, [target]))
+
+    lip_sync_dir = os.path.join(source, 'lip_sync')
+    for room in sorted(os.listdir(lip_sync_dir)) if os.path.isdir(lip_sync_dir) else []:
+        inputs = [f for f in list_files(os.path.join(lip_sync_dir, room), '.json')
+                  if not os.path.basename(f).startswith('rhubarb_manifest')]
+        if inputs:
+            target = os.path.join(assets_dir, 'lip_sync_data', f"{room}.lip")
+            steps.append(Step(target, 'lip_sync', inputs, [target]))
+
+    special = {atlases_dir, os.path.join(source, 'dialogue'), lip_sync_dir}
+    textures = []
+    for path in collect_files(source).values():
+        if any(path.startswith(directory + os.sep) for directory in special):
+            continue
+        relative = os.path.relpath(path, source)
+        root, ext = os.path.splitext(relative)
+        ext = ext.lower()
+        if ext == '.png':
+            target = os.path.join(assets_dir, relative)
+            steps.append(Step(target, 'texture', [path], [target],
+                              {'bleed': BLEED_PASSES, 'variants': list(VARIANT_SCALES),
+                               'variant_min_size': VARIANT_MIN_SIZE}))
+            textures.append((path, os.path.relpath(target, output).replace(os.sep, '/')))
+        elif ext in TRANSCODED_AUDIO:
+            if ffmpeg is None:
+                warnings.append(f"{path}: ffmpeg not found, not transcoded")
+                continue
+            target = os.path.join(assets_dir, root + '.opus')
+            steps.append(Step(target, 'audio', [path], [target], {'ffmpeg': ffmpeg, 'bitrate': OPUS_BITRATE}))
+        else:
+            target = os.path.join(assets_dir, relative)
+            steps.append(Step(target, 'copy', [path], [target]))
+
+    if textures:
+        target = os.path.join(output, TEXTURE_INDEX)
+        steps.append(Step(target, 'texture_index', [path for path, _ in textures], [target],
+                          {'names': [name for _, name in textures]}))
+
+    if pack:
+        # Packs everything under assets/, baked or not, once every other step has written its files
+        target = os.path.join(output, pack)
+        steps.append(Step(target, 'archive', lambda: sorted(collect_files(assets_dir).values()), [target],
+                          {'root': output}, deps=[step.name for step in steps]))
+    return steps, warnings
+
+
+class ContentHasher:
+    # Content hashes, reusing the previous run's hash for files whose size and mtime are unchanged
+    def __init__(self, previous, workers):
+        self.previous = previous
+        self.files = {}
+        self.workers = workers
+
+    def hash_one(self, path):
+        stat = os.stat(path)
+        entry = self.previous.get(path)
+        if not (entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime):
+            entry = {'size': stat.st_size, 'mtime': stat.st_mtime, 'hash': hash_file(path)}
+        return path, entry
+
+    def hash_all(self, paths):
+        missing = [path for path in dict.fromkeys(paths) if path not in self.files]
+        # hashlib releases the GIL on large buffers, so threads are enough here
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            self.files.update(executor.map(self.hash_one, missing))
+
+    def step_key(self, step, inputs):
+        self.hash_all(inputs)
+        digest = hashlib.sha256()
+        digest.update(json.dumps([BAKE_VERSION, step.kind, step.params, step.outputs], sort_keys=True).encode())
+        for path in inputs:
+            digest.update(f"{path}\0{self.files[path]['hash']}\0".encode())
+        return digest.hexdigest()
+
+
+def load_manifest(output):
+    try:
+        with open(os.path.join(output, MANIFEST_FILE), 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_manifest(output, manifest):
+    path = os.path.join(output, MANIFEST_FILE)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=4, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+def bake(steps, output, jobs=None, force=False):
+    jobs = jobs or os.cpu_count() or 1
+    manifest = load_manifest(output)
+    previous_steps = {} if force else manifest.get('steps', {})
+    hasher = ContentHasher(manifest.get('files', {}), jobs)
+    hasher.hash_all(path for step in steps if not callable(step.inputs) for path in step.inputs)
+
+    baked = {}
+    results = []   # (step, status, seconds, error)
+    finished = set()
+    failed = set()
+    pending = list(steps)
+    running = {}
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        while pending or running:
+            waiting = []
+            for step in pending:
+                if any(dep in failed for dep in step.deps):
+                    failed.add(step.name)
+                    results.append((step, 'failed', 0.0, 'a dependency failed'))
+                elif all(dep in finished for dep in step.deps):
+                    inputs = step.inputs() if callable(step.inputs) else step.inputs
+                    key = hasher.step_key(step, inputs)
+                    previous = previous_steps.get(step.name)
+                    if (previous and previous['key'] == key
+                            and all(os.path.exists(path) for path in previous['outputs'])):
+                        baked[step.name] = previous
+                        finished.add(step.name)
+                        results.append((step, 'skipped', 0.0, None))
+                    else:
+                        future = pool.submit(run_builder, step.kind, inputs, step.outputs, step.params)
+                        running[future] = (step, key)
+                else:
+                    waiting.append(step)
+            pending = waiting
+            if not running:
+                if pending:
+                    raise ValueError(f"Unresolvable dependencies: {', '.join(s.name for s in pending)}")
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                step, key = running.pop(future)
+                try:
+                    written, seconds = future.result()
+                except Exception as e:
+                    failed.add(step.name)
+                    results.append((step, 'failed', 0.0, f"{type(e).__name__}: {e}"))
+                    continue
+                baked[step.name] = {'key': key, 'kind': step.kind, 'outputs': written}
+                finished.add(step.name)
+                results.append((step, 'built', seconds, None))
+
+    # Outputs of steps whose sources were deleted; an archive from an earlier --pack run is kept
+    current = {path for entry in baked.values() for path in entry['outputs']}
+    current.update(path for step in steps for path in step.outputs)
+    stale = []
+    for name, entry in manifest.get('steps', {}).items():
+        if name in baked or name in failed:
+            continue
+        if entry['kind'] == 'archive':
+            baked[name] = entry
+            continue
+        stale.extend(path for path in entry['outputs'] if path not in current and os.path.exists(path))
+    for path in stale:
+        os.remove(path)
+
+    save_manifest(output, {'steps': baked, 'files': hasher.files})
+    return results, stale, time.perf_counter() - start
+
+
+def print_report(results, stale, elapsed, jobs, slowest=10):
+    kinds = {}
+    for step, status, seconds, _ in results:
+        totals = kinds.setdefault(step.kind, {'built': 0, 'skipped': 0, 'failed': 0, 'seconds': 0.0})
+        totals[status] += 1
+        totals['seconds'] += seconds
+
+    print(f"{'step':<10} {'built':>6} {'skipped':>8} {'failed':>7} {'time':>9}")
+    for kind, totals in sorted(kinds.items(), key=lambda item: -item[1]['seconds']):
+        print(f"{kind:<10} {totals['built']:>6} {totals['skipped']:>8} {totals['failed']:>7} "
+              f"{totals['seconds']:>8.2f}s")
+
+    built = sorted((r for r in results if r[1] == 'built'), key=lambda r: -r[2])
+    if built:
+        print("slowest:")
+        for step, _, seconds, _ in built[:slowest]:
+            print(f"  {seconds:>7.2f}s  {step.name}")
+    for step, status, _, error in results:
+        if status == 'failed':
+            print(f"FAILED {step.name}: {error}")
+
+    work = sum(r[2] for r in results)
+    print(f"{len(built)} built, {sum(r[1] == 'skipped' for r in results)} up to date, "
+          f"{sum(r[1] == 'failed' for r in results)} failed, {len(stale)} stale removed "
+          f"in {elapsed:.2f}s ({work:.2f}s of work on {jobs} workers)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bake source assets into game-ready outputs, rebuilding only what changed")
+    parser.add_argument('source', nargs='?', default='source_assets')
+    parser.add_argument('-o', '--output', default='.', help="project root that receives assets/ and dialogue_files/")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--force', action='store_true', help="ignore the manifest and rebuild everything")
+    parser.add_argument('--pack', metavar='ARCHIVE', help="also pack assets/ into ARCHIVE (e.g. assets.pak)")
+    parser.add_argument('--atlas-size', type=int, default=2048)
+    parser.add_argument('--atlas-padding', type=int, default=2)
+    args = parser.parse_args()
+
+    atlas_options = {'max_size': args.atlas_size, 'padding': args.atlas_padding, 'trim': True}
+    steps, warnings = build_graph(args.source, args.output, atlas_options, shutil.which('ffmpeg'), args.pack)
+    for warning in warnings:
+        print(f"warning: {warning}")
+    results, stale, elapsed = bake(steps, args.output, args.jobs, args.force)
+    print_report(results, stale, elapsed, args.jobs)
+    sys.exit(1 if any(status == 'failed' for _, status, _, _ in results) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dialogue_db import DialogueDatabaseBuilder
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile {room}_dialogue.json files into one dialogue database")
+    parser.add_argument('inputs', nargs='+', help="dialogue JSON files named <room>_dialogue.json")
+    parser.add_argument('-o', '--output', default='dialogue_files/dialogue.db')
+    args = parser.parse_args()
+
+    builder = DialogueDatabaseBuilder()
+    for json_file in args.inputs:
+        room_name = os.path.basename(json_file).split('_dialogue')[0]
+        builder.add_json(room_name, json_file)
+    builder.save(args.output)
+    print(f"Wrote {len(builder.rows)} lines ({len(builder.strings)} unique strings) to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
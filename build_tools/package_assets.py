@@ -0,0 +1,37 @@
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from asset_archive import write_archive
+
+SKIPPED_EXTENSIONS = ('.tmp', '.psd', '.kra', '.blend')
+
+
+def collect_files(source_directory):
+    files = {}
+    for root, dirs, filenames in os.walk(source_directory):
+        dirs.sort()
+        for filename in filenames:
+            if filename.startswith('.') or filename.endswith(SKIPPED_EXTENSIONS):
+                continue
+            path = os.path.join(root, filename)
+            files[os.path.normpath(path).replace(os.sep, '/')] = path
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack the asset tree into a single memory-mappable archive")
+    parser.add_argument('source', nargs='?', default='assets')
+    parser.add_argument('-o', '--output', default='assets.pak')
+    args = parser.parse_args()
+
+    files = collect_files(args.source)
+    count = write_archive(args.output, files)
+    print(f"Packed {count} files into {args.output} ({os.path.getsize(args.output) / 1024 / 1024:.1f} MiB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,42 +1,135 @@
 
-import pyglet
+import math
+from pyglet.gl import GL_VIEWPORT, GLint, glGetIntegerv, glViewport
+from pyglet.math import Mat4, Vec3
 
 class Camera:
-    def __init__(self, window):
+    # The room is laid out at a fixed design size (the window size by default) and scaled
+    # uniformly to fit the window; the spare space on the other axis is letterboxed
+    def __init__(self, window, width=None, height=None, zoom=1.0, follow_speed=8.0):
         self.window = window
+        self.design_width = width or window.width
+        self.design_height = height or window.height
         self.view_x = 0
         self.view_y = 0
-        self.scale_x = 1
-        self.scale_y = 1
+        self.scale = 1
+        self.viewport = (0, 0, window.width, window.height)
+        self.zoom = zoom
+        self.target_zoom = zoom
+        self.follow_speed = follow_speed
+        self.target = None
+        self.bounds = None
+        self.previous_matrices = None
+        self.previous_viewport = None
         self.update_viewport()
 
     def update_viewport(self):
-        aspect_ratio = self.window.width / self.window.height
-        
-        if aspect_ratio >= 21/9:
-            self.scale_x = aspect_ratio / (21/9)
-            self.scale_y = 1
-        elif aspect_ratio >= 16/9:
-            self.scale_x = 1
-            self.scale_y = 1
-        else:
-            self.scale_x = 16/9 / aspect_ratio
-            self.scale_y = 1
+        self.scale = min(self.window.width / self.design_width, self.window.height / self.design_height)
+        width = round(self.design_width * self.scale)
+        height = round(self.design_height * self.scale)
+        self.viewport = ((self.window.width - width) // 2, (self.window.height - height) // 2, width, height)
+
+    def view_matrix(self):
+        return Mat4.from_translation(Vec3(-self.view_x, -self.view_y, 0))
 
-        self.window.projection = pyglet.window.Projection2D()
+    def projection_matrix(self):
+        width, height = self.view_size()
+        return Mat4.orthogonal_projection(0, width, 0, height, -8192, 8192)
+
+    def target_viewport(self, target):
+        # self.viewport is in window coordinates; the bound target (the window, or a post-process
+        # render target at its internal resolution) covers the whole window at its own size
+        left, bottom, width, height = target
+        scale_x = width / self.window.width
+        scale_y = height / self.window.height
+        x, y, w, h = self.viewport
+        return (left + round(x * scale_x), bottom + round(y * scale_y), round(w * scale_x), round(h * scale_y))
 
     def begin(self):
-        pyglet.gl.glPushMatrix()
-        pyglet.gl.glScalef(self.scale_x, self.scale_y, 1)
-        pyglet.gl.glTranslatef(-self.view_x, -self.view_y, 0)
+        # window.projection and window.view feed every pyglet shader program
+        self.previous_matrices = (self.window.projection, self.window.view)
+        viewport = (GLint * 4)()
+        glGetIntegerv(GL_VIEWPORT, viewport)
+        self.previous_viewport = tuple(viewport)
+        glViewport(*self.target_viewport(self.previous_viewport))
+        self.window.projection = self.projection_matrix()
+        self.window.view = self.view_matrix()
 
     def end(self):
-        pyglet.gl.glPopMatrix()
+        self.window.projection, self.window.view = self.previous_matrices
+        glViewport(*self.previous_viewport)
+
+    def view_size(self):
+        return (self.design_width / self.zoom, self.design_height / self.zoom)
+
+    def rect(self):
+        # Visible world rectangle as (left, bottom, right, top)
+        width, height = self.view_size()
+        return (self.view_x, self.view_y, self.view_x + width, self.view_y + height)
+
+    def screen_to_world(self, x, y):
+        left, bottom = self.viewport[:2]
+        return (self.view_x + (x - left) / (self.scale * self.zoom),
+                self.view_y + (y - bottom) / (self.scale * self.zoom))
 
     def set_position(self, x, y):
         self.view_x = x
         self.view_y = y
+        self.clamp()
+
+    def center_on(self, x, y):
+        width, height = self.view_size()
+        self.set_position(x - width / 2, y - height / 2)
+
+    def follow(self, target, speed=None):
+        # target is anything with x and y (a sprite); None stops following
+        self.target = target
+        if speed is not None:
+            self.follow_speed = speed
+
+    def set_bounds(self, left, bottom, right, top):
+        self.bounds = (left, bottom, right, top)
+        self.clamp()
+
+    def set_zoom(self, zoom, immediate=False):
+        self.target_zoom = zoom
+        if immediate:
+            self.zoom = zoom
+            self.clamp()
+
+    def clamp(self):
+        if self.bounds is None:
+            return
+        left, bottom, right, top = self.bounds
+        width, height = self.view_size()
+        # A room smaller than the view is centered instead of pinned to one edge
+        if right - left <= width:
+            self.view_x = left + (right - left - width) / 2
+        else:
+            self.view_x = min(max(self.view_x, left), right - width)
+        if top - bottom <= height:
+            self.view_y = bottom + (top - bottom - height) / 2
+        else:
+            self.view_y = min(max(self.view_y, bottom), top - height)
+
+    def update(self, dt):
+        # Exponential smoothing is frame-rate independent
+        blend = 1 - math.exp(-self.follow_speed * dt)
+        if self.zoom != self.target_zoom:
+            width, height = self.view_size()
+            center_x, center_y = self.view_x + width / 2, self.view_y + height / 2
+            self.zoom += (self.target_zoom - self.zoom) * blend
+            if abs(self.zoom - self.target_zoom) < 1e-4:
+                self.zoom = self.target_zoom
+            width, height = self.view_size()
+            self.view_x, self.view_y = center_x - width / 2, center_y - height / 2
+        if self.target is not None:
+            width, height = self.view_size()
+            self.view_x += (self.target.x - width / 2 - self.view_x) * blend
+            self.view_y += (self.target.y - height / 2 - self.view_y) * blend
+        self.clamp()
 
     def resize(self, width, height):
-        self.window.set_size(width, height)
+        # The default on_resize handler still sets the projection for the new size
         self.update_viewport()
+        self.clamp()
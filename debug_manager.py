@@ -0,0 +1,194 @@
+
+import json
+import os
+import threading
+import time
+import tracemalloc
+from array import array
+from collections import deque
+
+import pyglet
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# GAME_DEBUG=1 turns on timers and the overlay, GAME_TRACE=path also records a Chrome trace.
+# GAME_TRACEMALLOC=1 adds Python allocation tracking, which slows every allocation down
+ENABLED = os.environ.get('GAME_DEBUG', '') not in ('', '0')
+TRACE_FILE = os.environ.get('GAME_TRACE')
+TRACK_ALLOCATIONS = os.environ.get('GAME_TRACEMALLOC', '') not in ('', '0')
+HISTORY = 600            # frames kept per timer
+MAX_TRACE_EVENTS = 200000
+
+class RingBuffer:
+    def __init__(self, size=HISTORY):
+        self.values = array('d', bytes(8 * size))
+        self.size = size
+        self.count = 0
+
+    def append(self, value):
+        self.values[self.count % self.size] = value
+        self.count += 1
+
+    def percentiles(self, *points):
+        values = sorted(self.values[:min(self.count, self.size)])
+        if not values:
+            return [0.0] * len(points)
+        return [values[min(len(values) - 1, int(p / 100 * len(values)))] for p in points]
+
+    def last(self):
+        return self.values[(self.count - 1) % self.size] if self.count else 0.0
+
+class NullScope:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+NULL_SCOPE = NullScope()
+
+class Scope:
+    __slots__ = ('debug', 'name', 'start')
+
+    def __init__(self, debug, name):
+        self.debug = debug
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.debug.record(self.name, self.start, time.perf_counter_ns())
+        return False
+
+class DebugManager:
+    def __init__(self, enabled=ENABLED, trace_file=TRACE_FILE, track_allocations=TRACK_ALLOCATIONS):
+        self.enabled = enabled
+        self.trace_file = trace_file
+        self.timers = {}
+        self.frame_times = RingBuffer()
+        self.last_frame = None
+        self.trace = deque(maxlen=MAX_TRACE_EVENTS) if enabled and trace_file else None
+        self.trace_start = time.perf_counter_ns()
+        self.overlay = None
+        self.overlay_interval = 0.25
+        self.next_overlay = 0.0
+        if enabled and track_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def scope(self, name):
+        # Disabled scopes share one no-op context manager, so nothing is allocated or timed
+        if not self.enabled:
+            return NULL_SCOPE
+        return Scope(self, name)
+
+    def timed(self, name=None):
+        def decorate(function):
+            if not self.enabled:
+                return function
+            label = name or function.__qualname__
+
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter_ns()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self.record(label, start, time.perf_counter_ns())
+            wrapper.__name__ = function.__name__
+            wrapper.__qualname__ = function.__qualname__
+            wrapper.__wrapped__ = function
+            return wrapper
+        return decorate
+
+    def record(self, name, start, end):
+        timer = self.timers.get(name)
+        if timer is None:
+            timer = self.timers[name] = RingBuffer()
+        timer.append((end - start) / 1e6)
+        if self.trace is not None:
+            self.trace.append({'name': name, 'ph': 'X', 'pid': os.getpid(), 'tid': threading.get_ident(),
+                               'ts': (start - self.trace_start) / 1000, 'dur': (end - start) / 1000})
+
+    def end_frame(self):
+        if not self.enabled:
+            return
+        now = time.perf_counter_ns()
+        if self.last_frame is not None:
+            self.frame_times.append((now - self.last_frame) / 1e6)
+            if self.trace is not None:
+                self.trace.append({'name': 'frame', 'ph': 'i', 's': 'g', 'pid': os.getpid(),
+                                   'tid': threading.get_ident(), 'ts': (now - self.trace_start) / 1000})
+        self.last_frame = now
+
+    def fps(self):
+        frame_time = self.frame_times.percentiles(50)[0]
+        return 1000.0 / frame_time if frame_time else 0.0
+
+    def memory(self):
+        traced, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        return {'traced': traced, 'traced_peak': peak, 'rss': rss_bytes()}
+
+    def report(self):
+        report = {'frame': dict(zip(('p50', 'p95', 'p99'), self.frame_times.percentiles(50, 95, 99)))}
+        for name, timer in sorted(self.timers.items()):
+            report[name] = dict(zip(('p50', 'p95', 'p99'), timer.percentiles(50, 95, 99)))
+        report['memory'] = self.memory()
+        return report
+
+    def overlay_text(self):
+        p50, p95, p99 = self.frame_times.percentiles(50, 95, 99)
+        lines = [f"{self.fps():5.1f} fps  frame p50 {p50:.2f}  p95 {p95:.2f}  p99 {p99:.2f} ms"]
+        for name, timer in sorted(self.timers.items()):
+            p50, p95, p99 = timer.percentiles(50, 95, 99)
+            lines.append(f"{name:<24} {p50:6.2f} {p95:6.2f} {p99:6.2f}")
+        memory = self.memory()
+        lines.append(f"rss {memory['rss'] / 1048576:.1f} MB  python {memory['traced'] / 1048576:.1f} MB"
+                     f" (peak {memory['traced_peak'] / 1048576:.1f})")
+        return '\n'.join(lines)
+
+    def draw_overlay(self, window=None):
+        if not self.enabled:
+            return
+        if self.overlay is None:
+            height = window.height if window else 600
+            self.overlay = pyglet.text.Label('', font_name='Courier New', font_size=10, x=8, y=height - 8,
+                                             width=560, multiline=True, anchor_y='top',
+                                             color=(255, 255, 0, 255))
+        # Rebuilding the label layout every frame would dominate the numbers it shows
+        now = time.perf_counter()
+        if now >= self.next_overlay:
+            self.next_overlay = now + self.overlay_interval
+            self.overlay.text = self.overlay_text()
+        self.overlay.draw()
+
+    def display_fps(self, window=None):
+        self.end_frame()
+        self.draw_overlay(window)
+
+    def export_trace(self, path=None):
+        path = path or self.trace_file
+        if self.trace is None or not path:
+            return None
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': list(self.trace), 'displayTimeUnit': 'ms'}, f)
+        return path
+
+def rss_bytes():
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is not None:
+        # ru_maxrss is the peak, in KB on Linux and bytes on macOS
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return usage if os.uname().sysname == 'Darwin' else usage * 1024
+    return 0
+
+debug = DebugManager()
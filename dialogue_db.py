@@ -0,0 +1,136 @@
+
+import json
+import os
+import sqlite3
+
+from virtual_fs import vfs
+
+# Keys (room, interaction and character names) are indexed for lookup; line text and speech
+# file names are interned without an index since they are only ever fetched by id.
+SCHEMA = """
+CREATE TABLE names (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE strings (
+    id INTEGER PRIMARY KEY,
+    text TEXT NOT NULL
+);
+CREATE TABLE lines (
+    room INTEGER NOT NULL,
+    interaction INTEGER NOT NULL,
+    character INTEGER NOT NULL,
+    line INTEGER NOT NULL,
+    text INTEGER NOT NULL,
+    speech INTEGER NOT NULL,
+    PRIMARY KEY (room, interaction, character, line)
+) WITHOUT ROWID;
+"""
+
+LINES_QUERY = """
+SELECT c.name, l.line, t.text, s.text
+FROM lines l
+JOIN names c ON c.id = l.character
+JOIN strings t ON t.id = l.text
+JOIN strings s ON s.id = l.speech
+WHERE l.room = ? AND l.interaction = ?
+ORDER BY l.character, l.line
+"""
+
+
+def speech_filename(char_name, room_name, interaction, index):
+    return f"{char_name}-{room_name}-{interaction}-{index}.opus"
+
+
+class DialogueDatabaseBuilder:
+    def __init__(self):
+        self.names = {}
+        self.strings = {}
+        self.rows = []
+
+    def intern(self, text, table=None):
+        table = self.strings if table is None else table
+        string_id = table.get(text)
+        if string_id is None:
+            string_id = table[text] = len(table) + 1
+        return string_id
+
+    def intern_name(self, name):
+        return self.intern(name, self.names)
+
+    def add_room(self, room_name, dialogue):
+        # dialogue uses the DialogueManager layout: {interaction: {character: [lines]}}
+        room = self.intern_name(room_name)
+        for interaction, characters in dialogue.items():
+            interaction_id = self.intern_name(interaction)
+            for char_name, lines in characters.items():
+                character = self.intern_name(char_name)
+                for i, text in enumerate(lines, start=1):
+                    speech = self.intern(speech_filename(char_name, room_name, interaction, i))
+                    self.rows.append((room, interaction_id, character, i, self.intern(text), speech))
+
+    def add_json(self, room_name, json_file):
+        with open(json_file, 'r') as f:
+            self.add_room(room_name, json.load(f))
+
+    def save(self, output_file):
+        if os.path.exists(output_file):
+            os.remove(output_file)
+        connection = sqlite3.connect(output_file)
+        with connection:
+            connection.executescript(SCHEMA)
+            connection.executemany("INSERT INTO names (id, name) VALUES (?, ?)",
+                                   ((name_id, name) for name, name_id in self.names.items()))
+            connection.executemany("INSERT INTO strings (id, text) VALUES (?, ?)",
+                                   ((string_id, text) for text, string_id in self.strings.items()))
+            connection.executemany("INSERT INTO lines VALUES (?, ?, ?, ?, ?, ?)", self.rows)
+        connection.execute("VACUUM")
+        connection.close()
+
+
+class DialogueDatabase:
+    def __init__(self, path, cache_size=32):
+        if os.path.exists(path):
+            self.connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        else:
+            # Packed inside an asset archive
+            self.connection = sqlite3.connect(":memory:", check_same_thread=False)
+            self.connection.deserialize(bytes(vfs.read_bytes(path)))
+        self.cache_size = cache_size
+        self.cache = {}
+        self.name_ids = {}
+
+    def name_id(self, name):
+        if name not in self.name_ids:
+            row = self.connection.execute("SELECT id FROM names WHERE name = ?", (name,)).fetchone()
+            self.name_ids[name] = row[0] if row else None
+        return self.name_ids[name]
+
+    def interaction(self, room_name, interaction):
+        key = (room_name, interaction)
+        if key in self.cache:
+            self.cache[key] = self.cache.pop(key)
+            return self.cache[key]
+
+        result = {}
+        room, interaction_id = self.name_id(room_name), self.name_id(interaction)
+        if room is not None and interaction_id is not None:
+            for char_name, _, text, speech in self.connection.execute(LINES_QUERY, (room, interaction_id)):
+                result.setdefault(char_name, []).append((text, speech))
+
+        self.cache[key] = result
+        if len(self.cache) > self.cache_size:
+            del self.cache[next(iter(self.cache))]
+        return result
+
+    def lines(self, room_name, interaction, char_name):
+        return self.interaction(room_name, interaction).get(char_name, [])
+
+    def line(self, room_name, interaction, char_name, index):
+        return self.lines(room_name, interaction, char_name)[index - 1]
+
+    def speech_file(self, room_name, interaction, char_name, index):
+        return self.line(room_name, interaction, char_name, index)[1]
+
+    def close(self):
+        self.connection.close()
@@ -1,6 +1,8 @@
 
 import json
 import os
+from virtual_fs import vfs
+from dialogue_db import DialogueDatabaseBuilder, speech_filename
 
 class DialogueManager:
     def __init__(self, room_name):
@@ -12,12 +14,15 @@ class DialogueManager:
             self.dialogue[interaction] = {}
         self.dialogue[interaction][char_name] = lines
 
+    def load_dialogue_json(self, input_file):
+        self.dialogue = json.loads(vfs.read_text(input_file))
+
     def generate_filenames(self):
         filenames = []
         for interaction, lines in self.dialogue.items():
             for char_name, char_lines in lines.items():
                 for i, line in enumerate(char_lines, start=1):
-                    filename = f"{char_name}-{self.room_name}-{interaction}-{i}.opus"
+                    filename = speech_filename(char_name, self.room_name, interaction, i)
                     filenames.append(filename)
         return filenames
 
@@ -25,6 +30,11 @@ class DialogueManager:
         with open(output_file, 'w') as f:
             json.dump(self.dialogue, f, indent=4)
 
+    def export_dialogue_db(self, output_file):
+        builder = DialogueDatabaseBuilder()
+        builder.add_room(self.room_name, self.dialogue)
+        builder.save(output_file)
+
     def generate_filenames_json(self, output_file):
         filenames = self.generate_filenames()
         with open(output_file, 'w') as f:
@@ -1,50 +1,217 @@
 
-import fmod
+from collections import deque
+from asset_loader import assets
+from resource_cache import resources
+from virtual_fs import vfs
+
+try:
+    import fmod
+except ImportError:
+    fmod = None
+
+STREAM_THRESHOLD = 1024 * 1024  # Files larger than this are streamed instead of decoded up front
+MUSIC_PRIORITY = 255
+SPEECH_PRIORITY = 200
+DEFAULT_PRIORITY = 128
+
+class Sound:
+    # What load_sound hands out. Samples are shared through the resource cache (key);
+    # streams belong to whoever loaded them (key is None)
+    __slots__ = ('sound', 'loop', 'key')
+
+    def __init__(self, sound, loop, key=None):
+        self.sound = sound
+        self.loop = loop
+        self.key = key
+
+    def release(self):
+        self.sound.release()
+
+class Voice:
+    __slots__ = ('sound', 'priority', 'volume', 'loop', 'channel', 'order')
+
+    def __init__(self, sound, priority, volume, loop, order):
+        self.sound = sound
+        self.priority = priority
+        self.volume = volume
+        self.loop = loop
+        self.channel = None
+        self.order = order
+
+    @property
+    def is_virtual(self):
+        return self.channel is None
+
+class ChannelPool:
+    # Higher priority wins. When every real channel is busy the lowest-priority, oldest voice is
+    # stolen; looping voices that lose (or never get) a channel stay virtual until one frees up.
+    def __init__(self, system, max_voices=32, history=300):
+        self.system = system
+        self.max_voices = max_voices
+        self.voices = []
+        self.order = 0
+        self.frame_counts = deque(maxlen=history)
+        self.steals = 0
+
+    def real_voices(self):
+        return [voice for voice in self.voices if voice.channel is not None]
+
+    def play(self, sound, priority=DEFAULT_PRIORITY, volume=1.0, loop=False):
+        self.order += 1
+        voice = Voice(sound, priority, volume, loop, self.order)
+        real = self.real_voices()
+        if len(real) >= self.max_voices:
+            victim = min(real, key=lambda v: (v.priority, v.order))
+            if victim.priority > priority:
+                if loop:
+                    self.voices.append(voice)
+                return voice
+            self.virtualize(victim)
+            self.steals += 1
+        self.start(voice)
+        self.voices.append(voice)
+        return voice
+
+    def start(self, voice):
+        voice.channel = self.system.play_sound(voice.sound)
+        voice.channel.volume = voice.volume
+
+    def virtualize(self, voice):
+        voice.channel.stop()
+        voice.channel = None
+        if not voice.loop:
+            self.voices.remove(voice)
+
+    def stop(self, voice):
+        if voice.channel is not None and voice.channel.is_playing:
+            voice.channel.stop()
+        voice.channel = None
+        if voice in self.voices:
+            self.voices.remove(voice)
+
+    def stop_all(self, sound):
+        for voice in [voice for voice in self.voices if voice.sound is sound]:
+            self.stop(voice)
+
+    def set_volume(self, voice, volume):
+        voice.volume = volume
+        if voice.channel is not None:
+            voice.channel.volume = volume
+
+    def update(self):
+        self.voices = [v for v in self.voices if v.channel is None or v.loop or v.channel.is_playing]
+        free = self.max_voices - len(self.real_voices())
+        if free > 0:
+            virtual = sorted((v for v in self.voices if v.channel is None), key=lambda v: (-v.priority, v.order))
+            for voice in virtual[:free]:
+                self.start(voice)
+        real = len(self.real_voices())
+        self.frame_counts.append((real, len(self.voices) - real))
+
+    def stats(self):
+        return {
+            'real': self.frame_counts[-1][0] if self.frame_counts else 0,
+            'virtual': self.frame_counts[-1][1] if self.frame_counts else 0,
+            'peak_real': max((real for real, _ in self.frame_counts), default=0),
+            'peak_virtual': max((virtual for _, virtual in self.frame_counts), default=0),
+            'steals': self.steals,
+        }
 
 class FMODManager:
-    def __init__(self):
-        self.system = fmod.System()
+    def __init__(self, max_voices=32, backend=fmod):
+        self.backend = backend
+        self.system = backend.System()
         self.system.init()
+        self.pool = ChannelPool(self.system, max_voices)
+        self.music = None
+        self.music_channel = None
+
+    def load_sound(self, file, loop=False, stream=None):
+        if stream is None:
+            stream = vfs.size(file) > STREAM_THRESHOLD
+        mode = self.sound_mode(loop, stream)
+        if stream:
+            # A stream can only play on one channel at a time, so it is never shared
+            return Sound(self.create_sound(vfs.read_bytes(file), mode), loop)
+        key = ('sound', file, loop)
+        return resources.acquire(key,
+                                 lambda: Sound(self.create_from_memory(file, mode), loop, key),
+                                 size=lambda sound: vfs.size(file))
+
+    def create_from_memory(self, file, mode):
+        # Uses the bytes the loading screen already read; FMOD copies them (OPENMEMORY), so the
+        # raw file is dropped from the cache once the sound exists
+        try:
+            return self.create_sound(assets.audio_data(file), mode)
+        finally:
+            assets.release_audio_data(file)
 
-    def load_sound(self, file, loop=False):
-        mode = fmod.MODE.LOOP_NORMAL if loop else fmod.MODE.DEFAULT
-        sound = self.system.create_sound(file, mode)
-        return sound
+    def create_sound(self, data, mode):
+        # Sounds always come from memory so a build with only assets.pak still has audio;
+        # FMOD takes a copy, nothing keeps the archive slice alive
+        exinfo = self.backend.CREATESOUNDEXINFO(length=len(data))
+        return self.system.create_sound(data, mode | self.backend.MODE.OPENMEMORY, exinfo)
 
-    def play_sound(self, sound):
-        channel = self.system.play_sound(sound)
-        return channel
+    def sound_mode(self, loop, stream):
+        mode = self.backend.MODE.LOOP_NORMAL if loop else self.backend.MODE.DEFAULT
+        return mode | (self.backend.MODE.CREATESTREAM if stream else self.backend.MODE.CREATESAMPLE)
 
-    def stop_sound(self, channel):
-        if channel.is_playing:
-            channel.stop()
+    def release_sound(self, sound):
+        if sound.key is not None:
+            resources.release(sound.key)
+        else:
+            self.pool.stop_all(sound.sound)
+            sound.release()
 
-    def set_volume(self, channel, volume):
-        channel.volume = volume
+    def play_sound(self, sound, priority=DEFAULT_PRIORITY, volume=1.0):
+        return self.pool.play(sound.sound, priority, volume, loop=sound.loop)
+
+    def stop_sound(self, voice):
+        self.pool.stop(voice)
+
+    def set_volume(self, voice, volume):
+        self.pool.set_volume(voice, volume)
 
     def update(self):
+        self.pool.update()
         self.system.update()
 
     def load_music(self, file, loop=True):
-        mode = fmod.MODE.LOOP_NORMAL if loop else fmod.MODE.DEFAULT
-        self.music = self.system.create_sound(file, mode)
-        self.music_channel = self.system.play_sound(self.music)
-        self.music_channel.volume = 1.0
+        self.stop_music()
+        self.music = Sound(self.create_sound(vfs.read_bytes(file), self.sound_mode(loop, stream=True)), loop)
+        self.music_channel = self.play_sound(self.music, priority=MUSIC_PRIORITY, volume=1.0)
 
     def stop_music(self):
-        if self.music_channel.is_playing:
-            self.music_channel.stop()
+        if self.music_channel:
+            self.release_sound(self.music)
+            self.music = None
+            self.music_channel = None
 
     def set_music_volume(self, volume):
         if self.music_channel:
-            self.music_channel.volume = volume
+            self.pool.set_volume(self.music_channel, volume)
 
     def shutdown(self):
         self.system.release()
 
+_shared_manager = None
+
+def get_fmod_manager():
+    # One FMOD system per process; rooms and the game share it
+    global _shared_manager
+    if _shared_manager is None:
+        _shared_manager = FMODManager()
+    return _shared_manager
+
+def release_fmod_manager():
+    global _shared_manager
+    if _shared_manager is not None:
+        _shared_manager.shutdown()
+        _shared_manager = None
+
 # Example Usage
 if __name__ == "__main__":
-    fmod_manager = FMODManager()
+    fmod_manager = get_fmod_manager()
     sound = fmod_manager.load_sound("assets/music/track1.flac", loop=True)
     channel = fmod_manager.play_sound(sound)
     fmod_manager.set_volume(channel, 0.5)
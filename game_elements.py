@@ -1,11 +1,59 @@
 
 import pyglet
+from asset_loader import assets
 
 class GameCharacter:
     def __init__(self, image, x, y, layer=0):
-        self.image = pyglet.image.load(image)
+        self.image_path = image if isinstance(image, str) else None
+        self.image = assets.image(image) if self.image_path else image
         self.sprite = pyglet.sprite.Sprite(self.image, x=x, y=y)
         self.layer = layer
+        self.previous = (x, y)
+        self.current = None
+
+    def attach(self, batch):
+        # Layers are separate batches, so moving layer is a single migration
+        self.sprite.batch = batch
+
+    def detach(self):
+        self.sprite.batch = None
+
+    def release(self):
+        self.sprite.delete()
+        if self.image_path:
+            assets.release_image(self.image_path)
+
+    def current_image(self):
+        image = self.sprite.image
+        if isinstance(image, pyglet.image.Animation):
+            return image.frames[self.sprite.frame_index].image
+        return image
+
+    def bounds(self):
+        # The anchor shifts what is drawn; trimmed atlas frames are anchored by their offset
+        image = self.current_image()
+        left = self.sprite.x - image.anchor_x * self.sprite.scale * self.sprite.scale_x
+        bottom = self.sprite.y - image.anchor_y * self.sprite.scale * self.sprite.scale_y
+        return (left, bottom, left + self.sprite.width, bottom + self.sprite.height)
+
+    def set_visible(self, visible):
+        self.sprite.visible = visible
+
+    def save_state(self):
+        self.previous = (self.sprite.x, self.sprite.y)
+
+    def interpolate(self, alpha):
+        # Draw between the last two simulation steps; restore() puts the real position back
+        x, y = self.sprite.x, self.sprite.y
+        px, py = self.previous
+        if (px, py) != (x, y):
+            self.current = (x, y)
+            self.sprite.position = (px + (x - px) * alpha, py + (y - py) * alpha, self.sprite.z)
+
+    def restore(self):
+        if self.current is not None:
+            self.sprite.position = (self.current[0], self.current[1], self.sprite.z)
+            self.current = None
 
     def draw(self):
         self.sprite.draw()
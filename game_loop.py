@@ -0,0 +1,106 @@
+
+import pyglet
+from debug_manager import debug
+
+SIMULATION_STEP = 1 / 60
+MAX_STEPS = 5          # fixed steps per frame before the rest of the backlog is dropped
+MAX_FRAME_TIME = 0.25  # a longer frame (debugger, window drag) counts as this much
+ROOM_FPS = 60
+MENU_FPS = 30
+
+class System:
+    __slots__ = ('name', 'callback', 'interval', 'accumulator', 'owner')
+
+    def __init__(self, name, callback, interval, owner):
+        self.name = name
+        self.callback = callback
+        self.interval = interval
+        self.accumulator = 0.0
+        self.owner = owner
+
+class GameLoop:
+    # Simulation runs in fixed steps; rate systems keep their own accumulators; frame systems
+    # and drawing run once per rendered frame with the leftover fraction interpolated.
+    def __init__(self, window, step=SIMULATION_STEP, max_steps=MAX_STEPS):
+        self.window = window
+        self.step = step
+        self.max_steps = max_steps
+        self.fixed = []
+        self.rated = []
+        self.per_frame = []
+        self.interpolated = []
+        self.accumulator = 0.0
+        self.alpha = 0.0
+        self.frame_rate = None
+        self.dropped_time = 0.0
+
+    def add_fixed(self, name, callback, owner=None):
+        self.fixed.append(System(name, callback, self.step, owner))
+
+    def add_rate(self, name, callback, hz, owner=None):
+        self.rated.append(System(name, callback, 1.0 / hz, owner))
+
+    def add_frame(self, name, callback, owner=None):
+        self.per_frame.append(System(name, callback, None, owner))
+
+    def add_interpolated(self, obj, owner=None):
+        # obj provides save_state(), interpolate(alpha) and restore()
+        self.interpolated.append(System(type(obj).__name__, obj, None, owner))
+
+    def remove_owner(self, owner):
+        for systems in (self.fixed, self.rated, self.per_frame, self.interpolated):
+            systems[:] = [system for system in systems if system.owner is not owner]
+        if not self.fixed:
+            self.accumulator = 0.0
+
+    def set_frame_rate(self, fps):
+        if fps == self.frame_rate:
+            return
+        pyglet.clock.unschedule(self.frame)
+        self.frame_rate = fps
+        # The clock sleeps until the next frame is due instead of spinning
+        pyglet.clock.schedule_interval(self.frame, 1.0 / fps)
+
+    def stop(self):
+        pyglet.clock.unschedule(self.frame)
+        self.frame_rate = None
+
+    def frame(self, dt):
+        dt = min(dt, MAX_FRAME_TIME)
+        for system in self.interpolated:
+            system.callback.restore()
+
+        self.accumulator += dt
+        steps = 0
+        while self.accumulator >= self.step and self.fixed:
+            if steps == self.max_steps:
+                # Spiral of death: drop whole steps we can't catch up on and slow the world down
+                dropped = self.accumulator - self.accumulator % self.step
+                self.dropped_time += dropped
+                self.accumulator -= dropped
+                break
+            for system in self.interpolated:
+                system.callback.save_state()
+            for system in self.fixed:
+                with debug.scope(system.name):
+                    system.callback(self.step)
+            self.accumulator -= self.step
+            steps += 1
+
+        for system in self.rated:
+            system.accumulator += dt
+            if system.accumulator >= system.interval:
+                # Slow systems run at most once per frame and just see a larger dt after a hitch
+                ticks = int(system.accumulator / system.interval)
+                system.accumulator -= ticks * system.interval
+                with debug.scope(system.name):
+                    system.callback(ticks * system.interval)
+
+        self.alpha = self.accumulator / self.step if self.fixed else 1.0
+        for system in self.interpolated:
+            system.callback.interpolate(self.alpha)
+        for system in self.per_frame:
+            with debug.scope(system.name):
+                system.callback(dt)
+
+        self.window.draw(dt)
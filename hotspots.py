@@ -0,0 +1,186 @@
+
+import os
+import struct
+
+import numpy as np
+from PIL import Image
+
+from resource_cache import resources
+from spatial_hash import SpatialHash
+from virtual_fs import vfs
+
+MASK_MAGIC = b'GMSK'
+MASK_HEADER = struct.Struct('<4sHHB')   # magic, width, height, alpha threshold
+ALPHA_THRESHOLD = 16
+CELL_SIZE = 128
+
+class AlphaMask:
+    # One bit per pixel, rows bottom-up to match pyglet coordinates
+    __slots__ = ('width', 'height', 'row_bytes', 'bits')
+
+    def __init__(self, width, height, bits):
+        self.width = width
+        self.height = height
+        self.row_bytes = (width + 7) // 8
+        self.bits = bytes(bits)
+
+    def hit(self, x, y):
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return False
+        return self.bits[y * self.row_bytes + (x >> 3)] >> (7 - (x & 7)) & 1 == 1
+
+    def to_bytes(self, threshold):
+        return MASK_HEADER.pack(MASK_MAGIC, self.width, self.height, threshold) + self.bits
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, width, height, threshold = MASK_HEADER.unpack_from(data)
+        if magic != MASK_MAGIC:
+            raise ValueError("Not a hotspot mask")
+        return cls(width, height, data[MASK_HEADER.size:]), threshold
+
+def mask_path(image_path):
+    return os.path.splitext(image_path)[0] + '.mask'
+
+def mask_from_image(image, threshold=ALPHA_THRESHOLD):
+    alpha = np.asarray(image.convert('RGBA'))[::-1, :, 3] >= threshold
+    return AlphaMask(image.width, image.height, np.packbits(alpha, axis=1).tobytes())
+
+def build_mask(image_path, threshold=ALPHA_THRESHOLD):
+    with vfs.open(image_path) as f:
+        image = Image.open(f)
+        image.load()
+    return mask_from_image(image, threshold)
+
+def write_mask(path, mask, threshold=ALPHA_THRESHOLD):
+    with open(path, 'wb') as f:
+        f.write(mask.to_bytes(threshold))
+
+def mask_is_current(image_path, path):
+    if not vfs.exists(path):
+        return False
+    # Loose files can be edited after the mask was baked; archives are built together
+    if os.path.exists(path) and os.path.exists(image_path):
+        return os.path.getmtime(path) >= os.path.getmtime(image_path)
+    return True
+
+def read_mask(image_path, threshold=ALPHA_THRESHOLD):
+    # Masks are baked with the textures and atlases; unbaked loose files are masked in memory
+    path = mask_path(image_path)
+    if mask_is_current(image_path, path):
+        mask, baked_threshold = AlphaMask.from_bytes(vfs.read_bytes(path))
+        if baked_threshold == threshold:
+            return mask
+    return build_mask(image_path, threshold)
+
+def load_mask(image_path, threshold=ALPHA_THRESHOLD):
+    return resources.acquire(('mask', image_path), lambda: read_mask(image_path, threshold),
+                             size=lambda mask: len(mask.bits))
+
+def release_mask(image_path):
+    resources.release(('mask', image_path))
+
+class Hotspot:
+    # target needs bounds() and layer; masks is one AlphaMask per animation frame, or none for a box
+    def __init__(self, name, target, masks=(), on_click=None, on_enter=None, on_leave=None, static=False):
+        self.name = name
+        self.target = target
+        self.masks = list(masks)
+        self.on_click = on_click
+        self.on_enter = on_enter
+        self.on_leave = on_leave
+        self.static = static
+        self.order = 0
+        self.enabled = True
+
+    def current_mask(self):
+        if not self.masks:
+            return None
+        sprite = getattr(self.target, 'sprite', None)
+        frame = getattr(sprite, 'frame_index', 0) if sprite is not None else 0
+        return self.masks[frame % len(self.masks)]
+
+    def contains(self, x, y):
+        left, bottom, right, top = self.target.bounds()
+        if not (left <= x < right and bottom <= y < top):
+            return False
+        mask = self.current_mask()
+        if mask is None:
+            return True
+        # Scale into mask pixels so scaled sprites still test exactly
+        return mask.hit(int((x - left) * mask.width / (right - left)),
+                        int((y - bottom) * mask.height / (top - bottom)))
+
+class HotspotIndex:
+    def __init__(self, camera=None, cell_size=CELL_SIZE):
+        self.camera = camera
+        self.spatial = SpatialHash(cell_size)
+        self.hotspots = []
+        self.dynamic = []
+        self.order = 0
+        self.hovered = None
+        self.cursor = None
+
+    def add(self, hotspot):
+        # Ties within a layer go to the later one, matching LayerManager's insertion order
+        self.order += 1
+        hotspot.order = self.order
+        self.hotspots.append(hotspot)
+        self.spatial.insert(hotspot, hotspot.target.bounds())
+        if not hotspot.static:
+            self.dynamic.append(hotspot)
+        return hotspot
+
+    def remove(self, hotspot):
+        self.hotspots.remove(hotspot)
+        self.spatial.remove(hotspot)
+        if hotspot in self.dynamic:
+            self.dynamic.remove(hotspot)
+        if self.hovered is hotspot:
+            self.hovered = None
+
+    def clear(self):
+        self.hotspots.clear()
+        self.dynamic.clear()
+        self.spatial = SpatialHash(self.spatial.cell_size)
+        self.hovered = None
+
+    def refresh(self, dt=0):
+        for hotspot in self.dynamic:
+            self.spatial.move(hotspot, hotspot.target.bounds())
+        # Objects can move under a still cursor
+        if self.cursor is not None:
+            self.hover(*self.cursor)
+
+    def hit_test(self, x, y):
+        candidates = self.spatial.query((x, y, x, y))
+        if not candidates:
+            return None
+        for hotspot in sorted(candidates, key=lambda h: (h.target.layer, h.order), reverse=True):
+            if hotspot.enabled and hotspot.contains(x, y):
+                return hotspot
+        return None
+
+    def to_world(self, x, y):
+        return self.camera.screen_to_world(x, y) if self.camera else (x, y)
+
+    def hover(self, x, y):
+        hotspot = self.hit_test(x, y)
+        if hotspot is not self.hovered:
+            if self.hovered is not None and self.hovered.on_leave:
+                self.hovered.on_leave(self.hovered)
+            self.hovered = hotspot
+            if hotspot is not None and hotspot.on_enter:
+                hotspot.on_enter(hotspot)
+        return hotspot
+
+    def on_mouse_motion(self, x, y, dx, dy):
+        self.cursor = self.to_world(x, y)
+        self.hover(*self.cursor)
+
+    def on_mouse_press(self, x, y, button, modifiers):
+        hotspot = self.hit_test(*self.to_world(x, y))
+        if hotspot is not None and hotspot.on_click:
+            hotspot.on_click(hotspot)
+            return True
+        return False
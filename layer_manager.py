@@ -1,16 +1,153 @@
 
+import bisect
+
+import pyglet
+from spatial_hash import SpatialHash
+
+
 class LayerManager:
     def __init__(self):
         self.objects = []
+        # One batch per layer, drawn in layer order with that layer's unbatched objects right
+        # after it, so objects without attach() still stack correctly
+        self.batches = {}
+        self.layers = []
+        self.unbatched = {}
+        self.draw_order = []
+        self.dirty = False
+        # Objects with bounds() are culled against the camera; static ones are hashed once,
+        # the rest are re-hashed every frame (cheap unless they cross a cell edge)
+        self.camera = None
+        self.spatial = SpatialHash()
+        self.dynamic = []
+        self.unculled = []
+        self.visible = set()
+        self.interpolated = []
+
+    def get_batch(self, layer):
+        batch = self.batches.get(layer)
+        if batch is None:
+            batch = self.batches[layer] = pyglet.graphics.Batch()
+            self.update_draw_order()
+        return batch
+
+    def update_draw_order(self):
+        self.draw_order = [(layer, self.batches.get(layer), self.unbatched.get(layer, ()))
+                           for layer in sorted(set(self.batches) | set(self.unbatched))]
 
     def add_object(self, obj):
-        self.objects.append(obj)
+        index = bisect.bisect_right(self.layers, obj.layer)
+        self.layers.insert(index, obj.layer)
+        self.objects.insert(index, obj)
+        self.attach(obj)
+        if hasattr(obj, 'bounds'):
+            self.spatial.insert(obj, obj.bounds())
+            if not getattr(obj, 'static', False):
+                self.dynamic.append(obj)
+            if self.camera is not None:
+                self.set_visible(obj, False)
+            else:
+                self.visible.add(obj)
+        else:
+            self.unculled.append(obj)
+
+    def remove_object(self, obj):
+        index = self.objects.index(obj)
+        del self.objects[index]
+        del self.layers[index]
+        if obj in self.spatial:
+            self.spatial.remove(obj)
+            self.visible.discard(obj)
+            if obj in self.dynamic:
+                self.dynamic.remove(obj)
+        else:
+            self.unculled.remove(obj)
+        if hasattr(obj, 'detach'):
+            obj.detach()
+        else:
+            self.remove_unbatched(obj)
+
+    def set_layer(self, obj, layer):
+        if obj.layer != layer:
+            if not hasattr(obj, 'attach'):
+                self.remove_unbatched(obj)
+            obj.layer = layer
+            self.attach(obj)
+            self.dirty = True
+
+    def attach(self, obj):
+        if hasattr(obj, 'attach'):
+            obj.attach(self.get_batch(obj.layer))
+        else:
+            objects = self.unbatched.setdefault(obj.layer, [])
+            if obj not in objects:
+                objects.append(obj)
+                self.update_draw_order()
+
+    def remove_unbatched(self, obj):
+        for layer, objects in self.unbatched.items():
+            if obj in objects:
+                objects.remove(obj)
+                if not objects:
+                    del self.unbatched[layer]
+                    self.update_draw_order()
+                return
+
+    def sort(self):
+        # Stable sort keeps insertion order within a layer
         self.objects.sort(key=lambda o: o.layer)
+        self.layers = [obj.layer for obj in self.objects]
+        self.dirty = False
+
+    def set_camera(self, camera):
+        self.camera = camera
+
+    def set_visible(self, obj, visible):
+        if hasattr(obj, 'set_visible'):
+            obj.set_visible(visible)
+
+    def cull(self):
+        if self.camera is None:
+            return
+        for obj in self.dynamic:
+            self.spatial.move(obj, obj.bounds())
+        visible = self.spatial.query(self.camera.rect())
+        for obj in self.visible - visible:
+            self.set_visible(obj, False)
+        for obj in visible - self.visible:
+            self.set_visible(obj, True)
+        self.visible = visible
 
     def draw(self):
-        for obj in the objects:
-            obj.draw()
+        if self.dirty:
+            self.sort()
+        self.cull()
+        for layer, batch, unbatched in self.draw_order:
+            if batch is not None:
+                batch.draw()
+            for obj in unbatched:
+                if obj in self.visible or obj not in self.spatial:
+                    obj.draw()
+
+    def save_state(self):
+        for obj in self.dynamic + self.unculled:
+            if hasattr(obj, 'save_state'):
+                obj.save_state()
+
+    def interpolate(self, alpha):
+        # Only what was on screen last frame is moved for rendering
+        self.interpolated = [obj for obj in self.dynamic if obj in self.visible and hasattr(obj, 'interpolate')]
+        self.interpolated += [obj for obj in self.unculled if hasattr(obj, 'interpolate')]
+        for obj in self.interpolated:
+            obj.interpolate(alpha)
+
+    def restore(self):
+        for obj in self.interpolated:
+            obj.restore()
+        self.interpolated = []
 
     def update(self, dt):
+        if self.dirty:
+            self.sort()
         for obj in self.objects:
             obj.update(dt)
@@ -0,0 +1,57 @@
+
+import importlib
+import sys
+import threading
+import time
+
+import_times = {}   # module name -> seconds spent importing it on first use
+
+def timed_import(module_name):
+    module = sys.modules.get(module_name)
+    if module is not None:
+        return module
+    start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    import_times.setdefault(module_name, time.perf_counter() - start)
+    return module
+
+class LazyRegistry:
+    # name -> "module:ClassName"; the module is imported the first time the class is asked for
+    def __init__(self, entries):
+        self.entries = dict(entries)
+        self.classes = {}
+        self.lock = threading.Lock()
+
+    def __contains__(self, name):
+        return name in self.entries
+
+    def get(self, name):
+        cls = self.classes.get(name)
+        if cls is None:
+            module_name, class_name = self.entries[name].split(':')
+            # Warm-up may be importing the same module on another thread
+            with self.lock:
+                cls = self.classes[name] = getattr(timed_import(module_name), class_name)
+        return cls
+
+    def name_of(self, cls):
+        for name, target in self.entries.items():
+            if target == f"{cls.__module__}:{cls.__name__}":
+                return name
+        return None
+
+    def warm_up(self, names=None):
+        # Imports on a background thread so the first visit to a screen or room doesn't stall;
+        # nothing here touches GL, constructing the screens still happens on the main thread
+        names = list(self.entries if names is None else names)
+        thread = threading.Thread(target=lambda: [self.get(name) for name in names],
+                                  name='warm-up', daemon=True)
+        thread.start()
+        return thread
+
+def startup_report(process_start, first_frame, startup_imports):
+    lines = [f"time to first frame: {(first_frame - process_start) * 1000:.1f} ms",
+             f"  startup imports:  {startup_imports * 1000:.1f} ms"]
+    for module_name, seconds in sorted(import_times.items(), key=lambda item: -item[1]):
+        lines.append(f"  import {module_name:<16} {seconds * 1000:.1f} ms")
+    return '\n'.join(lines)
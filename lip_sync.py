@@ -0,0 +1,164 @@
+
+import json
+import os
+import struct
+import time
+from array import array
+from bisect import bisect_right
+
+from virtual_fs import vfs
+
+MOUTH_SHAPES = "ABCDEFGHX"
+REST_SHAPE = MOUTH_SHAPES.index("X")
+PACK_MAGIC = b"GLIP"
+PACK_HEADER = struct.Struct("<4sI")
+LINE_HEADER = struct.Struct("<HIf")
+
+
+class LipSyncTimeline:
+    __slots__ = ("starts", "shapes", "duration")
+
+    def __init__(self, starts, shapes, duration):
+        self.starts = starts
+        self.shapes = shapes
+        self.duration = duration
+
+
+def compile_cues(rhubarb_data):
+    starts = array("f")
+    shapes = array("B")
+    duration = 0.0
+    for cue in rhubarb_data["mouthCues"]:
+        starts.append(cue["start"])
+        shapes.append(MOUTH_SHAPES.index(cue["value"]))
+        duration = max(duration, cue["end"])
+    return LipSyncTimeline(starts, shapes, duration)
+
+
+def write_pack(output_file, timelines):
+    names = sorted(timelines)
+    with open(output_file, "wb") as f:
+        f.write(PACK_HEADER.pack(PACK_MAGIC, len(names)))
+        for name in names:
+            encoded = name.encode("utf-8")
+            timeline = timelines[name]
+            f.write(LINE_HEADER.pack(len(encoded), len(timeline.starts), timeline.duration))
+            f.write(encoded)
+        for name in names:
+            # Explicitly little-endian, like the headers, whatever the building machine is
+            starts = timelines[name].starts
+            f.write(struct.pack(f"<{len(starts)}f", *starts))
+            f.write(timelines[name].shapes.tobytes())
+
+
+def read_pack(path):
+    data = vfs.read_bytes(path)
+    magic, count = PACK_HEADER.unpack_from(data, 0)
+    if magic != PACK_MAGIC:
+        raise ValueError(f"{path} is not a lip-sync pack")
+    offset = PACK_HEADER.size
+    lines = []
+    for _ in range(count):
+        name_length, cue_count, duration = LINE_HEADER.unpack_from(data, offset)
+        offset += LINE_HEADER.size
+        name = str(data[offset:offset + name_length], "utf-8")
+        offset += name_length
+        lines.append((name, cue_count, duration))
+
+    timelines = {}
+    for name, cue_count, duration in lines:
+        starts = array("f", struct.unpack_from(f"<{cue_count}f", data, offset))
+        offset += cue_count * 4
+        shapes = array("B")
+        shapes.frombytes(data[offset:offset + cue_count])
+        offset += cue_count
+        timelines[name] = LipSyncTimeline(starts, shapes, duration)
+    return timelines
+
+
+def compile_directory(json_directory, output_file):
+    timelines = {}
+    for filename in sorted(os.listdir(json_directory)):
+        if filename.endswith(".json") and not filename.startswith("rhubarb_manifest"):
+            with open(os.path.join(json_directory, filename), "r") as f:
+                timelines[os.path.splitext(filename)[0]] = compile_cues(json.load(f))
+    write_pack(output_file, timelines)
+    return len(timelines)
+
+
+def channel_position(channel):
+    # FMOD reports the playback position in milliseconds
+    return lambda: channel.position / 1000.0
+
+
+def clock_position():
+    start = time.perf_counter()
+    return lambda: time.perf_counter() - start
+
+
+class LipSyncPlayer:
+    def __init__(self, timeline, portrait_manager, position, shape_states):
+        self.timeline = timeline
+        self.portrait_manager = portrait_manager
+        self.position = position
+        self.shape_states = shape_states
+        self.cursor = 0
+        self.shape = None
+
+    def update(self):
+        timeline = self.timeline
+        starts = timeline.starts
+        t = self.position()
+        if t >= timeline.duration or not starts:
+            self.set_shape(REST_SHAPE)
+            return False
+
+        cursor = self.cursor
+        if t < starts[cursor]:
+            # Seeked backwards
+            cursor = max(bisect_right(starts, t) - 1, 0)
+        else:
+            last = len(starts) - 1
+            while cursor < last and starts[cursor + 1] <= t:
+                cursor += 1
+        self.cursor = cursor
+        self.set_shape(timeline.shapes[cursor])
+        return True
+
+    def set_shape(self, shape):
+        if shape != self.shape:
+            self.shape = shape
+            self.portrait_manager.set_state(self.shape_states[shape])
+
+
+class LipSyncManager:
+    def __init__(self, shape_states=None):
+        self.timelines = {}
+        self.players = []
+        # Maps Rhubarb mouth letters to PortraitManager states, indexed by shape id at runtime
+        shape_states = {"X": "neutral", **(shape_states or {})}
+        self.shape_states = [shape_states.get(shape, f"mouth_{shape}") for shape in MOUTH_SHAPES]
+
+    def load_pack(self, path):
+        self.timelines.update(read_pack(path))
+
+    def play(self, line_name, portrait_manager, position):
+        timeline = self.timelines.get(line_name)
+        if timeline is None:
+            return None
+        self.stop(portrait_manager)
+        player = LipSyncPlayer(timeline, portrait_manager, position, self.shape_states)
+        self.players.append(player)
+        return player
+
+    def stop(self, portrait_manager):
+        self.players = [p for p in self.players if p.portrait_manager is not portrait_manager]
+
+    def update(self):
+        if self.players:
+            self.players = [player for player in self.players if player.update()]
+
+
+if __name__ == "__main__":
+    count = compile_directory("assets/lip_sync_data", "assets/lip_sync_data/room1.lip")
+    print(f"Compiled {count} lip-sync timelines")
@@ -0,0 +1,40 @@
+
+import pyglet
+from asset_loader import assets
+
+class LoadingScreen:
+    def __init__(self, window, game, room_class, state=None):
+        self.window = window
+        self.game = game
+        self.room_class = room_class
+        self.state = state
+
+        self.label = pyglet.text.Label('Loading...',
+                                       font_name='Arial',
+                                       font_size=24,
+                                       x=window.width // 2,
+                                       y=window.height // 2 + 40,
+                                       anchor_x='center', anchor_y='center')
+        self.bar_width = window.width // 2
+        self.bar_background = pyglet.shapes.Rectangle(window.width // 4, window.height // 2 - 10,
+                                                      self.bar_width, 20, color=(60, 60, 60))
+        self.bar = pyglet.shapes.Rectangle(window.width // 4, window.height // 2 - 10,
+                                           0, 20, color=(255, 255, 0))
+
+        self.window.push_handlers(self.on_draw)
+        pyglet.clock.schedule(self.update)
+
+    def on_draw(self):
+        self.window.clear()
+        self.label.draw()
+        self.bar_background.draw()
+        self.bar.draw()
+
+    def update(self, dt):
+        self.bar.width = self.bar_width * assets.progress
+        if assets.done:
+            self.game.enter_room(self.room_class, self.state)
+
+    def cleanup(self):
+        pyglet.clock.unschedule(self.update)
+        self.window.pop_handlers()
@@ -1,54 +1,171 @@
 
+import time
+PROCESS_START = time.perf_counter()
+
+import os
+import sys
 import pyglet
-from menu_screen import MenuScreen
-from room1 import Room1
-from room2 import Room2
-from settings import SettingsScreen
-from credits import CreditsScreen
 from save_game import SaveGame
-from fmod_manager import FMODManager
+from audio_process import create_audio_mixer
+from asset_loader import assets
+from texture_residency import residency
+from virtual_fs import vfs
+from debug_manager import debug
+from game_loop import GameLoop, MENU_FPS, ROOM_FPS
+from lazy_registry import LazyRegistry, startup_report
+STARTUP_IMPORTS = time.perf_counter() - PROCESS_START
+
+# Screens and rooms are imported on first use (room modules pull in FMOD, pyo, PIL, ...)
+SCREENS = LazyRegistry({
+    "menu": "menu_screen:MenuScreen",
+    "settings": "settings:SettingsScreen",
+    "credits": "credits:CreditsScreen",
+    "loading": "loading_screen:LoadingScreen",
+})
+ROOMS = LazyRegistry({
+    "room1": "room1:Room1",
+})
+# Kept alive between visits and suspended instead of rebuilt
+PERSISTENT_SCREENS = ("menu", "settings", "credits")
 
 class Game:
     def __init__(self):
         self.window = pyglet.window.Window(width=800, height=600)
+        residency.set_resolution(*self.window.get_framebuffer_size())
+        # Shipped builds read from the packed archive, development falls back to loose files
+        if os.path.exists('assets.pak'):
+            vfs.mount('assets.pak')
         self.current_screen = None
-        self.fmod_manager = FMODManager()
+        self.screens = {}
+        # The loop owns simulation ticks and redraws; pyglet.app.run no longer redraws on its own
+        self.loop = GameLoop(self.window)
+        # The pyo mixer runs in its own process so long frames here don't glitch audio
+        self.mixer = create_audio_mixer(out_of_process=True)
+        pyglet.clock.schedule_interval(self.poll_audio, 1/30)
+        self.save_game = SaveGame(self)
+        self.save_game.start_autosave(self.current_state, interval=60.0)
 
+        # Bottom of the handler stack, so screens pushed later can't pop it
+        self.window.push_handlers(on_refresh=self.on_first_frame, on_resize=self.on_resize)
         self.show_menu()
 
+    def on_first_frame(self, dt):
+        self.window.remove_handler('on_refresh', self.on_first_frame)
+        if debug.enabled:
+            print(startup_report(PROCESS_START, time.perf_counter(), STARTUP_IMPORTS))
+        # The menu is up; import the rest while the player reads it
+        pyglet.clock.schedule_once(self.warm_up, 0.5)
+
+    def on_resize(self, width, height):
+        # Later loads pick the image variants that match the new size
+        residency.set_resolution(*self.window.get_framebuffer_size())
+
+    def warm_up(self, dt):
+        SCREENS.warm_up()
+        ROOMS.warm_up()
+
+    def leave_screen(self):
+        screen = self.current_screen
+        self.current_screen = None
+        if screen is None:
+            return
+        if screen in self.screens.values():
+            screen.suspend()
+        else:
+            screen.cleanup()
+
+    def show_screen(self, name):
+        self.leave_screen()
+        # Revisited screens are accounted to their own scope again, not to the last room
+        residency.enter(name)
+        screen = self.screens.get(name)
+        if screen is None:
+            screen = SCREENS.get(name)(self.window, self)
+            if name in PERSISTENT_SCREENS:
+                self.screens[name] = screen
+        else:
+            screen.resume()
+        self.current_screen = screen
+        self.loop.set_frame_rate(MENU_FPS)
+
     def show_menu(self):
-        if self.current_screen:
-            self.current_screen.cleanup()
-        self.current_screen = MenuScreen(self.window, self)
+        self.show_screen("menu")
 
     def start_new_game(self):
-        if self.current_screen:
-            self.current_screen.cleanup()
-        self.load_room(Room1)
+        self.load_room("room1")
 
     def load_game(self):
-        if self.current_screen:
-            self.current_screen.cleanup()
-        save_game = SaveGame(self)
-        save_game.load_last_game()
+        self.leave_screen()
+        self.save_game.load_last_game()
+
+    def current_state(self):
+        if hasattr(self.current_screen, 'get_state'):
+            return self.current_screen.get_state()
+        return None
+
+    def save(self, slot=1):
+        state = self.current_state()
+        if state is not None:
+            self.save_game.save(state, slot, full=True)
+
+    def restore_game(self, data):
+        self.load_room(data['room'], state=data)
 
     def show_settings(self):
-        if self.current_screen:
-            self.current_screen.cleanup()
-        self.current_screen = SettingsScreen(self.window, self)
+        self.show_screen("settings")
 
     def show_credits(self):
-        if self.current_screen:
-            self.current_screen.cleanup()
-        self.current_screen = CreditsScreen(self.window, self)
+        self.show_screen("credits")
+
+    def room_class(self, room):
+        return ROOMS.get(room) if isinstance(room, str) else room
 
-    def load_room(self, room_class):
-        if self.current_screen:
-            self.current_screen.cleanup()
+    def preload_room(self, room):
+        # Call ahead of time (e.g. when the player approaches an exit) to decode in the background
+        room_assets = dict(getattr(self.room_class(room), 'ASSETS', {}))
+        room_assets['images'] = residency.resolve_all(room_assets.get('images', ()))
+        assets.preload(**room_assets)
+
+    def load_room(self, room, state=None):
+        self.leave_screen()
+        room_class = self.room_class(room)
+        self.preload_room(room_class)
+        if assets.done:
+            self.enter_room(room_class, state)
+        else:
+            self.current_screen = SCREENS.get("loading")(self.window, self, room_class, state)
+
+    def enter_room(self, room_class, state=None):
+        self.leave_screen()
+        residency.enter(ROOMS.name_of(room_class) or room_class.__name__)
         self.current_screen = room_class(self.window)
+        if state is not None:
+            self.current_screen.restore_state(state)
+        if hasattr(self.current_screen, 'register'):
+            self.current_screen.register(self.loop)
+        self.loop.set_frame_rate(ROOM_FPS)
+        if debug.enabled:
+            print(residency.report())
+
+    def poll_audio(self, dt):
+        if hasattr(self.mixer, 'poll'):
+            self.mixer.poll()
 
     def run(self):
-        pyglet.app.run()
+        try:
+            pyglet.app.run(interval=None)
+        finally:
+            self.loop.stop()
+            # Don't exit with a save half-written
+            self.save_game.stop_autosave()
+            self.save_game.wait()
+            self.leave_screen()
+            # Stops the audio process and unlinks its shared-memory rings
+            self.mixer.shutdown()
+            # FMOD is only loaded once a room was entered
+            if 'fmod_manager' in sys.modules:
+                sys.modules['fmod_manager'].release_fmod_manager()
+            debug.export_trace()
 
 if __name__ == "__main__":
     game = Game()
@@ -1,16 +1,23 @@
 
-import pyglet
+from texture_residency import residency
 
 class PortraitManager:
-    def __init__(self, image_paths):
-        self.portraits = {}
-        for state, path in image_paths.items():
-            self.portraits[state] = pyglet.image.load(path)
-        self.current_state = "neutral"
+    # States are decoded the first time they are shown, not all up front
+    def __init__(self, image_paths, current_state="neutral"):
+        self.image_paths = image_paths
+        self.textures = residency.owner('portraits')
+        self.current_state = current_state
 
     def set_state(self, state):
-        if state in self.portraits:
+        if state in self.image_paths:
             self.current_state = state
+            self.textures.prefetch(self.image_paths[state])
+
+    def get_portrait(self, state):
+        return self.textures.image(self.image_paths[state])
 
     def get_current_portrait(self):
-        return self.portraits[self.current_state]
+        return self.get_portrait(self.current_state)
+
+    def release(self):
+        self.textures.release()
@@ -0,0 +1,116 @@
+
+from collections import OrderedDict
+
+import pyglet
+from virtual_fs import vfs
+
+
+def load_image(path):
+    with vfs.open(path) as f:
+        return pyglet.image.load(path, file=f)
+
+def estimate_size(value):
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, pyglet.image.Animation):
+        return sum(estimate_size(frame.image) for frame in value.frames)
+    if isinstance(value, pyglet.image.AbstractImage):
+        return value.width * value.height * 4
+    return 0
+
+
+class CacheEntry:
+    __slots__ = ('value', 'size', 'refs')
+
+    def __init__(self, value, size):
+        self.value = value
+        self.size = size
+        self.refs = 0
+
+
+class ResourceCache:
+    # Entries are kept in least-recently-used order; only unreferenced entries are evicted.
+    def __init__(self, budget=512 * 1024 * 1024):
+        self.budget = budget
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def acquire(self, key, load, size=None):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        else:
+            self.misses += 1
+            value = load()
+            entry = CacheEntry(value, size(value) if size else estimate_size(value))
+            self.entries[key] = entry
+            self.bytes += entry.size
+        entry.refs += 1
+        self.evict()
+        return entry.value
+
+    def put(self, key, value, size=None):
+        if key not in self.entries:
+            entry = CacheEntry(value, size if size is not None else estimate_size(value))
+            self.entries[key] = entry
+            self.bytes += entry.size
+            self.evict()
+
+    def release(self, key):
+        entry = self.entries.get(key)
+        if entry is not None and entry.refs > 0:
+            entry.refs -= 1
+            self.evict()
+
+    def discard(self, key):
+        entry = self.entries.get(key)
+        if entry is not None and not entry.refs:
+            del self.entries[key]
+            self.bytes -= entry.size
+            if hasattr(entry.value, 'release'):
+                entry.value.release()
+
+    def set_budget(self, budget):
+        self.budget = budget
+        self.evict()
+
+    def evict(self):
+        if self.bytes <= self.budget:
+            return
+        for key in list(self.entries):
+            entry = self.entries[key]
+            if entry.refs:
+                continue
+            del self.entries[key]
+            self.bytes -= entry.size
+            self.evictions += 1
+            if hasattr(entry.value, 'release'):
+                entry.value.release()
+            if self.bytes <= self.budget:
+                break
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def image(self, path):
+        return self.acquire(('image', path), lambda: load_image(path))
+
+    def release_image(self, path):
+        self.release(('image', path))
+
+    def stats(self):
+        return {
+            'entries': len(self.entries),
+            'bytes': self.bytes,
+            'budget': self.budget,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+
+resources = ResourceCache()
@@ -1,29 +1,123 @@
 
 import subprocess
 import os
+import hashlib
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+MANIFEST_FILE = "rhubarb_manifest.json"
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def print_progress(done, total, elapsed):
+    rate = done / elapsed if elapsed else 0.0
+    print(f"[{done}/{total}] {rate:.1f} files/s")
 
 class RhubarbIntegration:
-    def __init__(self, rhubarb_executable):
+    def __init__(self, rhubarb_executable, options=None, max_workers=None, timeout=300):
         self.rhubarb_executable = rhubarb_executable
+        self.options = list(options) if options is not None else ["-f", "json"]
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.timeout = timeout
 
     def generate_lip_sync_data(self, audio_file, output_json):
         command = [
             self.rhubarb_executable,
+            *self.options,
             audio_file,
             "-o", output_json
         ]
-        subprocess.call(command)
+        return subprocess.run(command, capture_output=True, timeout=self.timeout)
+
+    def load_manifest(self, output_directory):
+        try:
+            with open(os.path.join(output_directory, MANIFEST_FILE), 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def save_manifest(self, output_directory, manifest):
+        path = os.path.join(output_directory, MANIFEST_FILE)
+        with open(path + ".tmp", 'w') as f:
+            json.dump(manifest, f, indent=4, sort_keys=True)
+        os.replace(path + ".tmp", path)
 
-    def batch_process(self, audio_directory, output_directory):
+    def process_file(self, audio_file, output_json, previous):
+        stat = os.stat(audio_file)
+        # Skip re-hashing untouched files
+        if previous and previous.get("size") == stat.st_size and previous.get("mtime") == stat.st_mtime:
+            content_hash = previous["hash"]
+        else:
+            content_hash = hash_file(audio_file)
+        entry = {"hash": content_hash, "options": self.options, "size": stat.st_size, "mtime": stat.st_mtime}
+
+        if (previous and previous.get("hash") == content_hash and previous.get("options") == self.options
+                and os.path.exists(output_json)):
+            return entry, "skipped", None
+
+        temp_json = output_json + ".tmp"
+        try:
+            result = self.generate_lip_sync_data(audio_file, temp_json)
+        except subprocess.TimeoutExpired:
+            error = f"timed out after {self.timeout}s"
+        except OSError as e:
+            error = str(e)
+        else:
+            if result.returncode == 0 and os.path.exists(temp_json):
+                os.replace(temp_json, output_json)
+                return entry, "processed", None
+            lines = result.stderr.decode(errors="replace").strip().splitlines()
+            error = lines[-1] if lines else f"exit code {result.returncode}"
+        if os.path.exists(temp_json):
+            os.remove(temp_json)
+        return entry, "failed", error
+
+    def batch_process(self, audio_directory, output_directory, force=False, progress=print_progress):
         if not os.path.exists(output_directory):
             os.makedirs(output_directory)
 
-        for filename in os.listdir(audio_directory):
+        manifest = {} if force else self.load_manifest(output_directory)
+        jobs = []
+        for filename in sorted(os.listdir(audio_directory)):
             if filename.endswith(".opus"):
                 audio_file = os.path.join(audio_directory, filename)
                 output_json = os.path.join(output_directory, f"{os.path.splitext(filename)[0]}.json")
-                self.generate_lip_sync_data(audio_file, output_json)
+                jobs.append((filename, audio_file, output_json))
+
+        results = {"processed": [], "skipped": [], "failed": {}}
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self.process_file, audio_file, output_json, manifest.get(filename)): filename
+                       for filename, audio_file, output_json in jobs}
+            for done, future in enumerate(as_completed(futures), start=1):
+                filename = futures[future]
+                try:
+                    entry, status, error = future.result()
+                except OSError as e:
+                    entry, status, error = None, "failed", str(e)
+                if status == "failed":
+                    results["failed"][filename] = error
+                    manifest.pop(filename, None)
+                else:
+                    results[status].append(filename)
+                    manifest[filename] = entry
+                if progress:
+                    progress(done, len(jobs), time.perf_counter() - start)
+
+        self.save_manifest(output_directory, manifest)
+        results["elapsed"] = time.perf_counter() - start
+        return results
 
 if __name__ == "__main__":
     rhubarb = RhubarbIntegration("path/to/rhubarb")
-    rhubarb.batch_process("assets/audio/speech", "assets/lip_sync_data")
+    results = rhubarb.batch_process("assets/audio/speech", "assets/lip_sync_data")
+    print(f"{len(results['processed'])} processed, {len(results['skipped'])} skipped, "
+          f"{len(results['failed'])} failed in {results['elapsed']:.1f}s")
+    for filename, error in results["failed"].items():
+        print(f"  {filename}: {error}")
@@ -1,8 +1,8 @@
 
-import pyglet
-from game_elements import GameCharacter, Camera
+from game_elements import GameCharacter
+from camera import Camera
 from speech_system import SpeechSystem
-from fmod_manager import FMODManager
+from fmod_manager import get_fmod_manager
 from sfx_manager import SFXManager
 from video_manager import VideoManager
 from layer_manager import LayerManager
@@ -11,79 +11,183 @@ from portrait_manager import PortraitManager
 from animation_manager import AnimationManager
 from dialogue_manager import DialogueManager
 from tweening_manager import TweeningManager
+from virtual_fs import vfs
+from lip_sync import MOUTH_SHAPES, LipSyncManager
+from debug_manager import debug
+from hotspots import Hotspot, HotspotIndex, load_mask, release_mask
+
+MAX_INTERNAL_WIDTH = 1920
 
 class Room1:
+    # Decoded in the background by Game.preload_room before the room is built
+    ASSETS = {
+        'images': [
+            # Other portrait states load when first shown
+            "assets/images/character_portrait_neutral.png",
+            "assets/images/character_walk",
+        ],
+        'audio': [
+            "assets/sfx/wind.opus",
+        ],
+    }
+
     def __init__(self, window):
         self.window = window
         self.layer_manager = LayerManager()
-        self.fmod_manager = FMODManager()
+        self.fmod_manager = get_fmod_manager()
         self.sfx_manager = SFXManager()
         self.video_manager = VideoManager()
         self.tweening_manager = TweeningManager()
         self.camera = Camera(window)
         self.shader_manager = ShaderManager()
 
-        # Load shaders
-        self.shader_manager.load_shader('crt', 'assets/shaders/crt.vert', 'assets/shaders/crt.frag')
+        # The CRT effect runs once over the finished frame; a custom crt.frag overrides the built-in one
+        if vfs.exists('assets/shaders/crt.frag'):
+            self.shader_manager.load_post_shader('crt', 'assets/shaders/crt.frag')
+        # Cap the internal width at 1080p; ultrawide windows upscale instead of shading every pixel
+        self.post_process = self.shader_manager.create_post_process(window, scale=self.post_scale(window.width))
+        self.post_process.add_pass('crt')
 
-        # Portrait Manager
-        self.portrait_manager = PortraitManager({
+        # Portrait Manager; mouth_A..mouth_H are the Rhubarb mouth shapes lip-sync switches between
+        portraits = {
             "neutral": "assets/images/character_portrait_neutral.png",
             "happy": "assets/images/character_portrait_happy.png",
             "sad": "assets/images/character_portrait_sad.png"
-        })
+        }
+        for shape in MOUTH_SHAPES[:-1]:
+            path = f"assets/images/character_portrait_mouth_{shape}.png"
+            if vfs.exists(path):
+                portraits[f"mouth_{shape}"] = path
+        self.portrait_manager = PortraitManager(portraits)
 
         # Animation Manager
         self.animation_manager = AnimationManager()
-        self.animation_manager.load_animation("walk", "assets/images/character_walk", 0.1)
+        atlas = "assets/images/room1_atlas.json"
+        self.animation_manager.load_animation("walk", "assets/images/character_walk", 0.1,
+                                              atlas=atlas if vfs.exists(atlas) else None)
         self.character = GameCharacter(self.animation_manager.get_animation("walk"), x=100, y=100, layer=1)
 
-        # Initialize the speech system for this room
-        self.speech = SpeechSystem(self.character, 'room1', 'dialogue_files/room1_dialogue.json')
+        # Lip-sync timelines drive the portrait while speech plays
+        self.lip_sync = LipSyncManager()
+        if vfs.exists('assets/lip_sync_data/room1.lip'):
+            self.lip_sync.load_pack('assets/lip_sync_data/room1.lip')
+
+        # Initialize the speech system for this room; the baked store loads one interaction at a
+        # time, loose JSON is the development fallback
+        dialogue = 'dialogue_files/dialogue.db'
+        if not vfs.exists(dialogue):
+            dialogue = 'dialogue_files/room1_dialogue.json'
+        self.speech = SpeechSystem(self.character, 'room1', dialogue,
+                                   audio=self.fmod_manager, lip_sync=self.lip_sync,
+                                   portrait_manager=self.portrait_manager)
 
         # Play background music using FMOD
         self.fmod_manager.load_music('assets/music/room1_bg.flac')
         self.fmod_manager.set_music_volume(0.8)
 
         # Play environmental SFX using FMOD
-        wind_sound = self.fmod_manager.load_sound('assets/sfx/wind.opus', loop=True)
-        self.wind_channel = self.fmod_manager.play_sound(wind_sound)
+        self.wind_sound = self.fmod_manager.load_sound('assets/sfx/wind.opus', loop=True)
+        self.wind_channel = self.fmod_manager.play_sound(self.wind_sound)
 
         # Add objects to the layer manager
         self.layer_manager.add_object(self.character)
+        # Room1 is a single screen; wider rooms set larger bounds and the camera scrolls
+        self.camera.set_bounds(0, 0, window.width, window.height)
+        self.layer_manager.set_camera(self.camera)
+        self.camera.follow(self.character.sprite)
+
+        # Pixel-accurate hit testing against the masks baked for each walk frame
+        self.hotspots = HotspotIndex(self.camera)
+        self.mask_paths = self.animation_manager.mask_sources.get("walk", [])
+        self.hotspots.add(Hotspot("character", self.character, [load_mask(p) for p in self.mask_paths],
+                                  on_click=self.on_character_click,
+                                  on_enter=self.on_hotspot_enter, on_leave=self.on_hotspot_leave))
 
         # Tween example: move character from (100, 100) to (400, 400)
         self.tweening_manager.tween_position(self.character.sprite, (100, 100), (400, 400), 2.0)
 
-        # Set up window events
-        self.window.push_handlers(self.on_draw, self.on_resize)
-        pyglet.clock.schedule_interval(self.update, 1/60)
+        # Set up window events; updates are driven by the game loop (see register)
+        self.window.push_handlers(self.on_draw, self.on_resize,
+                                  self.hotspots.on_mouse_motion, self.hotspots.on_mouse_press)
+        self.loop = None
 
     def on_draw(self):
+        self.shader_manager.begin_frame()
         self.window.clear()
         self.camera.begin()
 
-        # Use CRT shader
-        self.shader_manager.use_shader('crt')
-
-        self.layer_manager.draw()
-        self.video_manager.draw()  # Draw video if playing
-        self.speech.draw()
-
-        # Stop using shader
-        self.shader_manager.stop_shader()
+        with debug.scope('draw.layers'):
+            self.layer_manager.draw()
+        with debug.scope('draw.video'):
+            self.video_manager.draw()  # Draw video if playing
 
         self.camera.end()
+        # Subtitles are screen space, drawn under the post-process like the rest of the frame
+        with debug.scope('draw.speech'):
+            self.speech.draw()
+        with debug.scope('draw.post_process'):
+            self.shader_manager.end_frame()
+        debug.display_fps(self.window)
+
+    def post_scale(self, width):
+        return min(1.0, MAX_INTERNAL_WIDTH / width)
 
     def on_resize(self, width, height):
         self.camera.resize(width, height)
-
-    def update(self, dt):
-        self.fmod_manager.update()  # Update FMOD system
-        self.tweening_manager.update(dt)  # Update tween animations
-        for obj in self.layer_manager.objects:
-            obj.update(dt)
+        self.post_process.set_internal_resolution(scale=self.post_scale(width))
+
+    def register(self, loop):
+        self.loop = loop
+        loop.add_fixed('update.tweens', self.tweening_manager.update, owner=self)
+        loop.add_fixed('update.layers', self.layer_manager.update, owner=self)
+        loop.add_rate('update.fmod', lambda dt: self.fmod_manager.update(), 30, owner=self)
+        loop.add_frame('update.lip_sync', lambda dt: self.lip_sync.update(), owner=self)
+        loop.add_frame('update.camera', self.camera.update, owner=self)
+        loop.add_frame('update.speech', self.speech.update, owner=self)
+        loop.add_rate('update.hotspots', self.hotspots.refresh, 10, owner=self)
+        loop.add_interpolated(self.layer_manager, owner=self)
+
+    def on_hotspot_enter(self, hotspot):
+        self.window.set_mouse_cursor(self.window.get_system_mouse_cursor(self.window.CURSOR_HAND))
+
+    def on_hotspot_leave(self, hotspot):
+        self.window.set_mouse_cursor(None)
+
+    def on_character_click(self, hotspot):
+        self.speech.set_interaction("greeting", "hero")
+        self.speech.play_line(0)
+
+    def get_state(self):
+        self.layer_manager.restore()
+        return {
+            'room': 'room1',
+            'character': {'x': self.character.sprite.x, 'y': self.character.sprite.y},
+        }
+
+    def restore_state(self, state):
+        character = state.get('character')
+        if character:
+            self.tweening_manager.cancel(self.character.sprite)
+            sprite = self.character.sprite
+            sprite.position = (character['x'], character['y'], sprite.z)
+            self.character.save_state()
+
+    def cleanup(self):
+        if self.loop:
+            self.loop.remove_owner(self)
+        self.window.pop_handlers()
+        self.speech.release()
+        self.fmod_manager.stop_sound(self.wind_channel)
+        self.fmod_manager.stop_music()
+        self.fmod_manager.release_sound(self.wind_sound)
+        self.character.release()
+        self.portrait_manager.release()
+        self.animation_manager.release()
+        self.sfx_manager.unload()
+        for path in self.mask_paths:
+            release_mask(path)
+        self.shader_manager.release()
 
     def shutdown(self):
-        self.fmod_manager.shutdown()
+        self.fmod_manager.stop_music()
         self.video_manager.stop_video()
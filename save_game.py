@@ -1,20 +1,187 @@
 
 import json
+import os
+import pickle
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import pyglet
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+SAVE_DIRECTORY = 'saves'
+AUTOSAVE_SLOT = 0
+FULL_SAVE_EVERY = 10  # autosaves written as deltas before the next full snapshot
+MAGIC = b'GSV1'
+
+def compress(data):
+    if zstandard:
+        return b'S' + zstandard.ZstdCompressor(level=3).compress(data)
+    return b'Z' + zlib.compress(data, 6)
+
+def decompress(data):
+    if data[:1] == b'S':
+        return zstandard.ZstdDecompressor().decompress(data[1:])
+    return zlib.decompress(data[1:])
+
+def diff(old, new):
+    # Nested dict delta: {'=': {key: value}, '-': [keys], '~': {key: subdelta}}
+    delta = {}
+    for key, value in new.items():
+        if key not in old:
+            delta.setdefault('=', {})[key] = value
+        elif isinstance(value, dict) and isinstance(old[key], dict):
+            sub = diff(old[key], value)
+            if sub:
+                delta.setdefault('~', {})[key] = sub
+        elif old[key] != value:
+            delta.setdefault('=', {})[key] = value
+    removed = [key for key in old if key not in new]
+    if removed:
+        delta['-'] = removed
+    return delta
+
+def apply_delta(base, delta):
+    for key in delta.get('-', ()):
+        base.pop(key, None)
+    base.update(delta.get('=', {}))
+    for key, sub in delta.get('~', {}).items():
+        apply_delta(base[key], sub)
+    return base
 
 class SaveGame:
-    def __init__(self, game):
+    def __init__(self, game, directory=SAVE_DIRECTORY):
         self.game = game
+        self.directory = directory
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='save-game')
+        self.bases = {}           # slot -> last full snapshot, only touched on the worker
+        self.deltas_written = {}
+        self.pending = None
+        self.autosave_state = None
+
+    def slot_path(self, slot, kind):
+        return os.path.join(self.directory, f"slot{slot}.{kind}")
+
+    def save(self, data, slot=AUTOSAVE_SLOT, full=False):
+        # Cheap deep copy on the main thread; everything else happens on the worker
+        snapshot = pickle.loads(pickle.dumps(data, pickle.HIGHEST_PROTOCOL))
+        self.pending = self.executor.submit(self.write_snapshot, slot, snapshot, full)
+        self.pending.add_done_callback(self.report_failure)
+        return self.pending
+
+    def report_failure(self, future):
+        # Autosaves are fire-and-forget, so a full disk would otherwise go unnoticed
+        if not future.cancelled() and future.exception() is not None:
+            print(f"Saving failed: {future.exception()!r}")
+
+    def write_snapshot(self, slot, snapshot, full):
+        os.makedirs(self.directory, exist_ok=True)
+        base = self.bases.get(slot)
+        if base is None and not full:
+            try:
+                base = self.read_file(self.slot_path(slot, 'full'))
+            except ValueError:
+                base = None
+        if full or base is None or self.deltas_written.get(slot, 0) >= FULL_SAVE_EVERY:
+            # The delta goes first: a crash in between leaves the old full save on its own,
+            # never a new full save with a delta taken against the old one
+            if os.path.exists(self.slot_path(slot, 'delta')):
+                os.remove(self.slot_path(slot, 'delta'))
+            self.write_file(self.slot_path(slot, 'full'), snapshot)
+            self.bases[slot] = snapshot
+            self.deltas_written[slot] = 0
+        else:
+            # Always relative to the last full save, so loading needs at most one delta
+            self.write_file(self.slot_path(slot, 'delta'), diff(base, snapshot))
+            self.bases[slot] = base
+            self.deltas_written[slot] = self.deltas_written.get(slot, 0) + 1
+        self.write_index(slot, snapshot)
+
+    def write_file(self, path, data):
+        payload = MAGIC + compress(json.dumps(data, separators=(',', ':')).encode('utf-8'))
+        temp_path = path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
 
-    def save(self, data):
-        with open('save_file.json', 'w') as save_file:
-            json.dump(data, save_file)
+    def read_file(self, path):
+        try:
+            with open(path, 'rb') as f:
+                payload = f.read()
+        except FileNotFoundError:
+            return None
+        if payload[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a save file")
+        try:
+            return json.loads(decompress(payload[len(MAGIC):]))
+        except Exception as error:
+            raise ValueError(f"{path} is truncated or corrupt") from error
+
+    def write_index(self, slot, snapshot):
+        index = self.read_index()
+        index['last_slot'] = slot
+        index.setdefault('slots', {})[str(slot)] = {'time': time.time(), 'room': snapshot.get('room')}
+        path = os.path.join(self.directory, 'index.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(index, f)
+        os.replace(path + '.tmp', path)
+
+    def read_index(self):
+        try:
+            with open(os.path.join(self.directory, 'index.json'), 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def load(self, slot=None):
+        self.wait()
+        if slot is None:
+            slot = self.read_index().get('last_slot')
+            if slot is None:
+                raise FileNotFoundError("No save file found")
+        data = self.read_file(self.slot_path(slot, 'full'))
+        if data is None:
+            raise FileNotFoundError(f"No save in slot {slot}")
+        delta = self.read_file(self.slot_path(slot, 'delta'))
+        return apply_delta(data, delta) if delta else data
+
+    def start_autosave(self, get_state, interval=60.0):
+        self.stop_autosave()
+        self.autosave_state = get_state
+        pyglet.clock.schedule_interval(self.autosave, interval)
+
+    def stop_autosave(self):
+        if self.autosave_state:
+            pyglet.clock.unschedule(self.autosave)
+            self.autosave_state = None
+
+    def autosave(self, dt):
+        # Skip if the previous write is still in flight or there is nothing to save
+        if self.pending is None or self.pending.done():
+            state = self.autosave_state()
+            if state is not None:
+                self.save(state, AUTOSAVE_SLOT)
+
+    def wait(self):
+        # Only waits; report_failure has already printed a failed write
+        if self.pending is not None:
+            self.pending.exception()
 
     def load_last_game(self):
         try:
-            with open('save_file.json', 'r') as save_file:
-                data = json.load(save_file)
-                # Load the saved state, for example:
-                # self.game.load_room(Room1)
+            data = self.load()
         except FileNotFoundError:
             print("No save file found. Starting a new game.")
             self.game.start_new_game()
+            return
+        except ValueError as error:
+            print(f"Save file could not be read ({error}). Starting a new game.")
+            self.game.start_new_game()
+            return
+        self.game.restore_game(data)
@@ -1,5 +1,7 @@
 
 import pyglet
+from texture_residency import residency
+from ui_text import MenuLabels
 
 class SettingsScreen:
     def __init__(self, window, game):
@@ -18,35 +20,24 @@ class SettingsScreen:
         self.display_modes = ["Windowed", "Borderless", "Fullscreen"]
         self.selected_display_mode = 0
 
-        self.background = pyglet.resource.image('assets/images/settings_background.png')
-        self.labels = self.setup_labels()
+        self.textures = residency.owner('background')
+        self.background = self.textures.image('assets/images/settings_background.png')
+        self.labels = MenuLabels(self.window, self.options)
 
         self.window.push_handlers(self.on_draw, self.on_key_press)
 
-    def setup_labels(self):
-        labels = []
-        for i, option in enumerate(self.options):
-            label = pyglet.text.Label(option,
-                                      font_name='Arial',
-                                      font_size=36,
-                                      x=self.window.width // 2, 
-                                      y=self.window.height // 2 - i * 60,
-                                      anchor_x='center', anchor_y='center')
-            labels.append(label)
-        return labels
-
     def on_draw(self):
         self.window.clear()
         self.background.blit(0, 0)
-        for i, label in enumerate(self.labels):
-            label.color = (255, 255, 0, 255) if i == self.selected_index else (255, 255, 255, 255)
-            label.draw()
+        self.labels.draw()
 
     def on_key_press(self, symbol, modifiers):
         if symbol == pyglet.window.key.UP:
             self.selected_index = (self.selected_index - 1) % len(self.options)
+            self.labels.select(self.selected_index)
         elif symbol == pyglet.window.key.DOWN:
             self.selected_index = (self.selected_index + 1) % len(self.options)
+            self.labels.select(self.selected_index)
         elif symbol == pyglet.window.key.ENTER:
             self.select_option()
 
@@ -78,8 +69,8 @@ class SettingsScreen:
 
     def apply_resolution(self):
         width, height = self.resolutions[self.selected_resolution]
+        # The active screen's on_resize handler adapts to the new size
         self.window.set_size(width, height)
-        self.game.current_screen.camera.resize(width, height)
 
     def apply_volume_changes(self):
         self.game.mixer.set_music_volume(self.music_volume)
@@ -95,5 +86,13 @@ class SettingsScreen:
         elif mode == "Fullscreen":
             self.window.set_fullscreen(True)
 
+    def suspend(self):
+        self.window.pop_handlers()
+
+    def resume(self):
+        self.window.push_handlers(self.on_draw, self.on_key_press)
+
     def cleanup(self):
         self.window.pop_handlers()
+        self.labels.delete()
+        self.textures.release()
@@ -1,23 +1,80 @@
 
+import time
 import pyglet
+from resource_cache import resources
+from virtual_fs import vfs
+
+def decode_sfx(file):
+    with vfs.open(file) as f:
+        return pyglet.media.load(file, file=f, streaming=False)
+
+def source_size(source):
+    return int(source.duration * source.audio_format.bytes_per_second) if source.audio_format else 0
 
 class SFXManager:
-    def __init__(self):
-        self.sfx_player = pyglet.media.Player()
-
-    def play_sfx(self, file, volume=1.0, loop=False, pan=0.0, distance=1.0):
-        sfx = pyglet.media.load(file, streaming=False)
-        self.sfx_player.queue(sfx)
-        self.sfx_player.volume = volume
-        self.sfx_player.position = (distance, 0, 0)
-        self.sfx_player.pan = pan
-        self.sfx_player.loop = loop
-        self.sfx_player.play()
+    def __init__(self, max_players=16):
+        self.sources = {}
+        self.players = [pyglet.media.Player() for _ in range(max_players)]
+        self.playing = {}      # player -> (file, start time, volume)
+        self.last_played = {}
+        self.limits = {}
+        self.volume = 1.0
+        for player in self.players:
+            player.push_handlers(on_eos=lambda player=player: self.playing.pop(player, None))
+
+    def preload(self, files):
+        # Decode once per room so playing never touches the disk or the decoder
+        for file in files:
+            if file not in self.sources:
+                self.sources[file] = resources.acquire(('sfx', file), lambda file=file: decode_sfx(file), size=source_size)
+
+    def unload(self):
+        for file in self.sources:
+            resources.release(('sfx', file))
+        self.sources.clear()
+
+    def set_limit(self, file, max_instances=None, cooldown=0.0):
+        self.limits[file] = (max_instances, cooldown)
+
+    def play_sfx(self, file, volume=1.0, loop=False, pan=0.0, distance=1.0, position=None):
+        if file not in self.sources:
+            self.preload([file])
+        now = time.perf_counter()
+        max_instances, cooldown = self.limits.get(file, (None, 0.0))
+        if cooldown and now - self.last_played.get(file, -cooldown) < cooldown:
+            return None
+
+        instances = sorted((start, id(p), p) for p, (f, start, _) in self.playing.items() if f == file)
+        if max_instances is not None and len(instances) >= max_instances:
+            player = instances[0][2]
+        else:
+            player = self.free_player()
+
+        if player.source is not None:
+            player.pause()
+            player.next_source()
+        player.queue(self.sources[file])
+        player.volume = volume * self.volume
+        player.position = position if position is not None else (pan, 0, -distance)
+        player.loop = loop
+        player.play()
+        self.playing[player] = (file, now, volume)
+        self.last_played[file] = now
+        return player
+
+    def free_player(self):
+        for player in self.players:
+            if player not in self.playing:
+                return player
+        # All busy: reuse the one that started first
+        return min(self.playing.items(), key=lambda item: item[1][1])[0]
 
     def stop_sfx(self):
-        if self.sfx_player:
-            self.sfx_player.pause()
+        for player in list(self.playing):
+            player.pause()
+        self.playing.clear()
 
     def set_volume(self, volume):
-        if self.sfx_player:
-            self.sfx_player.volume = volume
+        self.volume = volume
+        for player, (file, start, play_volume) in self.playing.items():
+            player.volume = play_volume * volume
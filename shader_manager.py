@@ -1,24 +1,304 @@
 
-import pyglet
+import time
+
+from pyglet.gl import (GL_COLOR_BUFFER_BIT, GL_LINEAR, GL_NEAREST, GL_TEXTURE0, GL_TRIANGLE_STRIP,
+                       glActiveTexture, glBindTexture, glClear, glClearColor, glViewport)
+from pyglet.graphics.shader import Shader, ShaderProgram
+from pyglet.image import Texture
+from pyglet.image.buffer import Framebuffer
+from virtual_fs import vfs
+
+# Every post-process pass draws one full-screen quad with this vertex shader. Fragment shaders
+# get `scene` (the previous pass), `resolution` (output size in pixels) and `time`.
+FULLSCREEN_VERTEX = """#version 330 core
+in vec2 position;
+in vec2 tex_coords;
+out vec2 uv;
+
+void main() {
+    uv = tex_coords;
+    gl_Position = vec4(position, 0.0, 1.0);
+}
+"""
+
+COPY_FRAGMENT = """#version 330 core
+in vec2 uv;
+out vec4 color;
+uniform sampler2D scene;
+
+void main() {
+    color = texture(scene, uv);
+}
+"""
+
+CRT_FRAGMENT = """#version 330 core
+in vec2 uv;
+out vec4 color;
+uniform sampler2D scene;
+uniform vec2 resolution;
+uniform float curvature = 0.08;
+uniform float scanline_strength = 0.25;
+
+void main() {
+    vec2 centered = uv * 2.0 - 1.0;
+    centered *= 1.0 + curvature * dot(centered, centered) * 0.25;
+    vec2 coords = centered * 0.5 + 0.5;
+    if (coords.x < 0.0 || coords.x > 1.0 || coords.y < 0.0 || coords.y > 1.0) {
+        color = vec4(0.0, 0.0, 0.0, 1.0);
+        return;
+    }
+    vec3 rgb = texture(scene, coords).rgb;
+    float scanline = 1.0 - scanline_strength * (0.5 + 0.5 * sin(coords.y * resolution.y * 3.14159));
+    color = vec4(rgb * scanline, 1.0);
+}
+"""
+
+BLOOM_FRAGMENT = """#version 330 core
+in vec2 uv;
+out vec4 color;
+uniform sampler2D scene;
+uniform vec2 resolution;
+uniform float threshold = 0.7;
+uniform float intensity = 0.6;
+uniform float radius = 2.0;
+
+void main() {
+    vec3 base = texture(scene, uv).rgb;
+    vec2 texel = radius / resolution;
+    vec3 glow = vec3(0.0);
+    float total = 0.0;
+    for (int x = -2; x <= 2; x++) {
+        for (int y = -2; y <= 2; y++) {
+            float weight = 1.0 / (1.0 + float(x * x + y * y));
+            vec3 sample_rgb = texture(scene, uv + vec2(x, y) * texel).rgb;
+            glow += max(sample_rgb - threshold, 0.0) * weight;
+            total += weight;
+        }
+    }
+    color = vec4(base + glow / total * intensity, 1.0);
+}
+"""
+
+VIGNETTE_FRAGMENT = """#version 330 core
+in vec2 uv;
+out vec4 color;
+uniform sampler2D scene;
+uniform float strength = 0.45;
+uniform float softness = 0.6;
+
+void main() {
+    vec3 rgb = texture(scene, uv).rgb;
+    float distance_from_center = length(uv - 0.5) * 1.41421;
+    float shade = 1.0 - strength * smoothstep(1.0 - softness, 1.0, distance_from_center);
+    color = vec4(rgb * shade, 1.0);
+}
+"""
+
+BUILTIN_EFFECTS = {
+    'copy': COPY_FRAGMENT,
+    'crt': CRT_FRAGMENT,
+    'bloom': BLOOM_FRAGMENT,
+    'vignette': VIGNETTE_FRAGMENT,
+}
+
+class RenderTarget:
+    def __init__(self, width, height, filter=GL_LINEAR):
+        self.width = width
+        self.height = height
+        self.texture = Texture.create(width, height, min_filter=filter, mag_filter=filter)
+        self.framebuffer = Framebuffer()
+        self.framebuffer.attach_texture(self.texture)
+
+    def bind(self):
+        self.framebuffer.bind()
+        glViewport(0, 0, self.width, self.height)
+
+    def delete(self):
+        self.framebuffer.delete()
+        self.texture.delete()
+
+class PostPass:
+    def __init__(self, name, program, uniforms=None):
+        self.name = name
+        self.program = program
+        self.enabled = True
+        self.values = {}
+        self.pending = dict(uniforms or {})
+        # One quad per pass: pyglet keeps a vertex array per program
+        self.quad = program.vertex_list(4, GL_TRIANGLE_STRIP,
+                                        position=('f', (-1, -1, 1, -1, -1, 1, 1, 1)),
+                                        tex_coords=('f', (0, 0, 1, 0, 0, 1, 1, 1)))
+
+    def set(self, name, value):
+        if self.values.get(name) != value:
+            self.pending[name] = value
+
+    def apply(self):
+        # Only changed values reach glUniform; the program caches the locations
+        uniforms = self.program.uniforms
+        for name, value in self.pending.items():
+            if name in uniforms:
+                self.program[name] = value
+            self.values[name] = value
+        self.pending.clear()
+
+    def delete(self):
+        self.quad.delete()
+
+class PostProcessChain:
+    # The scene renders into `scene` at the internal resolution; each enabled pass reads the
+    # previous result and writes to one of two reused ping-pong targets, the last to the window.
+    def __init__(self, window, shader_manager, scale=1.0, filter=GL_LINEAR):
+        self.window = window
+        self.shader_manager = shader_manager
+        self.scale = scale
+        self.internal_size = None
+        self.filter = filter
+        self.passes = []
+        self.scene = None
+        self.ping_pong = []
+        self.copy = PostPass('copy', shader_manager.builtin('copy'))
+        self.start_time = time.perf_counter()
+
+    def set_internal_resolution(self, scale=None, size=None):
+        # Either a fraction of the window (0.5 renders a quarter of the pixels) or a fixed size
+        self.scale = scale if scale is not None else self.scale
+        self.internal_size = size
+        self.release_targets()
+
+    def set_filter(self, nearest=False):
+        self.filter = GL_NEAREST if nearest else GL_LINEAR
+        self.release_targets()
+
+    def target_size(self):
+        if self.internal_size:
+            return self.internal_size
+        width, height = self.window.get_framebuffer_size()
+        return max(1, int(width * self.scale)), max(1, int(height * self.scale))
+
+    def add_pass(self, name, uniforms=None, program=None):
+        program = program or self.shader_manager.shaders.get(name) or self.shader_manager.builtin(name)
+        post_pass = PostPass(name, program, uniforms)
+        self.passes.append(post_pass)
+        return post_pass
+
+    def get_pass(self, name):
+        for post_pass in self.passes:
+            if post_pass.name == name:
+                return post_pass
+        return None
+
+    def remove_pass(self, name):
+        post_pass = self.get_pass(name)
+        if post_pass:
+            self.passes.remove(post_pass)
+            post_pass.delete()
+
+    def ensure_targets(self):
+        width, height = self.target_size()
+        if self.scene is None or (self.scene.width, self.scene.height) != (width, height):
+            self.release_targets()
+            self.scene = RenderTarget(width, height, self.filter)
+            self.ping_pong = [RenderTarget(width, height, self.filter) for _ in range(2)]
+
+    def release_targets(self):
+        for target in [self.scene] + self.ping_pong:
+            if target is not None:
+                target.delete()
+        self.scene = None
+        self.ping_pong = []
+
+    def begin(self):
+        self.ensure_targets()
+        self.scene.bind()
+        glClearColor(0, 0, 0, 1)
+        glClear(GL_COLOR_BUFFER_BIT)
+
+    def end(self):
+        elapsed = time.perf_counter() - self.start_time
+        self.scene.framebuffer.unbind()
+        passes = [p for p in self.passes if p.enabled] or [self.copy]
+        source = self.scene
+        for index, post_pass in enumerate(passes):
+            last = index == len(passes) - 1
+            if last:
+                width, height = self.window.get_framebuffer_size()
+                glViewport(0, 0, width, height)
+            else:
+                target = self.ping_pong[index % 2]
+                target.bind()
+                width, height = target.width, target.height
+            post_pass.set('resolution', (float(width), float(height)))
+            post_pass.set('time', elapsed)
+            post_pass.set('scene', 0)
+            self.draw_pass(post_pass, source)
+            if not last:
+                target.framebuffer.unbind()
+                source = target
+
+    def draw_pass(self, post_pass, source):
+        post_pass.program.use()
+        post_pass.apply()
+        glActiveTexture(GL_TEXTURE0)
+        glBindTexture(source.texture.target, source.texture.id)
+        post_pass.quad.draw(GL_TRIANGLE_STRIP)
+        post_pass.program.stop()
+
+    def delete(self):
+        self.release_targets()
+        for post_pass in self.passes + [self.copy]:
+            post_pass.delete()
+        self.passes.clear()
 
 class ShaderManager:
     def __init__(self):
         self.shaders = {}
+        self.post = None
 
     def load_shader(self, name, vertex_path, fragment_path):
-        with open(vertex_path, 'r') as f:
-            vertex_src = f.read()
-        with open(fragment_path, 'r') as f:
-            fragment_src = f.read()
-
-        self.shaders[name] = pyglet.graphics.shader.ShaderProgram(
-            pyglet.graphics.shader.Shader(vertex_src, 'vertex'),
-            pyglet.graphics.shader.Shader(fragment_src, 'fragment')
+        vertex_src = vfs.read_text(vertex_path)
+        fragment_src = vfs.read_text(fragment_path)
+
+        self.shaders[name] = ShaderProgram(
+            Shader(vertex_src, 'vertex'),
+            Shader(fragment_src, 'fragment')
         )
 
+    def load_post_shader(self, name, fragment_path):
+        # Post-process passes share the full-screen vertex shader
+        self.shaders[name] = ShaderProgram(Shader(FULLSCREEN_VERTEX, 'vertex'),
+                                           Shader(vfs.read_text(fragment_path), 'fragment'))
+
+    def builtin(self, name):
+        key = 'builtin:' + name
+        if key not in self.shaders:
+            self.shaders[key] = ShaderProgram(Shader(FULLSCREEN_VERTEX, 'vertex'),
+                                              Shader(BUILTIN_EFFECTS[name], 'fragment'))
+        return self.shaders[key]
+
+    def create_post_process(self, window, scale=1.0):
+        self.post = PostProcessChain(window, self, scale)
+        return self.post
+
+    def begin_frame(self):
+        if self.post:
+            self.post.begin()
+
+    def end_frame(self):
+        if self.post:
+            self.post.end()
+
     def use_shader(self, name):
         if name in self.shaders:
             self.shaders[name].use()
 
     def stop_shader(self):
-        pyglet.graphics.shader.ShaderProgram.stop()
+        ShaderProgram.stop()
+
+    def release(self):
+        if self.post:
+            self.post.delete()
+            self.post = None
+        for program in self.shaders.values():
+            program.delete()
+        self.shaders.clear()
@@ -0,0 +1,72 @@
+
+CELL_SIZE = 256
+
+class SpatialHash:
+    # Uniform grid of object bounds. Each object remembers the cell range it occupies, so moving
+    # within the same cells is a tuple compare and only crossing a cell edge touches the grid.
+    def __init__(self, cell_size=CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.ranges = {}
+
+    def cell_range(self, rect):
+        left, bottom, right, top = rect
+        size = self.cell_size
+        return (int(left // size), int(bottom // size), int(right // size), int(top // size))
+
+    def insert(self, obj, rect):
+        cells = self.cell_range(rect)
+        self.ranges[obj] = cells
+        self.add_cells(obj, cells)
+
+    def move(self, obj, rect):
+        cells = self.cell_range(rect)
+        old = self.ranges.get(obj)
+        if old == cells:
+            return
+        if old is not None:
+            self.remove_cells(obj, old)
+        self.ranges[obj] = cells
+        self.add_cells(obj, cells)
+
+    def remove(self, obj):
+        cells = self.ranges.pop(obj, None)
+        if cells is not None:
+            self.remove_cells(obj, cells)
+
+    def add_cells(self, obj, cells):
+        x0, y0, x1, y1 = cells
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                bucket = self.cells.get((cx, cy))
+                if bucket is None:
+                    bucket = self.cells[(cx, cy)] = set()
+                bucket.add(obj)
+
+    def remove_cells(self, obj, cells):
+        x0, y0, x1, y1 = cells
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                bucket = self.cells.get((cx, cy))
+                if bucket is not None:
+                    bucket.discard(obj)
+                    if not bucket:
+                        del self.cells[(cx, cy)]
+
+    def query(self, rect):
+        # Objects in any overlapping cell; a conservative superset of what actually intersects
+        x0, y0, x1, y1 = self.cell_range(rect)
+        found = set()
+        cells = self.cells
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                bucket = cells.get((cx, cy))
+                if bucket:
+                    found |= bucket
+        return found
+
+    def __contains__(self, obj):
+        return obj in self.ranges
+
+    def __len__(self):
+        return len(self.ranges)
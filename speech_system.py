@@ -1,22 +1,91 @@
 
-import pyglet
+import json
+import os
+from dialogue_db import DialogueDatabase, speech_filename
+from fmod_manager import SPEECH_PRIORITY
+from lip_sync import REST_SHAPE, channel_position, clock_position
+from virtual_fs import vfs
+from ui_text import DialogueBox
+
+SPEECH_DIRECTORY = "assets/audio/speech"
 
 class SpeechSystem:
-    def __init__(self, character, room_name, dialogue_file):
+    # audio is the FMODManager that plays the line; lip_sync drives portrait_manager from its position
+    def __init__(self, character, room_name, dialogue_file, audio=None, lip_sync=None, portrait_manager=None):
         self.character = character
         self.room_name = room_name
         self.dialogue_file = dialogue_file
+        self.audio = audio
+        self.lip_sync = lip_sync
+        self.portrait_manager = portrait_manager
+        self.database = None
+        self.dialogue = None
         self.current_dialogue = None
+        self.dialogue_box = DialogueBox()
+        self.speech_sound = None
+        self.voice = None
         self.load_dialogue()
 
     def load_dialogue(self):
-        # Load the dialogue from the file (example placeholder)
-        self.current_dialogue = {"lines": ["Hello!", "How are you?"]}
+        # Compiled .db files load one interaction at a time, JSON is parsed up front
+        if self.dialogue_file.endswith(".db") and vfs.exists(self.dialogue_file):
+            self.database = DialogueDatabase(self.dialogue_file)
+        elif vfs.exists(self.dialogue_file):
+            self.dialogue = json.loads(vfs.read_text(self.dialogue_file))
+        # Placeholder until an interaction is selected
+        self.current_dialogue = {"lines": ["Hello!", "How are you?"], "speech": [None, None]}
+
+    def set_interaction(self, interaction, char_name):
+        if self.database:
+            lines = self.database.lines(self.room_name, interaction, char_name)
+        elif self.dialogue:
+            lines = [(text, speech_filename(char_name, self.room_name, interaction, i))
+                     for i, text in enumerate(self.dialogue.get(interaction, {}).get(char_name, []), start=1)]
+        else:
+            lines = []
+        self.current_dialogue = {"lines": [text for text, _ in lines], "speech": [speech for _, speech in lines]}
 
     def play_line(self, index):
         if index < len(self.current_dialogue["lines"]):
-            print(self.current_dialogue["lines"][index])  # Placeholder for actual speech playback
+            # Laid out once here; update() only reveals glyphs
+            self.dialogue_box.show(self.current_dialogue["lines"][index])
+            self.play_speech(self.current_dialogue["speech"][index])
+
+    def play_speech(self, filename):
+        self.stop_speech()
+        path = f"{SPEECH_DIRECTORY}/{filename}" if filename else None
+        if self.audio is None or path is None or not vfs.exists(path):
+            return
+        self.speech_sound = self.audio.load_sound(path, stream=True)
+        self.voice = self.audio.play_sound(self.speech_sound, priority=SPEECH_PRIORITY)
+        if self.lip_sync and self.portrait_manager:
+            # Timelines are named after the speech file and follow the channel, not the frame clock
+            channel = self.voice.channel
+            position = channel_position(channel) if channel is not None else clock_position()
+            self.lip_sync.play(os.path.splitext(filename)[0], self.portrait_manager, position)
+
+    def stop_speech(self):
+        if self.voice is not None:
+            self.audio.stop_sound(self.voice)
+            self.voice = None
+        if self.speech_sound is not None:
+            self.audio.release_sound(self.speech_sound)
+            self.speech_sound = None
+        if self.lip_sync and self.portrait_manager:
+            self.lip_sync.stop(self.portrait_manager)
+            self.portrait_manager.set_state(self.lip_sync.shape_states[REST_SHAPE])
+
+    def skip(self):
+        self.dialogue_box.skip()
+
+    def update(self, dt):
+        self.dialogue_box.update(dt)
 
     def draw(self):
-        # Placeholder for drawing the speech on screen
-        pass
+        self.dialogue_box.draw()
+
+    def release(self):
+        self.stop_speech()
+        self.dialogue_box.delete()
+        if self.database:
+            self.database.close()
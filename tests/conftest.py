@@ -0,0 +1,33 @@
+
+import os
+import sys
+
+import pyglet
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# No display in CI; pyglet's EGL headless mode still gives a real GL context
+pyglet.options['headless'] = True
+
+
+@pytest.fixture(scope='session')
+def window():
+    window = pyglet.window.Window(800, 600, visible=False)
+    yield window
+    window.close()
+
+
+@pytest.fixture
+def lit_rect():
+    # Bounding box (x, y, width, height) of the bright pixels of one channel in the window's framebuffer
+    def measure(channel='R'):
+        image = pyglet.image.get_buffer_manager().get_color_buffer().get_image_data()
+        pixels = image.get_data(channel, image.width)
+        lit = [(i % image.width, i // image.width) for i, value in enumerate(pixels) if value > 128]
+        if not lit:
+            return None
+        xs = [x for x, _ in lit]
+        ys = [y for _, y in lit]
+        return min(xs), min(ys), max(xs) - min(xs) + 1, max(ys) - min(ys) + 1
+    return measure
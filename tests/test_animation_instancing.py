@@ -0,0 +1,24 @@
+
+from PIL import Image
+
+from animation_manager import AnimationManager
+
+
+def test_crowd_from_loose_frames(window, tmp_path, lit_rect):
+    # Loose frames load as separate Textures, which the sheet packs into one atlas texture
+    for i, color in enumerate([(255, 0, 0, 255), (0, 255, 0, 255), (0, 0, 255, 255)]):
+        Image.new('RGBA', (16, 16), color).save(tmp_path / f"{i}.png")
+    manager = AnimationManager()
+    manager.load_animation('walk', str(tmp_path), 0.1)
+    crowd = manager.create_crowd('walk', capacity=4)
+    crowd.add(100, 50)
+    crowd.add(300, 200, offset=0.1)
+    crowd.update(0.0)
+
+    window.switch_to()
+    window.clear()
+    crowd.draw()
+    assert lit_rect('R') == (100, 50, 16, 16)
+    assert lit_rect('G') == (300, 200, 16, 16)
+    crowd.delete()
+    manager.release()
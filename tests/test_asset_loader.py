@@ -0,0 +1,41 @@
+
+import time
+
+from PIL import Image
+
+from asset_loader import AssetLoader
+from resource_cache import resources
+
+
+def wait_for(loader, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not loader.done:
+        assert time.monotonic() < deadline, "preload did not finish"
+        loader.upload()
+        time.sleep(0.01)
+
+
+def test_preload_decodes_images_and_audio(tmp_path, window, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for i in range(3):
+        Image.new('RGBA', (8, 4), (i, 0, 0, 255)).save(f"frame_{i}.png")
+    with open('sound.opus', 'wb') as f:
+        f.write(b'OggS-data')
+
+    loader = AssetLoader(max_workers=2)
+    try:
+        loader.preload(images=['.'], audio=['sound.opus'])
+        assert loader.total == 4
+        wait_for(loader)
+    finally:
+        loader.shutdown()
+
+    assert loader.errors == {}
+    assert loader.progress == 1.0
+    for i in range(3):
+        texture = loader.image(f"./frame_{i}.png")
+        assert (texture.width, texture.height) == (8, 4)
+        loader.release_image(f"./frame_{i}.png")
+    assert bytes(loader.audio_data('sound.opus')) == b'OggS-data'
+    loader.release_audio_data('sound.opus')
+    assert ('audio', 'sound.opus') not in resources
@@ -0,0 +1,93 @@
+
+import pytest
+
+pyo = pytest.importorskip('pyo')
+
+from audio_mixer import AudioMixer
+
+
+@pytest.fixture(scope='module')
+def mixer():
+    # 'manual' is pyo's offline mode that renders one buffer per process() call
+    mixer = AudioMixer(audio='manual')
+    yield mixer
+    mixer.shutdown()
+
+
+def advance(mixer, seconds):
+    server = mixer.server
+    for _ in range(int(seconds * server.getSamplingRate() / server.getBufferSize()) + 1):
+        server.process()
+
+
+def test_insert_starts_with_its_level_and_stops_after_the_fade(mixer):
+    bus = mixer.buses['music']
+    assert bus.active_inserts() == []
+    mixer.apply_echo(wet=0.5, fade=0.1)
+    assert bus.active_inserts() == ['echo']
+    advance(mixer, 0.2)
+    mixer.remove_effect('echo', fade=0.1)
+    advance(mixer, 0.05)
+    assert bus.echo.isPlaying()
+    advance(mixer, 0.1)
+    assert not bus.echo.isPlaying()
+    assert bus.active_inserts() == []
+
+
+def test_sources_crossfade_on_the_bus(mixer):
+    bus = mixer.buses['sfx']
+    loud = pyo.Sig([1, 1])
+    quiet = pyo.Sig([0.25, 0.25])
+    bus.set_source(loud, fade=0.01)
+    advance(mixer, 0.1)
+    loud_peak = bus.meter.get()
+    assert loud_peak > 0
+
+    bus.set_source(quiet, fade=0.5)
+    advance(mixer, 0.25)
+    assert quiet.isPlaying() and loud.isPlaying()
+    assert 0.25 * loud_peak < bus.meter.get() < loud_peak
+
+    advance(mixer, 0.4)
+    assert not loud.isPlaying()
+    assert bus.meter.get() == pytest.approx(0.25 * loud_peak, rel=0.05)
+    mixer.stop('sfx')
+
+
+def test_positions_follow_rendered_audio(mixer, tmp_path):
+    path = str(tmp_path / 'tone.wav')
+    rate = int(mixer.server.getSamplingRate())
+    pyo.savefile([0.0] * rate, path, sr=rate, channels=1)
+    mixer.play('speech', path, fade=0.01)
+    advance(mixer, 0.5)
+    assert mixer.positions()['speech'] == pytest.approx(0.5, abs=0.02)
+    advance(mixer, 1.0)
+    assert mixer.positions()['speech'] == pytest.approx(1.0, abs=0.01)
+    mixer.stop('speech')
+    assert 'speech' not in mixer.positions()
+
+
+def test_remote_mixer_matches_the_local_interface():
+    from audio_process import RemoteAudioMixer
+    public = {name for name in dir(AudioMixer) if not name.startswith('_')}
+    assert public <= {name for name in dir(RemoteAudioMixer) if not name.startswith('_')}
+
+
+def test_remote_mixer_reports_positions_and_dsp(tmp_path):
+    import time
+    from audio_process import RemoteAudioMixer
+    path = str(tmp_path / 'tone.wav')
+    pyo.savefile([0.0] * 44100 * 5, path, sr=44100, channels=1)
+    mixer = RemoteAudioMixer(audio='manual')
+    try:
+        mixer.play('music', path)
+        mixer.apply_echo(bus='music')
+        deadline = time.monotonic() + 10
+        while 'music' not in mixer.positions() and time.monotonic() < deadline:
+            time.sleep(0.05)
+            mixer.poll()
+        assert mixer.positions()['music'] >= 0
+        assert mixer.dsp_report()['music']['active_inserts'] == ['echo']
+        assert not mixer.errors
+    finally:
+        mixer.shutdown()
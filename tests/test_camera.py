@@ -0,0 +1,63 @@
+
+import pyglet
+import pytest
+
+from camera import Camera
+from shader_manager import ShaderManager
+
+
+def render(window, camera, sprite, lit_rect):
+    window.switch_to()
+    window.clear()
+    camera.begin()
+    sprite.draw()
+    camera.end()
+    return lit_rect()
+
+
+@pytest.fixture
+def sprite(window):
+    image = pyglet.image.SolidColorImagePattern((255, 255, 255, 255)).create_image(16, 16)
+    sprite = pyglet.sprite.Sprite(image, x=100, y=50)
+    yield sprite
+    sprite.delete()
+
+
+def test_sprite_renders_at_native_size(window, sprite, lit_rect):
+    camera = Camera(window)
+    camera.set_bounds(0, 0, window.width, window.height)
+    assert camera.view_size() == (window.width, window.height)
+    assert render(window, camera, sprite, lit_rect) == (100, 50, 16, 16)
+
+
+def test_other_aspect_ratios_scale_uniformly_and_letterbox(window, sprite, lit_rect):
+    camera = Camera(window, width=400, height=400)
+    assert camera.viewport == (100, 0, 600, 600)
+    x, y, width, height = render(window, camera, sprite, lit_rect)
+    assert (width, height) == (24, 24)
+    assert (x, y) == (100 + 150, 75)
+    assert camera.screen_to_world(250, 75) == (100, 50)
+
+
+def test_camera_draws_inside_a_downscaled_post_process_target(window, lit_rect):
+    window.switch_to()
+    shaders = ShaderManager()
+    shaders.create_post_process(window, scale=0.5)
+    world = pyglet.sprite.Sprite(pyglet.image.SolidColorImagePattern((255, 0, 0, 255)).create_image(16, 16),
+                                 x=600, y=400)
+    subtitle = pyglet.sprite.Sprite(pyglet.image.SolidColorImagePattern((0, 0, 255, 255)).create_image(16, 16),
+                                    x=200, y=100)
+    camera = Camera(window)
+    window.clear()
+    shaders.begin_frame()
+    camera.begin()
+    world.draw()
+    camera.end()
+    # Screen space, like the subtitles, after the camera is done
+    subtitle.draw()
+    shaders.end_frame()
+    assert lit_rect('R') == pytest.approx((600, 400, 16, 16), abs=1)
+    assert lit_rect('B') == pytest.approx((200, 100, 16, 16), abs=1)
+    world.delete()
+    subtitle.delete()
+    shaders.release()
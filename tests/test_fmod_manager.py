@@ -0,0 +1,96 @@
+
+from types import SimpleNamespace
+
+from fmod_manager import ChannelPool, FMODManager
+
+
+class FakeChannel:
+    def __init__(self, sound):
+        self.sound = sound
+        self.volume = 1.0
+        self.is_playing = True
+
+    def stop(self):
+        self.is_playing = False
+
+
+class FakeSound:
+    def __init__(self, data=None, mode=0):
+        self.data = data
+        self.mode = mode
+        self.released = False
+
+    def release(self):
+        self.released = True
+
+
+class FakeSystem:
+    def __init__(self):
+        self.channels = []
+
+    def init(self):
+        pass
+
+    def play_sound(self, sound):
+        channel = FakeChannel(sound)
+        self.channels.append(channel)
+        return channel
+
+    def create_sound(self, data, mode, exinfo):
+        return FakeSound(bytes(data), mode)
+
+    def update(self):
+        pass
+
+    def release(self):
+        pass
+
+
+fake_fmod = SimpleNamespace(
+    System=FakeSystem,
+    CREATESOUNDEXINFO=lambda length: SimpleNamespace(length=length),
+    MODE=SimpleNamespace(DEFAULT=0, LOOP_NORMAL=1, CREATESAMPLE=2, CREATESTREAM=4, OPENMEMORY=8),
+)
+
+
+def test_full_pool_steals_the_lowest_priority_oldest_voice():
+    pool = ChannelPool(FakeSystem(), max_voices=2)
+    oldest = pool.play(FakeSound(), priority=10)
+    newer = pool.play(FakeSound(), priority=10)
+    important = pool.play(FakeSound(), priority=200)
+    assert oldest not in pool.voices
+    assert newer.channel is not None and important.channel is not None
+    assert pool.steals == 1
+
+
+def test_stolen_loop_is_virtualized_and_promoted_when_a_channel_frees():
+    pool = ChannelPool(FakeSystem(), max_voices=1)
+    ambience = pool.play(FakeSound(), priority=10, loop=True)
+    first_channel = ambience.channel
+    line = pool.play(FakeSound(), priority=200)
+    assert ambience.is_virtual and ambience in pool.voices
+    assert not first_channel.is_playing
+    line.channel.stop()
+    pool.update()
+    assert line not in pool.voices
+    assert not ambience.is_virtual
+    assert pool.stats() == {'real': 1, 'virtual': 0, 'peak_real': 1, 'peak_virtual': 0, 'steals': 1}
+
+
+def test_lower_priority_one_shot_is_dropped_when_full():
+    pool = ChannelPool(FakeSystem(), max_voices=1)
+    music = pool.play(FakeSound(), priority=255, loop=True)
+    click = pool.play(FakeSound(), priority=10)
+    assert click.is_virtual and click not in pool.voices
+    assert music.channel is not None and pool.steals == 0
+
+
+def test_loop_flag_and_streams_belong_to_the_handle(tmp_path):
+    path = tmp_path / 'line.opus'
+    path.write_bytes(b'OggS' * 16)
+    manager = FMODManager(max_voices=4, backend=fake_fmod)
+    sound = manager.load_sound(str(path), loop=True, stream=True)
+    voice = manager.play_sound(sound)
+    assert voice.loop and sound.key is None
+    manager.release_sound(sound)
+    assert sound.sound.released and not voice.channel and voice not in manager.pool.voices
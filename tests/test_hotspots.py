@@ -0,0 +1,45 @@
+
+import pyglet
+from PIL import Image
+
+from game_elements import GameCharacter
+from hotspots import Hotspot, load_mask, release_mask
+from texture_atlas import TextureAtlas, TextureAtlasBuilder
+
+
+def make_atlas(tmp_path):
+    frames = tmp_path / 'character_walk'
+    frames.mkdir()
+    # 32x32 frames with an 8x12 opaque block at (10, 4) from the top-left, minus its top-right
+    # 4x4 corner; everything around the block is trimmed away
+    image = Image.new('RGBA', (32, 32))
+    image.paste((255, 255, 255, 255), (10, 4, 18, 16))
+    image.paste((0, 0, 0, 0), (14, 4, 18, 8))
+    image.save(frames / '0.png')
+    builder = TextureAtlasBuilder(padding=2)
+    builder.add_directory(str(frames))
+    return TextureAtlas(builder.save(str(tmp_path / 'room_atlas.png')))
+
+
+def test_bounds_follow_the_trimmed_frame(window, tmp_path):
+    atlas = make_atlas(tmp_path)
+    region = atlas.get_region('character_walk/0.png')
+    character = GameCharacter(pyglet.image.Animation([pyglet.image.AnimationFrame(region, 0.1)]), x=100, y=50)
+    assert character.bounds() == (110, 66, 118, 78)
+    character.release()
+    atlas.release()
+
+
+def test_atlas_frames_get_baked_masks(window, tmp_path):
+    atlas = make_atlas(tmp_path)
+    source = atlas.mask_source('character_walk/0.png')
+    assert (tmp_path / 'room_atlas' / 'character_walk' / '0.mask').exists()
+    region = atlas.get_region('character_walk/0.png')
+    character = GameCharacter(pyglet.image.Animation([pyglet.image.AnimationFrame(region, 0.1)]), x=100, y=50)
+    hotspot = Hotspot('character', character, [load_mask(source)])
+    assert hotspot.contains(111, 70) and hotspot.contains(116, 70)
+    assert not hotspot.contains(116, 76)
+    assert not hotspot.contains(105, 70)
+    release_mask(source)
+    character.release()
+    atlas.release()
@@ -0,0 +1,102 @@
+
+import json
+import os
+import sys
+
+import pytest
+
+from rhubarb_integration import RhubarbIntegration
+
+# Stands in for the rhubarb executable: the audio file's content picks the behavior, and every
+# run is appended to calls.log so tests can see which files were really processed
+STUB = """#!{python}
+import json, sys, time
+args = sys.argv[1:]
+output = args[args.index('-o') + 1]
+audio = args[args.index('-o') - 1]
+with open({log!r}, 'a') as f:
+    f.write(audio + '\\n')
+content = open(audio, 'rb').read()
+if content == b'fail':
+    sys.stderr.write('Error: unsupported audio\\n')
+    sys.exit(1)
+if content == b'slow':
+    time.sleep(5)
+with open(output, 'w') as f:
+    json.dump({{'mouthCues': [{{'start': 0.0, 'end': 0.5, 'value': 'A'}}], 'options': args[:-3]}}, f)
+"""
+
+
+@pytest.fixture
+def stub(tmp_path):
+    log = tmp_path / 'calls.log'
+    path = tmp_path / 'rhubarb'
+    path.write_text(STUB.format(python=sys.executable, log=str(log)))
+    path.chmod(0o755)
+
+    def calls():
+        return sorted(os.path.basename(line) for line in log.read_text().splitlines()) if log.exists() else []
+    return str(path), calls
+
+
+def make_audio(tmp_path, files):
+    audio = tmp_path / 'speech'
+    audio.mkdir(exist_ok=True)
+    for name, content in files.items():
+        (audio / name).write_bytes(content)
+    return str(audio)
+
+
+def test_unchanged_files_are_skipped_by_hash_and_options(tmp_path, stub):
+    executable, calls = stub
+    audio = make_audio(tmp_path, {'a.opus': b'one', 'b.opus': b'two'})
+    output = str(tmp_path / 'lip_sync')
+    rhubarb = RhubarbIntegration(executable, max_workers=2)
+    results = rhubarb.batch_process(audio, output, progress=None)
+    assert sorted(results['processed']) == ['a.opus', 'b.opus']
+    with open(os.path.join(output, 'a.json')) as f:
+        assert json.load(f)['mouthCues'][0]['value'] == 'A'
+
+    results = rhubarb.batch_process(audio, output, progress=None)
+    assert sorted(results['skipped']) == ['a.opus', 'b.opus'] and not results['processed']
+
+    # Touched but unchanged: rehashed, and the hash still matches
+    path = os.path.join(audio, 'b.opus')
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    results = rhubarb.batch_process(audio, output, progress=None)
+    assert sorted(results['skipped']) == ['a.opus', 'b.opus']
+
+    # New content: reprocessed
+    stat = os.stat(path)
+    with open(path, 'wb') as f:
+        f.write(b'TWO')
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    results = rhubarb.batch_process(audio, output, progress=None)
+    assert results['processed'] == ['b.opus'] and results['skipped'] == ['a.opus']
+    assert calls() == ['a.opus', 'b.opus', 'b.opus']
+
+
+def test_changed_options_reprocess_everything(tmp_path, stub):
+    executable, calls = stub
+    audio = make_audio(tmp_path, {'a.opus': b'one'})
+    output = str(tmp_path / 'lip_sync')
+    RhubarbIntegration(executable).batch_process(audio, output, progress=None)
+    results = RhubarbIntegration(executable, options=['-f', 'json', '--extendedShapes', 'GX']).batch_process(
+        audio, output, progress=None)
+    assert results['processed'] == ['a.opus']
+    assert calls() == ['a.opus', 'a.opus']
+
+
+def test_failures_and_timeouts_are_reported_per_file(tmp_path, stub):
+    executable, calls = stub
+    audio = make_audio(tmp_path, {'good.opus': b'one', 'bad.opus': b'fail', 'slow.opus': b'slow'})
+    output = str(tmp_path / 'lip_sync')
+    results = RhubarbIntegration(executable, max_workers=3, timeout=1).batch_process(audio, output, progress=None)
+    assert results['processed'] == ['good.opus']
+    assert results['failed'] == {'bad.opus': 'Error: unsupported audio', 'slow.opus': 'timed out after 1s'}
+    assert sorted(os.listdir(output)) == ['good.json', 'rhubarb_manifest.json']
+
+    # Failed files stay out of the manifest, so the next run retries them
+    results = RhubarbIntegration(executable, max_workers=3, timeout=1).batch_process(audio, output, progress=None)
+    assert results['skipped'] == ['good.opus'] and set(results['failed']) == {'bad.opus', 'slow.opus'}
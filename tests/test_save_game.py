@@ -0,0 +1,52 @@
+
+import os
+
+import pytest
+
+import save_game
+from save_game import SaveGame
+
+
+class FakeGame:
+    def __init__(self):
+        self.restored = None
+        self.new_game = False
+
+    def start_new_game(self):
+        self.new_game = True
+
+    def restore_game(self, data):
+        self.restored = data
+
+
+def test_autosaves_round_trip_through_deltas(tmp_path):
+    saves = SaveGame(FakeGame(), directory=str(tmp_path))
+    saves.save({'room': 'room1', 'flags': {'door': False}}).result()
+    saves.save({'room': 'room1', 'flags': {'door': True}}).result()
+    assert os.path.exists(saves.slot_path(0, 'delta'))
+    assert saves.load() == {'room': 'room1', 'flags': {'door': True}}
+
+
+def test_crash_while_replacing_the_full_save_never_mixes_generations(tmp_path, monkeypatch, capsys):
+    saves = SaveGame(FakeGame(), directory=str(tmp_path))
+    saves.save({'room': 'room1', 'step': 0}).result()
+    saves.save({'room': 'room1', 'step': 1}).result()
+
+    def crash(path, data):
+        raise OSError("power lost")
+    monkeypatch.setattr(saves, 'write_file', crash)
+    with pytest.raises(OSError):
+        saves.save({'room': 'room2', 'step': 2}, full=True).result()
+    assert saves.load() == {'room': 'room1', 'step': 0}
+    assert "Saving failed: OSError('power lost')" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize('payload', [save_game.MAGIC + b'Z\x78\x9c\x01', b'', b'not a save'])
+def test_unreadable_save_starts_a_new_game(tmp_path, payload):
+    game = FakeGame()
+    saves = SaveGame(game, directory=str(tmp_path))
+    saves.save({'room': 'room1'}).result()
+    with open(saves.slot_path(0, 'full'), 'wb') as f:
+        f.write(payload)
+    saves.load_last_game()
+    assert game.new_game and game.restored is None
@@ -0,0 +1,39 @@
+
+import pyglet
+import pytest
+
+from shader_manager import ShaderManager
+
+SWAP_FRAGMENT = """#version 330 core
+in vec2 uv;
+out vec4 color;
+uniform sampler2D scene;
+
+void main() {
+    color = texture(scene, uv).grba;
+}
+"""
+
+
+@pytest.mark.parametrize('scale', [1.0, 0.5])
+def test_pass_runs_and_upscaled_sprite_lands_in_place(window, tmp_path, lit_rect, scale):
+    shader = tmp_path / 'swap.frag'
+    shader.write_text(SWAP_FRAGMENT)
+    window.switch_to()
+    shaders = ShaderManager()
+    shaders.load_post_shader('swap', str(shader))
+    post = shaders.create_post_process(window, scale=scale)
+    post.add_pass('swap')
+    sprite = pyglet.sprite.Sprite(pyglet.image.SolidColorImagePattern((255, 0, 0, 255)).create_image(16, 16),
+                                  x=600, y=400)
+    window.clear()
+    shaders.begin_frame()
+    sprite.draw()
+    shaders.end_frame()
+    assert post.scene.width == int(window.width * scale)
+    # Drawn red into the internal target, swapped to green by the pass
+    assert lit_rect('R') is None
+    assert lit_rect('G') == pytest.approx((600, 400, 16, 16), abs=1)
+    sprite.delete()
+    shaders.release()
+
@@ -0,0 +1,32 @@
+
+import json
+
+from PIL import Image
+
+from texture_residency import TextureResidency, variant_path
+
+
+def make_image(tmp_path, size):
+    path = str(tmp_path / 'background.png')
+    Image.new('RGB', size).save(path)
+    for scale in (0.5, 0.25):
+        Image.new('RGB', (round(size[0] * scale), round(size[1] * scale))).save(variant_path(path, scale))
+    return path
+
+
+def test_variant_follows_the_source_height(tmp_path):
+    path = make_image(tmp_path, (1600, 1200))
+    residency = TextureResidency(index_file=str(tmp_path / 'textures.json'))
+    residency.set_resolution(800, 600)
+    assert residency.resolve(path) == (variant_path(path, 0.5), 0.5)
+    residency.set_resolution(1280, 720)
+    assert residency.resolve(path) == (path, 1.0)
+
+
+def test_baked_index_provides_the_source_size(tmp_path):
+    path = make_image(tmp_path, (1600, 1200))
+    index = tmp_path / 'textures.json'
+    index.write_text(json.dumps({path: [3200, 2400]}))
+    residency = TextureResidency(index_file=str(index))
+    residency.set_resolution(800, 600)
+    assert residency.resolve(path) == (variant_path(path, 0.25), 0.25)
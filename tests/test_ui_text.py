@@ -0,0 +1,20 @@
+
+from ui_text import DialogueBox
+
+
+def test_typewriter_reveals_by_restyling_without_relayout(window):
+    box = DialogueBox(chars_per_second=10.0)
+    box.show("Hello there")
+    boxes = list(box.layout._boxes)
+    assert box.document.get_style('color', 0)[3] == 0
+    box.update(0.5)
+    assert box.revealed == 5 and not box.finished
+    assert box.document.get_style('color', 4)[3] == 255
+    assert box.document.get_style('color', 5)[3] == 0
+    assert box.layout._boxes == boxes
+    finished = []
+    box.on_finished = lambda: finished.append(True)
+    box.skip()
+    assert box.finished and finished == [True]
+    assert box.document.get_style('color', len("Hello there") - 1)[3] == 255
+    box.delete()
@@ -0,0 +1,47 @@
+
+import pytest
+
+from asset_archive import AssetArchive, write_archive
+from virtual_fs import VirtualFS
+
+
+def make_archive(tmp_path):
+    source = tmp_path / 'sound.opus'
+    source.write_bytes(b'OggS' * 64)
+    archive = tmp_path / 'assets.pak'
+    write_archive(str(archive), {'assets/sfx/sound.opus': str(source)})
+    return archive
+
+
+def test_size_and_read_come_from_the_archive(tmp_path):
+    vfs = VirtualFS()
+    vfs.mount(str(make_archive(tmp_path)))
+    assert vfs.size('assets/sfx/sound.opus') == 256
+    assert bytes(vfs.read_bytes('assets/sfx/sound.opus')) == b'OggS' * 64
+    vfs.unmount_all()
+
+
+def test_unmount_with_live_slices(tmp_path):
+    vfs = VirtualFS()
+    vfs.mount(str(make_archive(tmp_path)))
+    cached = vfs.read_bytes('assets/sfx/sound.opus')
+    for _ in range(200):
+        vfs.read_bytes('assets/sfx/sound.opus')
+    vfs.unmount_all()
+    assert vfs.archives == []
+    with pytest.raises(ValueError):
+        bytes(cached)
+
+
+def test_every_live_slice_is_released_on_close(tmp_path):
+    archive = AssetArchive(str(make_archive(tmp_path)))
+    first = archive.read('assets/sfx/sound.opus')
+    second = archive.read('assets/sfx/sound.opus')
+    for _ in range(200):
+        archive.read('assets/sfx/sound.opus')
+    # Dropped slices are forgotten; equal-content live ones are each tracked
+    assert len(archive.exported) == 2
+    archive.close()
+    for view in (first, second):
+        with pytest.raises(ValueError):
+            bytes(view)
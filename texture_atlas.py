@@ -0,0 +1,228 @@
+
+import hashlib
+import json
+import os
+
+from PIL import Image
+from asset_loader import assets
+from hotspots import mask_from_image, mask_path, write_mask
+from virtual_fs import vfs
+
+
+def save_image(image, output_file):
+    # Lossless formats only take optimize; quality means something to JPEG/WebP alone
+    ext = os.path.splitext(output_file)[1].lower()
+    if ext in ('.jpg', '.jpeg'):
+        image.convert('RGB').save(output_file, quality=95, optimize=True)
+    elif ext == '.webp':
+        image.save(output_file, quality=95, method=6)
+    else:
+        image.save(output_file, optimize=True)
+
+
+def next_power_of_two(value):
+    return 1 << max(value - 1, 0).bit_length()
+
+
+class MaxRectsPacker:
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.free_rects = [(0, 0, width, height)]
+        self.used_width = 0
+        self.used_height = 0
+
+    def insert(self, width, height):
+        # Best short side fit
+        best = None
+        best_score = None
+        for fx, fy, fw, fh in self.free_rects:
+            if width <= fw and height <= fh:
+                score = (min(fw - width, fh - height), max(fw - width, fh - height))
+                if best_score is None or score < best_score:
+                    best = (fx, fy)
+                    best_score = score
+        if best is None:
+            return None
+
+        rect = (best[0], best[1], width, height)
+        self._split_free_rects(rect)
+        self._prune_free_rects()
+        self.used_width = max(self.used_width, best[0] + width)
+        self.used_height = max(self.used_height, best[1] + height)
+        return best
+
+    def _split_free_rects(self, rect):
+        x, y, w, h = rect
+        free_rects = []
+        for free in self.free_rects:
+            fx, fy, fw, fh = free
+            if x >= fx + fw or x + w <= fx or y >= fy + fh or y + h <= fy:
+                free_rects.append(free)
+                continue
+            if x > fx:
+                free_rects.append((fx, fy, x - fx, fh))
+            if x + w < fx + fw:
+                free_rects.append((x + w, fy, fx + fw - x - w, fh))
+            if y > fy:
+                free_rects.append((fx, fy, fw, y - fy))
+            if y + h < fy + fh:
+                free_rects.append((fx, y + h, fw, fy + fh - y - h))
+        self.free_rects = free_rects
+
+    def _prune_free_rects(self):
+        pruned = []
+        for i, (ax, ay, aw, ah) in enumerate(self.free_rects):
+            contained = False
+            for j, (bx, by, bw, bh) in enumerate(self.free_rects):
+                if i != j and bx <= ax and by <= ay and ax + aw <= bx + bw and ay + ah <= by + bh:
+                    # Drop exact duplicates only once
+                    if (ax, ay, aw, ah) != (bx, by, bw, bh) or i > j:
+                        contained = True
+                        break
+            if not contained:
+                pruned.append((ax, ay, aw, ah))
+        self.free_rects = pruned
+
+
+class TextureAtlasBuilder:
+    def __init__(self, max_size=2048, padding=2, trim=True):
+        self.max_size = max_size
+        self.padding = padding
+        self.trim = trim
+        self.frames = {}
+        self.unique_images = {}
+
+    def add_image(self, name, image):
+        image = image.convert('RGBA')
+        source_width, source_height = image.size
+        bbox = image.getchannel('A').getbbox() if self.trim else (0, 0, source_width, source_height)
+        if bbox is None:
+            bbox = (0, 0, 1, 1)
+        trimmed = image.crop(bbox)
+        if trimmed.width + self.padding > self.max_size or trimmed.height + self.padding > self.max_size:
+            raise ValueError(f"Image '{name}' does not fit in a {self.max_size}x{self.max_size} atlas page")
+
+        digest = hashlib.sha1(trimmed.tobytes() + repr(trimmed.size).encode()).hexdigest()
+        self.unique_images.setdefault(digest, trimmed)
+        self.frames[name] = {
+            'hash': digest,
+            'offset_x': bbox[0],
+            'offset_y': bbox[1],
+            'source_w': source_width,
+            'source_h': source_height,
+        }
+
+    def add_directory(self, directory, prefix=None):
+        prefix = prefix or os.path.basename(os.path.normpath(directory))
+        for filename in sorted(os.listdir(directory)):
+            if filename.endswith('.png'):
+                with Image.open(os.path.join(directory, filename)) as image:
+                    self.add_image(f"{prefix}/{filename}", image)
+
+    def build(self):
+        order = sorted(self.unique_images.items(), key=lambda item: max(item[1].size), reverse=True)
+        # Grow a single square page until everything fits, then spill over into extra pages
+        area = sum((i.width + self.padding) * (i.height + self.padding) for _, i in order)
+        size = min(next_power_of_two(int(area ** 0.5)), self.max_size)
+        while True:
+            packers, placements = self._pack(order, size)
+            if len(packers) == 1 or size >= self.max_size:
+                break
+            size *= 2
+
+        pages = [Image.new('RGBA', (next_power_of_two(p.used_width), next_power_of_two(p.used_height)))
+                 for p in packers]
+        for digest, (page, x, y) in placements.items():
+            pages[page].paste(self.unique_images[digest], (x, y))
+
+        frames = {}
+        for name, frame in self.frames.items():
+            page, x, y = placements[frame['hash']]
+            image = self.unique_images[frame['hash']]
+            frames[name] = {
+                'page': page, 'x': x, 'y': y, 'w': image.width, 'h': image.height,
+                'offset_x': frame['offset_x'], 'offset_y': frame['offset_y'],
+                'source_w': frame['source_w'], 'source_h': frame['source_h'],
+            }
+        return pages, frames
+
+    def _pack(self, order, size):
+        packers = []
+        placements = {}
+        for digest, image in order:
+            width, height = image.width + self.padding, image.height + self.padding
+            for page, packer in enumerate(packers):
+                position = packer.insert(width, height)
+                if position:
+                    break
+            else:
+                packer = MaxRectsPacker(size, size)
+                packers.append(packer)
+                page = len(packers) - 1
+                position = packer.insert(width, height)
+            placements[digest] = (page, position[0], position[1])
+        return packers, placements
+
+    def save(self, output_file):
+        pages, frames = self.build()
+        root, ext = os.path.splitext(output_file)
+        page_files = [output_file] if len(pages) == 1 else [f"{root}_{i}{ext}" for i in range(len(pages))]
+        for page, page_file in zip(pages, page_files):
+            save_image(page, page_file)
+        # Hit-test masks cover the trimmed frame, the same rectangle a sprite of it draws
+        for name, frame in frames.items():
+            path = mask_path(os.path.join(root, name))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            region = pages[frame['page']].crop((frame['x'], frame['y'], frame['x'] + frame['w'], frame['y'] + frame['h']))
+            write_mask(path, mask_from_image(region))
+
+        index_file = f"{root}.json"
+        index = {
+            'pages': [os.path.basename(f) for f in page_files],
+            'frames': frames,
+        }
+        with open(index_file, 'w') as f:
+            json.dump(index, f, indent=4)
+        return index_file
+
+
+class TextureAtlas:
+    def __init__(self, index_file, textures=None):
+        index = json.loads(vfs.read_text(index_file))
+        directory = os.path.dirname(index_file)
+        self.index_file = index_file
+        self.textures = textures
+        self.page_paths = [os.path.join(directory, page) for page in index['pages']]
+        # Frame rectangles are in page pixels, so pages never swap to a downscaled variant
+        self.pages = [textures.image(path, variant=False) if textures else assets.image(path).get_texture()
+                      for path in self.page_paths]
+        self.frames = index['frames']
+        self.regions = {}
+
+    def release(self):
+        for path in self.page_paths:
+            if self.textures:
+                self.textures.release_image(path)
+            else:
+                assets.release_image(path)
+        self.regions.clear()
+
+    def get_region(self, name):
+        region = self.regions.get(name)
+        if region is None:
+            frame = self.frames[name]
+            page = self.pages[frame['page']]
+            # Atlas metadata is top-down (PIL), pyglet textures are bottom-up
+            region = page.get_region(frame['x'], page.height - frame['y'] - frame['h'], frame['w'], frame['h'])
+            region.anchor_x = -frame['offset_x']
+            region.anchor_y = -(frame['source_h'] - frame['offset_y'] - frame['h'])
+            self.regions[name] = region
+        return region
+
+    def mask_source(self, name):
+        # Frame masks sit in a directory named after the atlas: room1_atlas/character_walk/0.mask
+        return os.path.join(os.path.splitext(self.index_file)[0], name)
+
+    def frame_names(self, prefix):
+        return sorted(name for name in self.frames if name.startswith(prefix + '/'))
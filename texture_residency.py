@@ -0,0 +1,158 @@
+
+import json
+import os
+
+from PIL import Image
+
+from asset_loader import assets
+from virtual_fs import vfs
+
+# bake_assets writes name@0.5x.png and name@0.25x.png next to large images for smaller windows,
+# and records every source image's size in TEXTURE_INDEX
+VARIANT_SCALES = (0.5, 0.25)
+TEXTURE_INDEX = 'assets/textures.json'
+
+def variant_path(path, scale):
+    root, ext = os.path.splitext(path)
+    return f"{root}@{scale:g}x{ext}"
+
+def texture_bytes(texture):
+    return texture.width * texture.height * 4
+
+def format_bytes(size):
+    return f"{size / 1024 / 1024:.1f} MiB"
+
+class TextureOwner:
+    # One manager's textures within one room or screen; requested paths map to whatever variant was loaded
+    def __init__(self, residency, scope, manager):
+        self.residency = residency
+        self.scope = scope
+        self.manager = manager
+        self.images = {}   # requested path -> (image, loaded path, bytes)
+        self.bytes = 0
+
+    def image(self, path, variant=True):
+        entry = self.images.get(path)
+        if entry is None:
+            entry = self.images[path] = self.residency.load(path, variant)
+            self.bytes += entry[2]
+            self.residency.track(self)
+        return entry[0]
+
+    def prefetch(self, path):
+        # Starts decoding on the loader's workers; image() then only waits for what's left
+        if path not in self.images:
+            assets.preload(images=[self.residency.resolve(path)[0]])
+
+    def __contains__(self, path):
+        return path in self.images
+
+    def release_image(self, path):
+        entry = self.images.pop(path, None)
+        if entry is not None:
+            assets.release_image(entry[1])
+            self.bytes -= entry[2]
+
+    def release(self):
+        for path in list(self.images):
+            self.release_image(path)
+        self.residency.untrack(self)
+
+class TextureResidency:
+    def __init__(self, scales=VARIANT_SCALES, index_file=TEXTURE_INDEX):
+        self.scales = sorted(scales)
+        self.index_file = index_file
+        self.sizes = None
+        self.resolution = None
+        self.scope = 'global'
+        self.owners = []
+        self.resolved = {}
+
+    def set_resolution(self, width, height):
+        # Images already loaded keep their variant until their owner reloads them
+        if (width, height) != self.resolution:
+            self.resolution = (width, height)
+            self.resolved.clear()
+
+    def source_size(self, path):
+        if self.sizes is None:
+            self.sizes = json.loads(vfs.read_text(self.index_file)) if vfs.exists(self.index_file) else {}
+        size = self.sizes.get(path)
+        if size is None:
+            # Unbaked files: Image.open only parses the header
+            with vfs.open(path) as f:
+                size = self.sizes[path] = Image.open(f).size
+        return size
+
+    def enter(self, scope):
+        # Owners created from here on are accounted to this room or screen
+        self.scope = scope
+
+    def owner(self, manager):
+        return TextureOwner(self, self.scope, manager)
+
+    def resolve(self, path):
+        resolved = self.resolved.get(path)
+        if resolved is None:
+            resolved = (path, 1.0)
+            variants = [scale for scale in self.scales if scale < 1.0 and vfs.exists(variant_path(path, scale))]
+            if variants and self.resolution is not None:
+                # The smallest variant that still has a texel per framebuffer row when the image
+                # spans the whole height; anything smaller on screen only needs less
+                height = self.source_size(path)[1]
+                scale = next((s for s in variants if s * height >= self.resolution[1]), 1.0)
+                if scale < 1.0:
+                    resolved = (variant_path(path, scale), scale)
+            self.resolved[path] = resolved
+        return resolved
+
+    def resolve_all(self, paths):
+        return [self.resolve(path)[0] for path in paths]
+
+    def load(self, path, variant=True):
+        loaded, scale = self.resolve(path) if variant else (path, 1.0)
+        texture = assets.image(loaded).get_texture()
+        size = texture_bytes(texture)
+        if scale == 1.0:
+            return texture, loaded, size
+        # A region with the source's dimensions: callers blit and position it exactly as before,
+        # only the sampled texture is smaller
+        image = texture.get_region(0, 0, texture.width, texture.height)
+        image.width = round(texture.width / scale)
+        image.height = round(texture.height / scale)
+        return image, loaded, size
+
+    def track(self, owner):
+        if owner not in self.owners:
+            self.owners.append(owner)
+
+    def untrack(self, owner):
+        if owner in self.owners:
+            self.owners.remove(owner)
+
+    def usage(self):
+        # scope -> manager -> (bytes, image count)
+        scopes = {}
+        for owner in self.owners:
+            managers = scopes.setdefault(owner.scope, {})
+            size, count = managers.get(owner.manager, (0, 0))
+            managers[owner.manager] = (size + owner.bytes, count + len(owner.images))
+        return scopes
+
+    def scope_bytes(self, scope):
+        return sum(size for size, _ in self.usage().get(scope, {}).values())
+
+    def report(self):
+        resolution = '%dx%d' % self.resolution if self.resolution else 'unknown resolution'
+        lines = [f"textures at {resolution}, current: {self.scope}"]
+        total = 0
+        for scope, managers in sorted(self.usage().items()):
+            scope_total = sum(size for size, _ in managers.values())
+            total += scope_total
+            lines.append(f"  {scope:<20} {format_bytes(scope_total):>10}")
+            for manager, (size, count) in sorted(managers.items(), key=lambda item: -item[1][0]):
+                lines.append(f"    {manager:<18} {format_bytes(size):>10}  {count} images")
+        lines.append(f"  {'total':<20} {format_bytes(total):>10}")
+        return '\n'.join(lines)
+
+residency = TextureResidency()
@@ -1,43 +1,196 @@
 
-import pyglet
-from pyglet.math import Vec2
-
-class Tween:
-    def __init__(self, start, end, duration, update_func, on_complete=None):
-        self.start = start
-        self.end = end
-        self.duration = duration
-        self.update_func = update_func
-        self.on_complete = on_complete
-        self.elapsed = 0
+import math
 
-    def update(self, dt):
-        self.elapsed += dt
-        t = min(self.elapsed / self.duration, 1)
-        value = self.start + (self.end - self.start) * t
-        self.update_func(value)
+import numpy as np
+
+POSITION = 0
+SCALE = 1
+VALUE = 2
+
+ELASTIC_PERIOD = 2 * math.pi / 3
+
+
+def linear(t, params):
+    return t
+
+def quad_in(t, params):
+    return t * t
+
+def quad_out(t, params):
+    return 1 - (1 - t) * (1 - t)
+
+def quad_in_out(t, params):
+    return np.where(t < 0.5, 2 * t * t, 1 - (-2 * t + 2) ** 2 / 2)
+
+def cubic_in(t, params):
+    return t * t * t
+
+def cubic_out(t, params):
+    return 1 - (1 - t) ** 3
+
+def cubic_in_out(t, params):
+    return np.where(t < 0.5, 4 * t * t * t, 1 - (-2 * t + 2) ** 3 / 2)
+
+def elastic_in(t, params):
+    value = -np.exp2(10 * t - 10) * np.sin((t * 10 - 10.75) * ELASTIC_PERIOD)
+    return np.where((t <= 0) | (t >= 1), t, value)
+
+def elastic_out(t, params):
+    value = np.exp2(-10 * t) * np.sin((t * 10 - 0.75) * ELASTIC_PERIOD) + 1
+    return np.where((t <= 0) | (t >= 1), t, value)
+
+def bezier(t, params):
+    # CSS-style cubic-bezier(x1, y1, x2, y2): solve x(s) = t with Newton steps, then evaluate y(s)
+    x1, y1, x2, y2 = params[:, 0], params[:, 1], params[:, 2], params[:, 3]
+    s = t.copy()
+    for _ in range(8):
+        inv = 1 - s
+        x = 3 * inv * inv * s * x1 + 3 * inv * s * s * x2 + s * s * s - t
+        dx = 3 * inv * inv * x1 + 6 * inv * s * (x2 - x1) + 3 * s * s * (1 - x2)
+        s = np.clip(s - x / np.where(np.abs(dx) < 1e-6, 1e-6, dx), 0, 1)
+    inv = 1 - s
+    return 3 * inv * inv * s * y1 + 3 * inv * s * s * y2 + s * s * s
+
+EASINGS = {
+    'linear': linear,
+    'quad_in': quad_in,
+    'quad_out': quad_out,
+    'quad_in_out': quad_in_out,
+    'cubic_in': cubic_in,
+    'cubic_out': cubic_out,
+    'cubic_in_out': cubic_in_out,
+    'elastic_in': elastic_in,
+    'elastic_out': elastic_out,
+    'bezier': bezier,
+}
+EASING_IDS = {name: i for i, name in enumerate(EASINGS)}
+EASING_FUNCTIONS = list(EASINGS.values())
 
-        if t == 1 and self.on_complete:
-            self.on_complete()
 
 class TweeningManager:
-    def __init__(self):
-        self.tweens = []
+    # Struct-of-arrays tween storage: row i of every array (and of the target lists) is one tween.
+    def __init__(self, capacity=64):
+        self.count = 0
+        self.start = np.zeros((capacity, 2))
+        self.end = np.zeros((capacity, 2))
+        self.elapsed = np.zeros(capacity)
+        self.duration = np.ones(capacity)
+        self.easing = np.zeros(capacity, dtype=np.int8)
+        self.kind = np.zeros(capacity, dtype=np.int8)
+        self.params = np.zeros((capacity, 4))
+        self.targets = []
+        self.on_complete = []
+        # Rows move when a tween before them finishes, so callers hold handles instead of rows
+        self.handles = []
+        self.slots = {}
+        self.next_handle = 0
+
+    def tween_position(self, sprite, start, end, duration, easing='linear', on_complete=None, control_points=None):
+        return self.add(POSITION, sprite, start, end, duration, easing, on_complete, control_points)
+
+    def tween_scale(self, sprite, start, end, duration, easing='linear', on_complete=None, control_points=None):
+        return self.add(SCALE, sprite, (start, 0), (end, 0), duration, easing, on_complete, control_points)
+
+    def tween_value(self, update_func, start, end, duration, easing='linear', on_complete=None, control_points=None):
+        return self.add(VALUE, update_func, (start, 0), (end, 0), duration, easing, on_complete, control_points)
+
+    def add(self, kind, target, start, end, duration, easing='linear', on_complete=None, control_points=None):
+        if easing not in EASING_IDS:
+            raise ValueError(f"Unknown easing '{easing}'")
+        if self.count == len(self.elapsed):
+            self._grow()
+        i = self.count
+        self.start[i] = start
+        self.end[i] = end
+        self.elapsed[i] = 0
+        self.duration[i] = max(duration, 1e-9)
+        self.easing[i] = EASING_IDS[easing]
+        self.kind[i] = kind
+        self.params[i] = (0.25, 0.1, 0.25, 1.0) if control_points is None else control_points
+        self.targets.append(target)
+        self.on_complete.append(on_complete)
+        self.count += 1
+        handle = self.next_handle
+        self.next_handle += 1
+        self.handles.append(handle)
+        self.slots[handle] = i
+        return handle
+
+    def _grow(self):
+        capacity = len(self.elapsed) * 2
+        for name in ('start', 'end', 'elapsed', 'duration', 'easing', 'kind', 'params'):
+            array = getattr(self, name)
+            grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+            grown[:len(array)] = array
+            setattr(self, name, grown)
+
+    def active(self, handle):
+        return handle in self.slots
 
-    def tween_position(self, sprite, start, end, duration):
-        def update_func(pos):
-            sprite.x, sprite.y = pos.x, pos.y
-        tween = Tween(Vec2(*start), Vec2(*end), duration, update_func)
-        self.tweens.append(tween)
+    def remove(self, handle):
+        slot = self.slots.get(handle)
+        if slot is not None:
+            self._swap_remove(slot)
 
-    def tween_scale(self, sprite, start, end, duration):
-        def update_func(scale):
-            sprite.scale = scale
-        tween = Tween(start, end, duration, update_func)
-        self.tweens.append(tween)
+    def cancel(self, target):
+        for i in reversed([i for i, t in enumerate(self.targets) if t is target]):
+            self._swap_remove(i)
+
+    def clear(self):
+        self.count = 0
+        self.targets.clear()
+        self.on_complete.clear()
+        self.handles.clear()
+        self.slots.clear()
 
     def update(self, dt):
-        for tween in self.tweens[:]:
-            tween.update(dt)
-            if tween.elapsed >= tween.duration:
-                self.tweens.remove(tween)
+        n = self.count
+        if not n:
+            return
+
+        elapsed = self.elapsed[:n]
+        elapsed += dt
+        t = np.minimum(elapsed / self.duration[:n], 1.0)
+
+        eased = np.empty(n)
+        easing = self.easing[:n]
+        for easing_id in np.unique(easing):
+            mask = easing == easing_id
+            eased[mask] = EASING_FUNCTIONS[easing_id](t[mask], self.params[:n][mask])
+
+        start = self.start[:n]
+        values = start + (self.end[:n] - start) * eased[:, None]
+        self._write_back(values)
+
+        finished = np.flatnonzero(t >= 1.0)
+        if not len(finished):
+            return
+        callbacks = [self.on_complete[i] for i in finished if self.on_complete[i]]
+        for i in finished[::-1].tolist():
+            self._swap_remove(i)
+        for callback in callbacks:
+            callback()
+
+    def _write_back(self, values):
+        for target, kind, (a, b) in zip(self.targets, self.kind[:self.count].tolist(), values.tolist()):
+            if kind == POSITION:
+                target.position = (a, b, target.z)
+            elif kind == SCALE:
+                target.scale = a
+            else:
+                target(a)
+
+    def _swap_remove(self, i):
+        last = self.count - 1
+        del self.slots[self.handles[i]]
+        if i != last:
+            for array in (self.start, self.end, self.elapsed, self.duration, self.easing, self.kind, self.params):
+                array[i] = array[last]
+            self.targets[i] = self.targets[last]
+            self.on_complete[i] = self.on_complete[last]
+            self.handles[i] = self.handles[last]
+            self.slots[self.handles[i]] = i
+        self.handles.pop()
+        self.targets.pop()
+        self.on_complete.pop()
+        self.count = last
@@ -0,0 +1,115 @@
+
+import pyglet
+
+WHITE = (255, 255, 255, 255)
+HIGHLIGHT = (255, 255, 0, 255)
+
+class MenuLabels:
+    # Every option lives in one batch; colors are only written when the selection changes
+    def __init__(self, window, options, font_name='Arial', font_size=36, spacing=60,
+                 color=WHITE, selected_color=HIGHLIGHT, batch=None):
+        self.batch = batch or pyglet.graphics.Batch()
+        self.color = color
+        self.selected_color = selected_color
+        self.labels = [pyglet.text.Label(option,
+                                         font_name=font_name,
+                                         font_size=font_size,
+                                         x=window.width // 2,
+                                         y=window.height // 2 - i * spacing,
+                                         anchor_x='center', anchor_y='center',
+                                         color=color, batch=self.batch)
+                       for i, option in enumerate(options)]
+        self.selected = None
+        self.select(0)
+
+    def select(self, index):
+        if index == self.selected:
+            return
+        if self.selected is not None:
+            self.labels[self.selected].color = self.color
+        self.labels[index].color = self.selected_color
+        self.selected = index
+
+    def set_text(self, index, text):
+        if self.labels[index].text != text:
+            self.labels[index].text = text
+
+    def draw(self):
+        self.batch.draw()
+
+    def delete(self):
+        for label in self.labels:
+            label.delete()
+        self.labels.clear()
+
+class DialogueBox:
+    # Each line is laid out once; the typewriter effect then only restyles the color of the
+    # characters it reveals, which pyglet applies to the existing glyph vertices without a relayout.
+    def __init__(self, x=40, y=180, width=720, height=140, font_name='Arial', font_size=20,
+                 color=WHITE, chars_per_second=40.0, batch=None, group=None):
+        self.batch = batch or pyglet.graphics.Batch()
+        self.owns_batch = batch is None
+        self.style = {'font_name': font_name, 'font_size': font_size, 'color': color}
+        self.color = color
+        self.hidden = {'color': color[:3] + (0,)}
+        self.chars_per_second = chars_per_second
+        self.document = pyglet.text.document.FormattedDocument('')
+        self.layout = pyglet.text.layout.TextLayout(self.document, x=x, y=y, width=width, height=height,
+                                                    anchor_y='top', multiline=True, wrap_lines=True,
+                                                    batch=self.batch, group=group)
+        self.total = 0
+        self.revealed = 0
+        self.elapsed = 0.0
+        self.on_finished = None
+
+    def show(self, text, on_finished=None):
+        # Replaced in one edit with the text already transparent, so it is laid out once
+        self.document.delete_text(0, len(self.document.text))
+        self.document.insert_text(0, text, dict(self.style, **self.hidden))
+        self.total = len(text)
+        self.revealed = 0
+        self.elapsed = 0.0
+        self.on_finished = on_finished
+        if not self.total:
+            self.finish()
+
+    def reveal(self, start, end):
+        self.document.set_style(start, end, {'color': self.color})
+
+    def update(self, dt):
+        if self.revealed >= self.total:
+            return
+        self.elapsed += dt
+        target = min(self.total, int(self.elapsed * self.chars_per_second))
+        if target > self.revealed:
+            self.reveal(self.revealed, target)
+            self.revealed = target
+            if target == self.total:
+                self.finish()
+
+    def skip(self):
+        if self.revealed < self.total:
+            self.reveal(self.revealed, self.total)
+            self.revealed = self.total
+            self.finish()
+
+    def finish(self):
+        callback, self.on_finished = self.on_finished, None
+        if callback:
+            callback()
+
+    @property
+    def finished(self):
+        return self.revealed >= self.total
+
+    def clear(self):
+        self.document.delete_text(0, len(self.document.text))
+        self.total = self.revealed = 0
+
+    def draw(self):
+        # With a shared batch the owner draws it
+        if self.owns_batch:
+            self.batch.draw()
+
+    def delete(self):
+        self.layout.delete()
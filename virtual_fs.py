@@ -0,0 +1,77 @@
+
+import os
+
+from asset_archive import AssetArchive, MemoryViewReader
+
+
+def normalize(path):
+    return os.path.normpath(path).replace(os.sep, '/')
+
+
+class VirtualFS:
+    # Mounted archives are searched first (last mounted wins), loose files are the fallback.
+    def __init__(self):
+        self.archives = []
+
+    def mount(self, archive_path):
+        archive = AssetArchive(archive_path)
+        self.archives.insert(0, archive)
+        return archive
+
+    def unmount_all(self):
+        for archive in self.archives:
+            archive.close()
+        self.archives.clear()
+
+    def find_archive(self, path):
+        for archive in self.archives:
+            if path in archive:
+                return archive
+        return None
+
+    def exists(self, path):
+        path = normalize(path)
+        return self.find_archive(path) is not None or os.path.exists(path)
+
+    def isdir(self, path):
+        path = normalize(path)
+        return any(archive.isdir(path) for archive in self.archives) or os.path.isdir(path)
+
+    def listdir(self, directory):
+        directory = normalize(directory)
+        names = set()
+        for archive in self.archives:
+            names.update(archive.listdir(directory))
+        if os.path.isdir(directory):
+            names.update(os.listdir(directory))
+        if not names and not self.isdir(directory):
+            raise FileNotFoundError(directory)
+        return sorted(names)
+
+    def size(self, path):
+        path = normalize(path)
+        archive = self.find_archive(path)
+        if archive is not None:
+            return archive.size(path)
+        return os.path.getsize(path)
+
+    def read_bytes(self, path):
+        path = normalize(path)
+        archive = self.find_archive(path)
+        if archive is not None:
+            return archive.read(path)
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def read_text(self, path, encoding='utf-8'):
+        return str(self.read_bytes(path), encoding)
+
+    def open(self, path):
+        path = normalize(path)
+        archive = self.find_archive(path)
+        if archive is not None:
+            return MemoryViewReader(archive.read(path), name=path)
+        return open(path, 'rb')
+
+
+vfs = VirtualFS()